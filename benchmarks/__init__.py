@@ -0,0 +1,11 @@
+"""
+Benchmarks for the wavelength calibration and interpolation pipeline.
+
+The benchmarks run on synthetic SUMER detector A rasters (see
+`benchmarks.synthetic`), so they need no observation data:
+
+    python -m benchmarks.run_benchmarks --sizes 2 8 32
+
+Results are written as JSON to benchmarks/results/ and can be compared
+with an earlier run to track performance regressions.
+"""
@@ -0,0 +1,308 @@
+"""
+Time the stages of the calibration and interpolation pipeline.
+
+The pipeline runs on synthetic rasters of several sizes (number of
+exposures). For every stage the wall-clock times of `--repeat` runs are
+recorded, and the results are written as JSON for regression tracking:
+
+    python -m benchmarks.run_benchmarks --sizes 2 8 32
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<earlier run>.json
+
+With --compare, stages whose median time grew by more than --threshold are
+reported and the script exits with status 1.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_calibration, write_synthetic_raster
+from utils.calibration import CalibrationParameters
+from utils.interpolations import PixelInterpolation
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+ROW_START = 6
+ROW_END = 323
+
+
+def _time(function, repeat: int) -> list:
+    """Run `function` `repeat` times (silencing its output) and return the wall-clock times."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - t0)
+    return times
+
+
+def _git_commit() -> str:
+    """Get the commit of the working tree (None outside a git repository)."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark_raster(data_path: str, sumer_filename_list: list, work_dir: str,
+                     repeat: int = 3) -> tuple:
+    """
+    Time every pipeline stage on one raster.
+    
+    Parameters
+    ----------
+    data_path : str
+        Directory of the synthetic FITS files
+    sumer_filename_list : list
+        Filenames of the exposures
+    work_dir : str
+        Scratch directory for saved results
+    repeat : int, default=3
+        Number of timed runs per stage
+    
+    Returns
+    -------
+    tuple
+        (timings, accuracy) where timings maps stage names to lists of times
+        in seconds, and accuracy compares the recovered calibration with the
+        synthetic truth
+    """
+    timings = {}
+    
+    # ---- Calibration --------------------------------------------------------
+    calibrator = CalibrationParameters(row_start=ROW_START, row_end=ROW_END)
+    timings['calibration.load_data'] = _time(
+        lambda: calibrator._load_data(data_path, sumer_filename_list), repeat
+    )
+    timings['calibration.compute_calibration'] = _time(
+        lambda: calibrator.compute_calibration(data_path, sumer_filename_list), repeat
+    )
+    
+    for format, filename in (('npz', 'calibration.npz'), ('store', 'calibration_store')):
+        output_path = os.path.join(work_dir, filename)
+        timings[f'calibration.save_{format}'] = _time(
+            lambda: calibrator.save_results(output_path, format=format), repeat
+        )
+        loaded = CalibrationParameters(row_start=ROW_START, row_end=ROW_END)
+        timings[f'calibration.load_{format}'] = _time(
+            lambda: loaded.load_results(output_path), repeat
+        )
+    
+    slopes, _ = calibrator.get_slopes()
+    intercepts, _ = calibrator.get_intercepts()
+    true_slopes, true_intercepts = synthetic_calibration(np.array(calibrator.row_list))
+    x_pixels = np.arange(512)
+    wavelength_error = np.abs(
+        (np.outer(slopes - true_slopes, x_pixels) + (intercepts - true_intercepts)[:, None])
+    )
+    accuracy = {
+        'n_rows': len(slopes),
+        'median_wavelength_error_nm': float(np.nanmedian(wavelength_error)),
+        'max_wavelength_error_nm': float(np.nanmax(wavelength_error)),
+    }
+    
+    # ---- Interpolation ------------------------------------------------------
+    interpolator = PixelInterpolation(row_reference=120, show_progress=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpolator._load_data(data_path, sumer_filename_list[:1])
+    image = interpolator._spectral_image_list[0]
+    image_unc = interpolator._spectral_image_unc_list[0]
+    timings['interpolation.interpolate_spectral_image'] = _time(
+        lambda: interpolator._interpolate_spectral_image(
+            image, image_unc, slopes, intercepts, row_start=ROW_START, row_end=ROW_END
+        ), repeat
+    )
+    
+    for streaming in (False, True):
+        name = 'interpolate_data_streaming' if streaming else 'interpolate_data'
+        interpolator = PixelInterpolation(row_reference=120, show_progress=False)
+        timings[f'interpolation.{name}'] = _time(
+            lambda: interpolator.interpolate_data(
+                data_path, sumer_filename_list, slopes, intercepts,
+                row_start=ROW_START, row_end=ROW_END, streaming=streaming,
+            ), repeat
+        )
+    
+    interpolator = PixelInterpolation(row_reference=120, show_progress=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpolator.interpolate_data(
+            data_path, sumer_filename_list, slopes, intercepts,
+            row_start=ROW_START, row_end=ROW_END,
+        )
+    for format, filename in (('npz', 'interpolation.npz'), ('npy', 'interpolation_npy'),
+                             ('store', 'interpolation_store')):
+        output_path = os.path.join(work_dir, filename)
+        
+        def save():
+            # Every run writes a fresh output (the store would append otherwise)
+            if os.path.isdir(output_path):
+                shutil.rmtree(output_path)
+            elif os.path.exists(output_path):
+                os.remove(output_path)
+            interpolator.save_results(output_path, format=format)
+        
+        timings[f'interpolation.save_{format}'] = _time(save, repeat)
+        loaded = PixelInterpolation(row_reference=120, show_progress=False)
+        timings[f'interpolation.load_{format}'] = _time(
+            lambda: loaded.load_results(output_path), repeat
+        )
+    
+    return timings, accuracy
+
+
+def run_benchmarks(sizes: list, repeat: int = 3, work_dir: str = None, seed: int = 0) -> dict:
+    """
+    Run the benchmarks on synthetic rasters of the given sizes.
+    
+    Parameters
+    ----------
+    sizes : list
+        Numbers of exposures per raster
+    repeat : int, default=3
+        Number of timed runs per stage
+    work_dir : str, default=None
+        Directory for the synthetic rasters and saved results (a temporary
+        directory removed afterwards if None)
+    seed : int, default=0
+        Seed of the synthetic noise
+    
+    Returns
+    -------
+    dict
+        'metadata' (environment of the run) and 'benchmarks', mapping
+        '<stage>[n=<size>]' to the times, their minimum and median
+    """
+    cleanup = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='sumer_benchmarks_')
+    results = {
+        'metadata': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'sizes': list(sizes),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'benchmarks': {},
+        'accuracy': {},
+    }
+    
+    try:
+        for n_images in sizes:
+            raster_dir = os.path.join(work_dir, f'raster_{n_images}')
+            print(f"Writing synthetic raster with {n_images} exposures...")
+            filenames = write_synthetic_raster(raster_dir, n_images, seed=seed)
+            
+            output_dir = os.path.join(work_dir, f'output_{n_images}')
+            os.makedirs(output_dir, exist_ok=True)
+            timings, accuracy = benchmark_raster(raster_dir, filenames, output_dir, repeat)
+            
+            for stage, times in timings.items():
+                results['benchmarks'][f'{stage}[n={n_images}]'] = {
+                    'n_images': n_images,
+                    'times': times,
+                    'min': min(times),
+                    'median': float(np.median(times)),
+                }
+                print(f"  {stage:<45} {np.median(times) * 1e3:10.1f} ms")
+            results['accuracy'][f'n={n_images}'] = accuracy
+    finally:
+        if cleanup:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    return results
+
+
+def compare_results(results: dict, reference: dict, threshold: float = 1.2) -> list:
+    """
+    Compare the median times of two benchmark runs.
+    
+    Parameters
+    ----------
+    results : dict
+        Current results (see `run_benchmarks`)
+    reference : dict
+        Earlier results
+    threshold : float, default=1.2
+        Ratio of median times above which a stage counts as a regression
+    
+    Returns
+    -------
+    list
+        (name, reference_median, median, ratio) of the regressed stages
+    """
+    regressions = []
+    print(f"\n{'benchmark':<55} {'ref [ms]':>10} {'now [ms]':>10} {'ratio':>7}")
+    for name, entry in results['benchmarks'].items():
+        if name not in reference['benchmarks']:
+            continue
+        reference_median = reference['benchmarks'][name]['median']
+        ratio = entry['median'] / reference_median if reference_median > 0 else np.inf
+        flag = '  <-- slower' if ratio > threshold else ''
+        print(f"{name:<55} {reference_median * 1e3:10.1f} {entry['median'] * 1e3:10.1f} "
+              f"{ratio:7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append((name, reference_median, entry['median'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2, 8, 32],
+                        help='numbers of exposures per synthetic raster')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic noise')
+    parser.add_argument('--work-dir', default=None,
+                        help='keep the synthetic rasters and outputs in this directory')
+    parser.add_argument('--output', default=None,
+                        help='JSON file for the results (default: benchmarks/results/<date>.json)')
+    parser.add_argument('--compare', default=None, help='JSON results of an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slow-down ratio reported as a regression')
+    args = parser.parse_args(argv)
+    
+    results = run_benchmarks(args.sizes, repeat=args.repeat, work_dir=args.work_dir, seed=args.seed)
+    
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'benchmarks_{stamp}.json')
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+    
+    if args.compare is not None:
+        with open(args.compare) as f:
+            reference = json.load(f)
+        regressions = compare_results(results, reference, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold}x the reference")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Synthetic SUMER detector A rasters for benchmarking.
+
+Each exposure is a 360×512 detector A frame holding the lines described by
+the calibration parameter set (modules/calibration_parameters.json). The
+lines are moved to the positions given by a smooth, row-dependent dispersion
+(`synthetic_calibration`), so the calibration recovered by the pipeline can
+also be checked against a known truth. Counts follow Poisson statistics
+consistent with the uncertainty model of the pipeline, and the known
+defective pixels of detector A are set to zero.
+"""
+
+import numpy as np
+import os
+from astropy.io import fits
+
+from modules.calibration_params_loader import get_all_rows, get_parameters_for_row
+from utils.calibration import CalibrationParameters, get_defect_mask_DetA
+
+
+DETECTOR_SHAPE = (360, 512)
+CENTRE_ROW = 165
+
+# Rest wavelength of the first calibration line and its pixel at the centre row
+REFERENCE_WAVELENGTH = 153.7935
+REFERENCE_PIXEL = 178.0
+NOMINAL_DISPERSION = (154.3960 - REFERENCE_WAVELENGTH) / (321.26 - REFERENCE_PIXEL)
+
+# Relative change of the dispersion and line shift (pixels) across the slit
+DISPERSION_GRADIENT = 2e-3
+SHIFT_TILT = -0.5
+SHIFT_CURVATURE = 1.5
+
+
+def synthetic_calibration(rows):
+    """
+    Get the true calibration of the synthetic rasters.
+    
+    Parameters
+    ----------
+    rows : array
+        Detector rows (in the orientation used by the pipeline)
+    
+    Returns
+    -------
+    tuple
+        (slopes, intercepts) with wavelength = slope * pixel + intercept
+    """
+    u = (np.asarray(rows, dtype=float) - CENTRE_ROW) / CENTRE_ROW
+    slopes = NOMINAL_DISPERSION * (1 + DISPERSION_GRADIENT * u)
+    shifts = SHIFT_TILT * u + SHIFT_CURVATURE * u**2
+    intercepts = REFERENCE_WAVELENGTH - slopes * (REFERENCE_PIXEL + shifts)
+    return slopes, intercepts
+
+
+def _row_spectrum(row: int, x_pixels, slope: float, intercept: float):
+    """Noise-free spectrum (in units of the parameter set) of one row."""
+    params = get_parameters_for_row(row)
+    spectrum = np.full_like(x_pixels, params['bckg_fit'], dtype=float)
+    for init_parameters in params['init_parameters'].values():
+        components = np.array(init_parameters[1:], dtype=float).reshape(-1, 3)
+        # The parameter set holds nominal positions; move them to this row
+        wavelengths = REFERENCE_WAVELENGTH + NOMINAL_DISPERSION * (components[:, 1] - REFERENCE_PIXEL)
+        components[:, 1] = (wavelengths - intercept) / slope
+        spectrum += CalibrationParameters._multigaussian_for_curvefit(
+            x_pixels, 0.0, *components.ravel()
+        )
+    return spectrum
+
+
+def synthetic_expected_image():
+    """
+    Get the noise-free spectral radiance of a synthetic exposure.
+    
+    Rows without a parameter set repeat the spectrum of the nearest row that
+    has one.
+    
+    Returns
+    -------
+    array
+        Image of shape DETECTOR_SHAPE (in the orientation used by the pipeline)
+    """
+    x_pixels = np.arange(DETECTOR_SHAPE[1], dtype=float)
+    defined_rows = np.array(get_all_rows())
+    slopes, intercepts = synthetic_calibration(np.arange(DETECTOR_SHAPE[0]))
+    
+    image = np.empty(DETECTOR_SHAPE)
+    for row in range(DETECTOR_SHAPE[0]):
+        source_row = int(defined_rows[np.argmin(np.abs(defined_rows - row))])
+        image[row] = _row_spectrum(source_row, x_pixels, slopes[row], intercepts[row])
+    
+    # The pipeline multiplies the radiance by 10 before fitting
+    return image / 10
+
+
+def write_synthetic_raster(output_dir: str, n_images: int, seed: int = 0,
+                           exposure_time: float = 150.0,
+                           factor_fullspectrum: float = 1.0) -> list:
+    """
+    Write a raster of synthetic exposures as FITS files.
+    
+    Parameters
+    ----------
+    output_dir : str
+        Directory for the FITS files (created if needed)
+    n_images : int
+        Number of exposures
+    seed : int, default=0
+        Seed of the Poisson noise
+    exposure_time : float, default=150.0
+        Exposure time in seconds (as in CalibrationParameters)
+    factor_fullspectrum : float, default=1.0
+        Radiance per count times exposure_time**2 (as in CalibrationParameters)
+    
+    Returns
+    -------
+    list
+        Filenames of the written exposures
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    
+    # Radiance of one count, so that the pipeline's sqrt(data * factor) / t_exp
+    # is the Poisson uncertainty
+    radiance_per_count = factor_fullspectrum / exposure_time**2
+    expected_counts = synthetic_expected_image() / radiance_per_count
+    defects = get_defect_mask_DetA(DETECTOR_SHAPE)
+    
+    header = fits.Header()
+    header['DETECTOR'] = 'A'
+    header['EXPTIME'] = exposure_time
+    header['SYNTHET'] = (True, 'Synthetic benchmark exposure')
+    
+    filenames = []
+    for i in range(n_images):
+        image = rng.poisson(expected_counts) * radiance_per_count
+        image[defects] = 0.0
+        filename = f'synthetic_sumer_{i:04d}.fits'
+        # FITS files hold the rows in the opposite order (the pipeline flips them)
+        fits.writeto(
+            os.path.join(output_dir, filename), image[::-1].astype(np.float32),
+            header=header, overwrite=True,
+        )
+        filenames.append(filename)
+    return filenames
@@ -0,0 +1,9 @@
+"""
+Command-line interface of the equatorial coronal hole pipeline.
+
+    python -m ech calibrate --data-path ../data/soho/sumer/ --output calibration_results.npz
+    python -m ech interpolate --data-path ../data/soho/sumer/ --calibration calibration_results.npz
+    python -m ech campaign campaign.json --output-dir ../output/campaign --workers 8
+
+See `python -m ech <command> --help` for the options of every command.
+"""
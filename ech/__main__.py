@@ -0,0 +1,6 @@
+import sys
+
+from ech.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Command-line entry points: calibrate, interpolate, campaign and serve.
+
+Only the standard library is imported at module level, so `--help` and
+argument errors return without loading NumPy, SciPy or astropy. The
+pipeline modules are imported when a command runs.
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+
+def _find_files(data_path: str, files: list) -> list:
+    """Use the given files, or every FITS file of data_path except Level 1 files."""
+    if files:
+        return list(files)
+    return sorted(
+        os.path.basename(f) for f in glob.glob(os.path.join(data_path, '*.fits'))
+        if '_l1.fits' not in f.lower()
+    )
+
+
+def _add_common_arguments(parser):
+    parser.add_argument('--data-path', required=True, help='directory of the SUMER FITS files')
+    parser.add_argument('--files', nargs='+', default=None,
+                        help='FITS filenames (default: every non Level 1 .fits file in --data-path)')
+    parser.add_argument('--row-start', type=int, default=6, help='first calibrated row (default: 6)')
+    parser.add_argument('--row-end', type=int, default=323, help='last calibrated row (default: 323)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes (default: 1)')
+    parser.add_argument('--dtype', choices=['float64', 'float32'], default='float64',
+                        help='floating point type of the images (default: float64)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='content-addressed result cache to reuse and fill')
+    _add_logging_arguments(parser)
+
+
+def _add_logging_arguments(parser):
+    parser.add_argument('--log-level', default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='verbosity of the log on stderr (default: INFO)')
+    parser.add_argument('--metrics', default=None,
+                        help='JSON-lines file for per-row calibration metrics')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of `python -m ech`."""
+    parser = argparse.ArgumentParser(
+        prog='python -m ech',
+        description='Wavelength calibration and interpolation of SUMER spectral rasters.',
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    
+    # ---- calibrate ----------------------------------------------------------
+    calibrate = subparsers.add_parser(
+        'calibrate', help='compute the wavelength calibration of every row',
+        description='Compute the wavelength calibration (slope and intercept) of every row.',
+    )
+    _add_common_arguments(calibrate)
+    calibrate.add_argument('--row-binning', type=int, default=1,
+                           help='number of adjacent rows fitted together (default: 1)')
+    calibrate.add_argument('--bin-assignment', choices=['assign', 'interpolate'], default='assign',
+                           help='how binned results are mapped to the rows (default: assign)')
+    calibrate.add_argument('--centroid-mode', choices=['fit', 'xcorr'], default='fit',
+                           help='line centroids from full fits or cross-correlation (default: fit)')
+    calibrate.add_argument('--fit-method', choices=['trf', 'lm'], default='trf',
+                           help='bounded (trf) or unbounded (lm) line fits (default: trf)')
+    calibrate.add_argument('--qc-max-chi2', type=float, default=1e4,
+                           help='largest reduced chi-square of a line window passing the '
+                                'quality control (default: 1e4)')
+    calibrate.add_argument('--uncertainty', choices=['odr', 'bootstrap'], default='odr',
+                           help='slope and intercept uncertainties from the line fit or from '
+                                'refits of resampled spectra (default: odr)')
+    calibrate.add_argument('--n-bootstrap', type=int, default=200,
+                           help='number of resampled spectra of --uncertainty bootstrap (default: 200)')
+    calibrate.add_argument('--line-catalogue', default=None,
+                           help='JSON line catalogue (default: modules/line_catalogue.json)')
+    calibrate.add_argument('--lines', nargs='+', default=None,
+                           help='names of the catalogue lines to calibrate with '
+                                '(default: every line with a rest wavelength)')
+    calibrate.add_argument('--averaging', choices=['mean', 'sigma_clip'], default='mean',
+                           help='average of the exposures; sigma_clip rejects cosmic-ray hits '
+                                '(default: mean)')
+    calibrate.add_argument('--clip-sigma', type=float, default=3.0,
+                           help='rejection threshold of --averaging sigma_clip (default: 3.0)')
+    calibrate.add_argument('--incremental', action='store_true',
+                           help='re-fit only rows whose parameters or data changed since --output')
+    calibrate.add_argument('--output', default='calibration_results.npz',
+                           help='output path (default: calibration_results.npz)')
+    calibrate.add_argument('--format', choices=['npz', 'store'], default='npz',
+                           help='output format (default: npz)')
+    calibrate.set_defaults(func=run_calibrate)
+    
+    # ---- interpolate --------------------------------------------------------
+    interpolate = subparsers.add_parser(
+        'interpolate', help='interpolate the images to a common wavelength scale',
+        description='Interpolate every image to the wavelength scale of a reference row.',
+    )
+    _add_common_arguments(interpolate)
+    interpolate.add_argument('--calibration', required=True,
+                             help='calibration results written by the calibrate command')
+    interpolate.add_argument('--row-reference', type=int, default=120,
+                             help='row defining the common wavelength scale (default: 120)')
+    interpolate.add_argument('--streaming', action='store_true',
+                             help='keep only the running average in memory, not every image')
+    interpolate.add_argument('--images-dir', default=None,
+                             help='with --streaming, write every interpolated image to this directory')
+    interpolate.add_argument('--output', default='interpolation_results',
+                             help='output path (default: interpolation_results)')
+    interpolate.add_argument('--format', choices=['npz', 'npy', 'store'], default='npy',
+                             help='output format (default: npy)')
+    interpolate.set_defaults(func=run_interpolate)
+    
+    # ---- campaign -----------------------------------------------------------
+    campaign = subparsers.add_parser(
+        'campaign', help='calibrate and interpolate every observation set of a manifest',
+        description='Run calibration and interpolation over the observation sets of a '
+                    'JSON manifest (see utils/campaign.py for its format).',
+    )
+    campaign.add_argument('manifest', help='JSON manifest of the observation sets')
+    campaign.add_argument('--output-dir', required=True, help='output directory of the campaign')
+    campaign.add_argument('--workers', type=int, default=None,
+                          help='number of worker processes (default: number of CPUs)')
+    campaign.add_argument('--cache-dir', default=None,
+                          help='content-addressed cache for the calibrations')
+    campaign.add_argument('--no-resume', action='store_true',
+                          help='reprocess sets that are already done')
+    _add_logging_arguments(campaign)
+    campaign.set_defaults(func=run_campaign)
+    
+    # ---- serve --------------------------------------------------------------
+    serve = subparsers.add_parser(
+        'serve', help='run the resident calibration service',
+        description='Keep parameters, rasters and results in memory and answer calibration '
+                    'and interpolation requests (see utils/service.py for the protocol).',
+    )
+    address = serve.add_mutually_exclusive_group(required=True)
+    address.add_argument('--socket', default=None, help='Unix socket path to listen on')
+    address.add_argument('--http', default=None, metavar='HOST:PORT',
+                         help='HTTP address to listen on (e.g. 127.0.0.1:8765)')
+    serve.add_argument('--workers', type=int, default=1,
+                       help='number of worker processes per computation (default: 1)')
+    serve.add_argument('--cache-dir', default=None,
+                       help='content-addressed result cache backing the in-memory results')
+    serve.add_argument('--max-entries', type=int, default=16,
+                       help='results of each kind kept in memory (default: 16)')
+    _add_logging_arguments(serve)
+    serve.set_defaults(func=run_serve)
+    
+    return parser
+
+
+def run_calibrate(args) -> int:
+    """Run the calibrate command."""
+    from utils.calibration import CalibrationParameters
+    from utils.result_cache import ResultCache, cached_calibration
+    
+    files = _find_files(args.data_path, args.files)
+    if not files:
+        print(f"No FITS files found in {args.data_path}", file=sys.stderr)
+        return 1
+    
+    calibrator = CalibrationParameters(
+        row_start=args.row_start,
+        row_end=args.row_end,
+        row_binning=args.row_binning,
+        bin_assignment=args.bin_assignment,
+        centroid_mode=args.centroid_mode,
+        fit_method=args.fit_method,
+        qc_max_reduced_chi2=args.qc_max_chi2,
+        uncertainty=args.uncertainty,
+        n_bootstrap=args.n_bootstrap,
+        line_catalogue=args.line_catalogue,
+        lines=args.lines,
+        dtype=args.dtype,
+        averaging=args.averaging,
+        clip_sigma=args.clip_sigma,
+    )
+    if args.incremental:
+        calibrator.load_results(args.output)
+        calibrator.compute_calibration(args.data_path, files, incremental=True, n_workers=args.workers)
+    elif args.cache_dir is not None:
+        cache = ResultCache(args.cache_dir)
+        cached_calibration(calibrator, args.data_path, files, cache, n_workers=args.workers)
+    else:
+        calibrator.compute_calibration(args.data_path, files, n_workers=args.workers)
+    
+    calibrator.save_results(args.output, format=args.format)
+    return 0
+
+
+def run_interpolate(args) -> int:
+    """Run the interpolate command."""
+    from utils.calibration import CalibrationParameters
+    from utils.interpolations import PixelInterpolation
+    from utils.result_cache import ResultCache, cached_interpolation
+    
+    files = _find_files(args.data_path, args.files)
+    if not files:
+        print(f"No FITS files found in {args.data_path}", file=sys.stderr)
+        return 1
+    
+    calibrator = CalibrationParameters(row_start=args.row_start, row_end=args.row_end)
+    if not calibrator.load_results(args.calibration):
+        print(f"Could not load the calibration from {args.calibration}", file=sys.stderr)
+        return 1
+    slopes, _ = calibrator.get_slopes()
+    intercepts, _ = calibrator.get_intercepts()
+    
+    interpolator = PixelInterpolation(
+        row_reference=args.row_reference, show_progress=False, dtype=args.dtype,
+    )
+    # Calibrations saved before the covariances were kept give no wavelength uncertainties
+    interpolation_kwargs = dict(
+        row_start=args.row_start, row_end=args.row_end,
+        streaming=args.streaming, output_dir=args.images_dir, n_workers=args.workers,
+        covariances=calibrator.get_covariances(),
+    )
+    if args.cache_dir is not None:
+        cache = ResultCache(args.cache_dir)
+        cached_interpolation(
+            interpolator, args.data_path, files, slopes, intercepts, cache, **interpolation_kwargs
+        )
+    else:
+        interpolator.interpolate_data(args.data_path, files, slopes, intercepts, **interpolation_kwargs)
+    interpolator.save_results(args.output, format=args.format)
+    return 0
+
+
+def run_campaign(args) -> int:
+    """Run the campaign command."""
+    from utils.campaign import run_campaign as _run_campaign
+    
+    if not os.path.isfile(args.manifest):
+        print(f"Manifest not found: {args.manifest}", file=sys.stderr)
+        return 1
+    
+    index = _run_campaign(
+        args.manifest, args.output_dir, max_workers=args.workers,
+        cache_dir=args.cache_dir, resume=not args.no_resume,
+    )
+    failed = [s['name'] for s in index['observation_sets'] if s.get('status') == 'failed']
+    if failed:
+        print(f"{len(failed)} observation set(s) failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_serve(args) -> int:
+    """Run the serve command."""
+    from utils.service import serve
+    
+    address = f"unix:{args.socket}" if args.socket is not None else args.http
+    serve(address, cache_dir=args.cache_dir, n_workers=args.workers, max_entries=args.max_entries)
+    return 0
+
+
+def main(argv=None) -> int:
+    """Entry point of `python -m ech`."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    
+    from utils.log import configure_logging
+    configure_logging(args.log_level, metrics_path=args.metrics)
+    return args.func(args)
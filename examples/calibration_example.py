@@ -9,15 +9,21 @@ import os
 sys.path.insert(0, os.path.abspath('..'))
 
 from utils.calibration import CalibrationParameters
+from utils.result_cache import ResultCache, cached_calibration
+from utils.log import configure_logging
 import glob
 
 
 def main():
     """Example usage of CalibrationParameters class."""
     
+    # Pipeline messages at INFO level (use 'DEBUG' for per-row progress)
+    configure_logging('INFO', stream=sys.stdout)
+    
     # Configuration parameters
     DATA_PATH = '/home/mario/Documents/MPS_PhD/Equatorial_coronal_hole/data/soho/sumer/'  # Path to SUMER FITS files
-    OUTPUT_PATH = '../output/calibration_results.npz'  # Where to save/load results
+    OUTPUT_PATH = '../output/calibration_results.npz'  # Where to save results
+    CACHE_DIR = '../output/cache'  # Content-addressed result cache
     
     # Get all FITS files from the directory (exclude Level 1 files)
     all_files = sorted(glob.glob(os.path.join(DATA_PATH, '*.fits')))
@@ -36,28 +42,17 @@ def main():
         rough_pixel_estimates=[178., 279., 316., 321.],
     )
     
-    # Check if results already exist and load them
-    print(f"\nChecking for existing calibration results at {OUTPUT_PATH}...")
-    if os.path.exists(OUTPUT_PATH):
-        print("Found existing results. Loading...")
-        if calibrator.load_results(OUTPUT_PATH):
-            print("✓ Results loaded successfully!")
-        else:
-            print("⚠ Failed to load results. Computing calibration...")
-            calibrator.compute_calibration(
-                data_path=DATA_PATH,
-                sumer_filename_list=SUMER_FILES,
-            )
-            calibrator.save_results(OUTPUT_PATH)
+    # Load the calibration from the result cache if nothing it depends on has
+    # changed (file list, options, parameter JSON, code), otherwise compute it
+    cache = ResultCache(CACHE_DIR, max_entries=20)
+    print(f"\nChecking the result cache at {CACHE_DIR}...")
+    if cached_calibration(calibrator, DATA_PATH, SUMER_FILES, cache):
+        print("✓ Results loaded from cache!")
     else:
-        print("No existing results found. Computing calibration...")
-        # Compute calibration for specified rows
-        calibrator.compute_calibration(
-            data_path=DATA_PATH,
-            sumer_filename_list=SUMER_FILES,
-        )
-        # Save results for future use
-        calibrator.save_results(OUTPUT_PATH)
+        print("✓ Calibration computed and cached")
+    
+    # Save results for the interpolation example
+    calibrator.save_results(OUTPUT_PATH)
     
     # Access results
     slopes, slopes_unc = calibrator.get_slopes()
@@ -13,6 +13,8 @@ sys.path.insert(0, os.path.abspath('..'))
 
 from utils.calibration import CalibrationParameters
 from utils.interpolations import PixelInterpolation
+from utils.result_cache import ResultCache, cached_interpolation
+from utils.log import configure_logging
 import glob
 import numpy as np
 
@@ -20,10 +22,14 @@ import numpy as np
 def main():
     """Example usage of PixelInterpolation class."""
     
+    # Pipeline messages at INFO level (use 'DEBUG' for per-row progress)
+    configure_logging('INFO', stream=sys.stdout)
+    
     # Configuration parameters
     DATA_PATH = '/home/mario/Documents/MPS_PhD/Equatorial_coronal_hole/data/soho/sumer/'
     CALIBRATION_OUTPUT = '../output/calibration_results.npz'  # From calibration example
     INTERPOLATION_OUTPUT = '../output/interpolation_results.npz'  # Where to save interpolation results
+    CACHE_DIR = '../output/cache'  # Content-addressed result cache
     
     # Get all FITS files from the directory (exclude Level 1 files)
     all_files = sorted(glob.glob(os.path.join(DATA_PATH, '*.fits')))
@@ -70,36 +76,20 @@ def main():
     CAL_ROW_START = 6
     CAL_ROW_END = 323
     
-    # Check if interpolation results already exist
-    print(f"\nChecking for existing interpolation results at {INTERPOLATION_OUTPUT}...")
-    if os.path.exists(INTERPOLATION_OUTPUT):
-        print("Found existing results. Loading...")
-        if interpolator.load_results(INTERPOLATION_OUTPUT):
-            print("✓ Interpolation results loaded successfully!")
-        else:
-            print("⚠ Failed to load results. Computing interpolation...")
-            interpolator.interpolate_data(
-                data_path=DATA_PATH,
-                sumer_filename_list=SUMER_FILES,
-                slopes=slopes,
-                intercepts=intercepts,
-                row_start=CAL_ROW_START,
-                row_end=CAL_ROW_END,
-            )
-            interpolator.save_results(INTERPOLATION_OUTPUT)
+    # Load the interpolation from the result cache if nothing it depends on
+    # has changed (file list, calibration, options, code), otherwise compute it
+    cache = ResultCache(CACHE_DIR, max_entries=20)
+    print(f"\nChecking the result cache at {CACHE_DIR}...")
+    if cached_interpolation(
+        interpolator, DATA_PATH, SUMER_FILES, slopes, intercepts, cache,
+        row_start=CAL_ROW_START, row_end=CAL_ROW_END,
+    ):
+        print("✓ Interpolation results loaded from cache!")
     else:
-        print("No existing results found. Computing interpolation...")
-        # Perform interpolation
-        interpolator.interpolate_data(
-            data_path=DATA_PATH,
-            sumer_filename_list=SUMER_FILES,
-            slopes=slopes,
-            intercepts=intercepts,
-            row_start=CAL_ROW_START,
-            row_end=CAL_ROW_END,
-        )
-        # Save results for future use
-        interpolator.save_results(INTERPOLATION_OUTPUT)
+        print("✓ Interpolation computed and cached")
+    
+    # Save results for future use
+    interpolator.save_results(INTERPOLATION_OUTPUT)
     
     # ========================================================================
     # STEP 3: Display results
@@ -7,6 +7,7 @@ Python-based configuration module.
 """
 
 import json
+import hashlib
 from pathlib import Path
 from typing import Dict, List
 import shutil
@@ -91,13 +92,25 @@ def _load_parameters() -> tuple:
 # Load parameters once at module import time
 _CACHED_PARAMETERS = None
 _IS_NEW_FORMAT = None
+_CACHED_PARAMETERS_HASH = None
+_PARAMS_FILE_SIGNATURE = None
+
+
+def _params_file_signature():
+    """Size and modification time of the parameters file (None if missing)."""
+    try:
+        stat = PARAMS_FILE.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
 
 
 def _get_cached_parameters() -> tuple:
     """Get cached parameters, loading if necessary."""
-    global _CACHED_PARAMETERS, _IS_NEW_FORMAT
+    global _CACHED_PARAMETERS, _IS_NEW_FORMAT, _PARAMS_FILE_SIGNATURE
     if _CACHED_PARAMETERS is None:
         _CACHED_PARAMETERS, _IS_NEW_FORMAT = _load_parameters()
+        _PARAMS_FILE_SIGNATURE = _params_file_signature()
     return _CACHED_PARAMETERS, _IS_NEW_FORMAT
 
 
@@ -176,6 +189,55 @@ def get_parameters_dict() -> Dict:
     return params
 
 
+def get_parameters_hash() -> str:
+    """
+    Get a hash identifying the current parameter set.
+    
+    The hash is computed from a canonical JSON dump of the parsed parameters,
+    so formatting changes to the file do not change it but any edited value
+    does. The size and modification time of the file are checked on every
+    call: if the file changed since it was read, the parameters are reloaded
+    first, so the hash always describes the parameters in use.
+    
+    Returns
+    -------
+    str
+        SHA-256 hex digest of the parameters
+    """
+    global _CACHED_PARAMETERS_HASH
+    if _CACHED_PARAMETERS is not None and _params_file_signature() != _PARAMS_FILE_SIGNATURE:
+        reload_parameters()
+    if _CACHED_PARAMETERS_HASH is None:
+        params, _ = _get_cached_parameters()
+        canonical = json.dumps(
+            {str(k): v for k, v in params.items()}, sort_keys=True, separators=(',', ':')
+        )
+        _CACHED_PARAMETERS_HASH = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    return _CACHED_PARAMETERS_HASH
+
+
+def set_parameters(params: Dict, is_new_format: bool):
+    """
+    Install an already parsed parameter set instead of reading the JSON file.
+    
+    Used to share the parameters parsed once by a parent process with its
+    worker processes (see utils.campaign). They stand for the current
+    parameters file until it is modified (see `get_parameters_hash`).
+    
+    Parameters
+    ----------
+    params : dict
+        Parsed parameters (as returned by `get_parameters_dict`)
+    is_new_format : bool
+        Whether `params` uses the parameter_sets/row_mapping format
+    """
+    global _CACHED_PARAMETERS, _IS_NEW_FORMAT, _CACHED_PARAMETERS_HASH, _PARAMS_FILE_SIGNATURE
+    _CACHED_PARAMETERS = params
+    _IS_NEW_FORMAT = is_new_format
+    _CACHED_PARAMETERS_HASH = None
+    _PARAMS_FILE_SIGNATURE = _params_file_signature()
+
+
 def reload_parameters():
     """
     Reload parameters from disk (useful if file was modified externally).
@@ -184,9 +246,10 @@ def reload_parameters():
     useful if the calibration_parameters.json file is updated and you want
     to reload it without restarting Python.
     """
-    global _CACHED_PARAMETERS, _IS_NEW_FORMAT
+    global _CACHED_PARAMETERS, _IS_NEW_FORMAT, _CACHED_PARAMETERS_HASH
     _CACHED_PARAMETERS = None
     _IS_NEW_FORMAT = None
+    _CACHED_PARAMETERS_HASH = None
     return _get_cached_parameters()
 
 
@@ -0,0 +1,236 @@
+"""
+Calibration line catalogue - reads from JSON format.
+
+The catalogue lists the spectral lines the calibration knows about. Each
+line has a name, a rest wavelength (in nm, null for lines that are only
+fitted as blend partners), a rough pixel position, the half width in pixels
+of its fitting window and the names of the lines it must be fitted
+together with (its blend partners):
+
+{
+    "lines": [
+        {"name": "1537.94", "rest_wavelength": 153.7935, "rough_pixel": 178.0,
+         "half_width": 6.0, "blends": ["blend_182"]},
+        {"name": "blend_182", "rest_wavelength": null, "rough_pixel": 182.0,
+         "half_width": 4.0}
+    ]
+}
+
+A half width of null fits the whole interval of the row parameters holding
+the line, with all its gaussian components.
+
+For every row, `get_fit_windows` cuts the intervals of the row parameters
+(see calibration_params_loader) down to the windows of the lines in use:
+each line is anchored on the gaussian component nearest its rough pixel,
+its window is widened to cover the blend partners found in the same
+interval (a partner is found when a component lies within its own half
+width of its rough pixel), and overlapping windows are merged into one fit.
+Only the components whose half maximum reaches into a window are fitted,
+and the window is widened to one FWHM either side of their initial means.
+A window left with too few pixels for its components falls back to the
+whole interval. Intervals without a line in use are not fitted at all.
+"""
+
+import json
+import copy
+import numpy as np
+from pathlib import Path
+from typing import Dict, List
+
+
+# Get the directory where this module is located
+MODULE_DIR = Path(__file__).parent
+CATALOGUE_FILE = MODULE_DIR / 'line_catalogue.json'
+
+# Windows with fewer pixels per fitted parameter fall back to the whole interval
+MIN_POINTS_PER_PARAMETER = 1.5
+
+_CACHED_CATALOGUE = None
+
+
+def _validate_catalogue(catalogue: Dict) -> Dict:
+    """Check the catalogue entries and return a normalised copy."""
+    if not isinstance(catalogue, dict) or not isinstance(catalogue.get('lines'), list):
+        raise ValueError("A line catalogue must be a dict with a 'lines' list")
+    
+    lines = []
+    names = set()
+    for entry in catalogue['lines']:
+        name = entry.get('name')
+        if not name:
+            raise ValueError(f"Line catalogue entry without a name: {entry}")
+        if name in names:
+            raise ValueError(f"Duplicate line {name!r} in the line catalogue")
+        if entry.get('rough_pixel') is None:
+            raise ValueError(f"Line {name!r} of the catalogue has no rough_pixel")
+        names.add(name)
+        
+        rest_wavelength = entry.get('rest_wavelength')
+        half_width = entry.get('half_width')
+        lines.append({
+            'name': str(name),
+            'rest_wavelength': None if rest_wavelength is None else float(rest_wavelength),
+            'rough_pixel': float(entry['rough_pixel']),
+            'half_width': None if half_width is None else float(half_width),
+            'blends': [str(b) for b in entry.get('blends', [])],
+        })
+    
+    for line in lines:
+        unknown = [b for b in line['blends'] if b not in names]
+        if unknown:
+            raise ValueError(f"Line {line['name']!r} blends with unknown lines {unknown}")
+    
+    return {'lines': lines}
+
+
+def load_line_catalogue(catalogue=None) -> Dict:
+    """
+    Load a line catalogue.
+    
+    Parameters
+    ----------
+    catalogue : str, Path or dict, default=None
+        Path to a JSON catalogue, or an already parsed catalogue. The
+        catalogue shipped in modules/line_catalogue.json if None.
+    
+    Returns
+    -------
+    dict
+        Validated catalogue: {'lines': [entry, ...]} with every field present
+    
+    Raises
+    ------
+    ValueError
+        If an entry is incomplete, duplicated or blends with an unknown line
+    """
+    global _CACHED_CATALOGUE
+    if catalogue is None:
+        if _CACHED_CATALOGUE is None:
+            with open(CATALOGUE_FILE, 'r') as f:
+                _CACHED_CATALOGUE = _validate_catalogue(json.load(f))
+        return copy.deepcopy(_CACHED_CATALOGUE)
+    
+    if isinstance(catalogue, (str, Path)):
+        with open(catalogue, 'r') as f:
+            catalogue = json.load(f)
+    return _validate_catalogue(catalogue)
+
+
+def get_line(catalogue: Dict, name: str) -> Dict:
+    """Get the catalogue entry of one line (ValueError if it is not catalogued)."""
+    for line in catalogue['lines']:
+        if line['name'] == name:
+            return line
+    raise ValueError(
+        f"Line {name!r} not in the line catalogue. "
+        f"Available lines: {[line['name'] for line in catalogue['lines']]}"
+    )
+
+
+def get_calibration_lines(catalogue: Dict) -> List[str]:
+    """Names of the lines with a rest wavelength, in catalogue order."""
+    return [line['name'] for line in catalogue['lines'] if line['rest_wavelength'] is not None]
+
+
+def _nearest_component(components: list, pixel: float):
+    """Component (interval_str, index, mean) whose initial mean is nearest `pixel`."""
+    return min(components, key=lambda component: abs(component[2] - pixel))
+
+
+def get_fit_windows(params: Dict, catalogue: Dict, names: List[str]) -> tuple:
+    """
+    Cut the fit intervals of one row down to the windows of the lines in use.
+    
+    Parameters
+    ----------
+    params : dict
+        Parameters of the row (see calibration_params_loader.get_parameters_for_row)
+    catalogue : dict
+        Line catalogue (see `load_line_catalogue`)
+    names : list of str
+        Lines in use
+    
+    Returns
+    -------
+    tuple
+        (idx_interval_dic, init_parameters_dic) in the format of the row
+        parameters, with one entry per fitting window. Windows keep the key
+        of their interval, or get '<interval>.<n>' when an interval holds
+        several separate windows.
+    """
+    idx_interval_dic = params['idx_interval']
+    init_parameters_dic = params['init_parameters']
+    components = [
+        (interval_str, k, init_parameters_dic[interval_str][3*k + 2])
+        for interval_str in sorted(idx_interval_dic.keys())
+        for k in range((len(init_parameters_dic[interval_str]) - 1) // 3)
+    ]
+    
+    # ---- Window of every line, widened to cover its blend partners ----------
+    windows = {}
+    for name in names:
+        line = get_line(catalogue, name)
+        interval_str, _, mean = _nearest_component(components, line['rough_pixel'])
+        first, last = idx_interval_dic[interval_str]
+        if line['half_width'] is None:
+            windows.setdefault(interval_str, []).append([first, last])
+            continue
+        
+        low, high = mean - line['half_width'], mean + line['half_width']
+        same_interval = [c for c in components if c[0] == interval_str]
+        for partner_name in line['blends']:
+            partner = get_line(catalogue, partner_name)
+            if partner['half_width'] is None:
+                low, high = first, last
+                continue
+            _, _, partner_mean = _nearest_component(same_interval, partner['rough_pixel'])
+            if abs(partner_mean - partner['rough_pixel']) <= partner['half_width']:
+                low = min(low, partner_mean - partner['half_width'])
+                high = max(high, partner_mean + partner['half_width'])
+        windows.setdefault(interval_str, []).append(
+            [max(first, int(np.floor(low))), min(last, int(np.ceil(high)))]
+        )
+    
+    # ---- Merge overlapping windows and keep the components inside them -----
+    window_idx_interval, window_init_parameters = {}, {}
+    for interval_str in sorted(windows.keys()):
+        merged = []
+        for low, high in sorted(windows[interval_str]):
+            if merged and low <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], high)
+            else:
+                merged.append([low, high])
+        
+        first, last = idx_interval_dic[interval_str]
+        init_parameters = init_parameters_dic[interval_str]
+        for n, (low, high) in enumerate(merged):
+            # Components reaching into the window are fitted out to one FWHM from their means
+            while True:
+                inside = [
+                    k for component_interval, k, mean in components
+                    if component_interval == interval_str
+                    and low - init_parameters[3*k + 3] / 2 <= mean <= high + init_parameters[3*k + 3] / 2
+                ]
+                widened_low = min([low] + [
+                    int(np.floor(init_parameters[3*k + 2] - init_parameters[3*k + 3])) for k in inside
+                ])
+                widened_high = max([high] + [
+                    int(np.ceil(init_parameters[3*k + 2] + init_parameters[3*k + 3])) for k in inside
+                ])
+                widened_low, widened_high = max(first, widened_low), min(last, widened_high)
+                if (widened_low, widened_high) == (low, high):
+                    break
+                low, high = widened_low, widened_high
+            
+            # Crowded windows are fitted over the whole interval
+            if high - low + 1 < MIN_POINTS_PER_PARAMETER * (3 * len(inside) + 1):
+                low, high = first, last
+                inside = [k for component_interval, k, _ in components if component_interval == interval_str]
+            
+            key = interval_str if len(merged) == 1 else f"{interval_str}.{n}"
+            window_idx_interval[key] = [low, high]
+            window_init_parameters[key] = [init_parameters[0]] + [
+                value for k in inside for value in init_parameters[3*k + 1:3*k + 4]
+            ]
+    
+    return window_idx_interval, window_init_parameters
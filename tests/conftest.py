@@ -0,0 +1,40 @@
+"""
+Shared fixtures: a small synthetic raster (see benchmarks.synthetic) whose
+true calibration is known.
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_calibration, write_synthetic_raster
+
+
+# Rows calibrated by the tests (a short range keeps the fits fast)
+ROW_START = 116
+ROW_END = 124
+ROW_REFERENCE = 120
+
+
+@pytest.fixture(scope='session')
+def synthetic_raster(tmp_path_factory):
+    """(data_path, filenames) of a two-exposure synthetic raster."""
+    data_path = tmp_path_factory.mktemp('synthetic_raster')
+    filenames = write_synthetic_raster(str(data_path), n_images=2, seed=0)
+    return str(data_path), filenames
+
+
+@pytest.fixture(scope='session')
+def calibrated(synthetic_raster):
+    """Calibrator fitted on ROW_START to ROW_END of the synthetic raster."""
+    from utils.calibration import CalibrationParameters
+    
+    data_path, filenames = synthetic_raster
+    calibrator = CalibrationParameters(row_start=ROW_START, row_end=ROW_END)
+    calibrator.compute_calibration(data_path, filenames)
+    return calibrator
+
+
+@pytest.fixture(scope='session')
+def true_calibration():
+    """True (slopes, intercepts) of the rows ROW_START to ROW_END."""
+    return synthetic_calibration(np.arange(ROW_START, ROW_END + 1))
@@ -0,0 +1,50 @@
+"""The asyncio pipeline gives the results of the synchronous one."""
+
+import asyncio
+
+import numpy as np
+
+from tests.conftest import ROW_END, ROW_REFERENCE, ROW_START
+from utils.async_pipeline import calibrate_async, interpolate_async
+from utils.calibration import CalibrationParameters
+from utils.interpolations import PixelInterpolation
+
+
+def test_calibrate_async_matches_sync(synthetic_raster, calibrated):
+    data_path, filenames = synthetic_raster
+    calibrator = CalibrationParameters(row_start=ROW_START, row_end=ROW_END)
+    asyncio.run(calibrate_async(calibrator, data_path, filenames, n_workers=1))
+    
+    assert calibrator.row_list == calibrated.row_list
+    np.testing.assert_array_equal(calibrator.get_slopes(), calibrated.get_slopes())
+    np.testing.assert_array_equal(calibrator.get_intercepts(), calibrated.get_intercepts())
+    np.testing.assert_array_equal(calibrator.get_covariances(), calibrated.get_covariances())
+
+
+def test_interpolate_async_matches_sync(synthetic_raster, calibrated):
+    data_path, filenames = synthetic_raster
+    slopes, intercepts = calibrated.get_slopes()[0], calibrated.get_intercepts()[0]
+    interpolator = PixelInterpolation(row_reference=ROW_REFERENCE, show_progress=False)
+    interpolator.interpolate_data(
+        data_path, filenames, slopes, intercepts, row_start=ROW_START, row_end=ROW_END
+    )
+    async_interpolator = PixelInterpolation(row_reference=ROW_REFERENCE, show_progress=False)
+    asyncio.run(interpolate_async(
+        async_interpolator, data_path, filenames, slopes, intercepts,
+        row_start=ROW_START, row_end=ROW_END, n_workers=1,
+    ))
+    
+    np.testing.assert_array_equal(async_interpolator.reference_wavelength, interpolator.reference_wavelength)
+    np.testing.assert_array_equal(
+        async_interpolator.spectral_image_interpolated_average,
+        interpolator.spectral_image_interpolated_average,
+    )
+    np.testing.assert_array_equal(
+        async_interpolator.spectral_image_unc_interpolated_average,
+        interpolator.spectral_image_unc_interpolated_average,
+    )
+    assert len(async_interpolator.spectral_image_interpolated_list) == len(filenames)
+    for async_image, image in zip(
+        async_interpolator.spectral_image_interpolated_list, interpolator.spectral_image_interpolated_list
+    ):
+        np.testing.assert_array_equal(async_image, image)
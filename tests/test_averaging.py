@@ -0,0 +1,26 @@
+"""Raster average of CalibrationParameters, folded one exposure at a time."""
+
+import numpy as np
+
+from utils.calibration import CalibrationParameters
+
+
+def test_average_equals_masked_mean_of_exposures(synthetic_raster):
+    data_path, filenames = synthetic_raster
+    calibrator = CalibrationParameters()
+    calibrator._load_data(data_path, filenames)
+    
+    frames = [calibrator._load_frame(data_path, filename) for filename in filenames]
+    data = np.ma.stack([np.ma.asarray(frame[0]) for frame in frames])
+    data_unc = np.ma.stack([np.ma.asarray(frame[1]) for frame in frames])
+    expected = data.mean(axis=0)
+    expected_unc = np.sqrt(np.sum(data_unc**2, axis=0)) / data.count(axis=0)
+    
+    average = calibrator._raster_average
+    assert np.ma.getmaskarray(average).any()
+    np.testing.assert_array_equal(np.ma.getmaskarray(average), np.ma.getmaskarray(expected))
+    valid = ~np.ma.getmaskarray(expected)
+    np.testing.assert_allclose(np.asarray(average)[valid], np.asarray(expected)[valid], rtol=1e-12)
+    np.testing.assert_allclose(
+        np.asarray(calibrator._raster_average_unc)[valid], np.asarray(expected_unc)[valid], rtol=1e-12
+    )
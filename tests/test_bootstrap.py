@@ -0,0 +1,54 @@
+"""Batched fits of utils.bootstrap against the scipy fits they replace."""
+
+import numpy as np
+import pytest
+from scipy.optimize import curve_fit
+
+from utils.bootstrap import bootstrap_calibration_lines, fit_multigaussian_batch
+from utils.calibration import CalibrationParameters
+
+
+# Background and two blended lines (amplitude, mean, FWHM) of a fitting window
+TRUE_PARAMS = np.array([1.0, 40.0, 178.3, 2.6, 12.0, 182.1, 3.1])
+START_PARAMS = np.array([0.8, 30.0, 177.5, 3.0, 15.0, 182.8, 2.5])
+X_PIXELS = np.arange(168.0, 192.0)
+
+
+@pytest.mark.parametrize('bounded', [False, True])
+def test_fit_multigaussian_batch_matches_curve_fit(bounded):
+    y = CalibrationParameters._multigaussian_for_curvefit(X_PIXELS, *TRUE_PARAMS)
+    y_unc = np.sqrt(y) / 10
+    if bounded:
+        lower, upper, _ = CalibrationParameters._interval_bounds(X_PIXELS, START_PARAMS)
+        bounds = (lower, upper)
+    else:
+        lower = upper = None
+        bounds = (-np.inf, np.inf)
+    
+    popt, _ = curve_fit(
+        CalibrationParameters._multigaussian_for_curvefit, X_PIXELS, y,
+        p0=START_PARAMS, sigma=y_unc, absolute_sigma=True, bounds=bounds,
+    )
+    params, converged = fit_multigaussian_batch(
+        X_PIXELS, np.tile(y, (3, 1)), y_unc, START_PARAMS, lower, upper
+    )
+    
+    assert converged.all()
+    np.testing.assert_allclose(params, np.tile(popt, (3, 1)), rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(params[0], TRUE_PARAMS, rtol=1e-6)
+
+
+def test_bootstrap_calibration_lines_matches_odr():
+    calibrator = CalibrationParameters(row_start=120, row_end=120)
+    rng = np.random.default_rng(0)
+    means_unc_px = np.full(len(calibrator.rest_wavelengths), 0.05)
+    means_px = (
+        (np.asarray(calibrator.rest_wavelengths) - 153.05) / 0.0042
+        + rng.normal(0, 0.05, len(means_unc_px))
+    )
+    
+    slope, intercept, _ = calibrator._fit_calibration_line(list(means_px), list(means_unc_px))
+    slopes, intercepts = bootstrap_calibration_lines(
+        means_px[None, :], calibrator.rest_wavelengths, means_unc_px
+    )
+    np.testing.assert_allclose([slopes[0], intercepts[0]], [slope, intercept], rtol=1e-6)
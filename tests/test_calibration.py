@@ -0,0 +1,89 @@
+"""Line fits: solver and status of the bounded fits, quality control and re-seeding."""
+
+import numpy as np
+import pytest
+
+from tests.conftest import ROW_END, ROW_REFERENCE, ROW_START
+from utils.calibration import CalibrationParameters
+
+
+BROKEN_ROW = ROW_REFERENCE
+
+
+@pytest.fixture
+def broken_row(monkeypatch):
+    """Give BROKEN_ROW initial FWHMs far too narrow for its lines."""
+    get_row_parameters = CalibrationParameters._get_row_parameters
+    
+    def _get_row_parameters(self, row):
+        params = get_row_parameters(self, row)
+        if row == BROKEN_ROW:
+            for init_parameters in params['init_parameters'].values():
+                init_parameters[3::3] = [fwhm / 4 for fwhm in init_parameters[3::3]]
+        return params
+    
+    monkeypatch.setattr(CalibrationParameters, '_get_row_parameters', _get_row_parameters)
+
+
+def _calibrate(synthetic_raster, **attributes):
+    data_path, filenames = synthetic_raster
+    calibrator = CalibrationParameters(row_start=ROW_START, row_end=ROW_END)
+    for name, value in attributes.items():
+        setattr(calibrator, name, value)
+    calibrator.compute_calibration(data_path, filenames)
+    return calibrator
+
+
+def test_broken_row_fails_without_reseeding(broken_row, synthetic_raster):
+    calibrator = _calibrate(synthetic_raster, QC_RESEED_OFFSETS=())
+    idx = calibrator.row_list.index(BROKEN_ROW)
+    
+    assert calibrator.qc_reason_list[idx] == 'fwhm_out_of_range'
+    assert np.isnan(calibrator.pixelscale_list[idx])
+    assert calibrator.get_qc_failures() == [{'row': BROKEN_ROW, 'reason': 'fwhm_out_of_range'}]
+
+
+def test_reseeding_recovers_broken_row(broken_row, synthetic_raster, calibrated):
+    calibrator = _calibrate(synthetic_raster)
+    idx = calibrator.row_list.index(BROKEN_ROW)
+    
+    assert calibrator.reseeded_rows == [BROKEN_ROW]
+    assert calibrator.get_qc_failures() == []
+    # The re-seeded fit reaches the solution of the intact row
+    np.testing.assert_allclose(
+        calibrator.pixelscale_list[idx], calibrated.pixelscale_list[idx],
+        atol=1e-3 * calibrated.pixelscale_unc_list[idx],
+    )
+    np.testing.assert_allclose(
+        calibrator.pixelscale_intercept_list[idx], calibrated.pixelscale_intercept_list[idx],
+        atol=1e-3 * calibrated.pixelscale_intercept_unc_list[idx],
+    )
+
+
+
+@pytest.mark.parametrize('background, solver', [(5.0, 'lm'), (-0.01, 'trf')])
+def test_bounded_fit_solver_and_status(background, solver):
+    calibrator = CalibrationParameters()
+    x_data = np.arange(40.0)
+    true_parameters = [background, 100.0, 15.0, 3.0, 10.0, 27.0, 3.0]
+    y_data = CalibrationParameters._multigaussian_for_curvefit(x_data, *true_parameters)
+    init_parameters = [1.0, 80.0, 15.5, 3.5, 8.0, 26.5, 3.5]
+    
+    popt, _, status, fit_solver = calibrator._fit_interval_bounded(
+        x_data, y_data, np.ones_like(x_data), init_parameters
+    )
+    
+    # A background below zero leaves the Levenberg-Marquardt fit outside the
+    # bounds; the bounded fit then pins it at zero, which is not at_bound
+    assert fit_solver == solver
+    assert status == 'converged'
+    assert popt[0] == pytest.approx(max(background, 0.0), abs=1e-6)
+    np.testing.assert_allclose(popt[2::3], true_parameters[2::3], atol=1e-3)
+
+
+def test_mean_on_window_edge_is_at_bound():
+    x_data = np.arange(40.0)
+    lower, upper, _ = CalibrationParameters._interval_bounds(x_data, [0.0, 100.0, 15.0, 3.0])
+    
+    assert not CalibrationParameters._means_or_fwhms_at_bound(np.array([0.0, 100.0, 15.0, 3.0]), lower, upper)
+    assert CalibrationParameters._means_or_fwhms_at_bound(np.array([5.0, 0.0, 39.0, 3.0]), lower, upper)
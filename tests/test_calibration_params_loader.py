@@ -0,0 +1,37 @@
+"""The parameter hash follows edits of the parameters file."""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from modules import calibration_params_loader
+
+
+@pytest.fixture
+def params_file(tmp_path, monkeypatch):
+    """Point the loader to a copy of the parameters file."""
+    path = tmp_path / 'calibration_parameters.json'
+    shutil.copy(calibration_params_loader.PARAMS_FILE, path)
+    monkeypatch.setattr(calibration_params_loader, 'PARAMS_FILE', path)
+    calibration_params_loader.reload_parameters()
+    yield path
+    monkeypatch.undo()
+    calibration_params_loader.reload_parameters()
+
+
+def test_parameters_hash_follows_file_edits(params_file):
+    parameters_hash = calibration_params_loader.get_parameters_hash()
+    row = calibration_params_loader.get_all_rows()[0]
+    assert calibration_params_loader.get_parameters_hash() == parameters_hash
+    
+    data = json.loads(params_file.read_text())
+    data[str(row)]['bckg_fit'] += 1.0
+    params_file.write_text(json.dumps(data))
+    stat = params_file.stat()
+    os.utime(params_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    # No reload_parameters: the edit is picked up by the next hash
+    assert calibration_params_loader.get_parameters_hash() != parameters_hash
+    assert calibration_params_loader.get_parameters_for_row(row)['bckg_fit'] == data[str(row)]['bckg_fit']
@@ -0,0 +1,56 @@
+"""Incremental calibration refits only the rows whose fingerprint changed."""
+
+import numpy as np
+
+from tests.conftest import ROW_END, ROW_REFERENCE, ROW_START
+from utils.calibration import CalibrationParameters
+
+
+CHANGED_ROW = ROW_REFERENCE
+
+
+def _results(calibrator):
+    """Slopes, intercepts, their uncertainties and covariances, by row."""
+    return {
+        row: (
+            calibrator.pixelscale_list[i], calibrator.pixelscale_unc_list[i],
+            calibrator.pixelscale_intercept_list[i], calibrator.pixelscale_intercept_unc_list[i],
+            calibrator.pixelscale_intercept_cov_list[i],
+        )
+        for i, row in enumerate(calibrator.row_list)
+    }
+
+
+def test_changed_row_is_the_only_refit(synthetic_raster, monkeypatch):
+    data_path, filenames = synthetic_raster
+    calibrator = CalibrationParameters(row_start=ROW_START, row_end=ROW_END)
+    calibrator.compute_calibration(data_path, filenames, incremental=True)
+    assert calibrator.refitted_rows == list(range(ROW_START, ROW_END + 1))
+    before = _results(calibrator)
+    
+    # Move the initial means of one row by a tenth of a pixel
+    get_row_parameters = CalibrationParameters._get_row_parameters
+    
+    def _get_row_parameters(self, row):
+        params = get_row_parameters(self, row)
+        if row == CHANGED_ROW:
+            for init_parameters in params['init_parameters'].values():
+                init_parameters[2::3] = [mean + 0.1 for mean in init_parameters[2::3]]
+        return params
+    
+    monkeypatch.setattr(CalibrationParameters, '_get_row_parameters', _get_row_parameters)
+    calibrator.compute_calibration(data_path, filenames, incremental=True)
+    after = _results(calibrator)
+    
+    assert calibrator.refitted_rows == [CHANGED_ROW]
+    assert list(after) == list(before)
+    for row in before:
+        if row != CHANGED_ROW:
+            assert after[row] == before[row]
+    # The refitted row converges to the same solution from the moved guesses
+    np.testing.assert_allclose(after[CHANGED_ROW][0], before[CHANGED_ROW][0], atol=1e-3 * before[CHANGED_ROW][1])
+    
+    # Without changes, nothing is refitted
+    calibrator.compute_calibration(data_path, filenames, incremental=True)
+    assert calibrator.refitted_rows == []
+    assert _results(calibrator) == after
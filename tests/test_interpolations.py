@@ -0,0 +1,65 @@
+"""Propagation of the calibration covariances into the interpolated wavelengths."""
+
+import numpy as np
+import pytest
+
+from tests.conftest import ROW_END, ROW_REFERENCE, ROW_START
+from utils.calibration import CalibrationParameters
+from utils.interpolations import PixelInterpolation
+
+
+@pytest.fixture(scope='module')
+def interpolated(synthetic_raster, calibrated):
+    data_path, filenames = synthetic_raster
+    interpolator = PixelInterpolation(row_reference=ROW_REFERENCE, show_progress=False)
+    interpolator.interpolate_data(
+        data_path, filenames, calibrated.get_slopes()[0], calibrated.get_intercepts()[0],
+        row_start=ROW_START, row_end=ROW_END, covariances=calibrated.get_covariances(),
+    )
+    return interpolator
+
+
+def test_covariances_match_uncertainties(calibrated, tmp_path):
+    covariances = calibrated.get_covariances()
+    assert covariances.shape == (ROW_END - ROW_START + 1, 2, 2)
+    np.testing.assert_allclose(covariances[:, 0, 0], calibrated.get_slopes()[1]**2)
+    np.testing.assert_allclose(covariances[:, 1, 1], calibrated.get_intercepts()[1]**2)
+    np.testing.assert_array_equal(covariances[:, 0, 1], covariances[:, 1, 0])
+    
+    calibrated.save_results(str(tmp_path / 'calibration.npz'))
+    loaded = CalibrationParameters(row_start=ROW_START, row_end=ROW_END)
+    assert loaded.load_results(str(tmp_path / 'calibration.npz'))
+    np.testing.assert_array_equal(loaded.get_covariances(), covariances)
+
+
+def test_wavelength_unc_matches_monte_carlo(interpolated, calibrated):
+    slopes, intercepts = calibrated.get_slopes()[0], calibrated.get_intercepts()[0]
+    covariances = calibrated.get_covariances()
+    wavelength_unc = interpolated.wavelength_unc
+    
+    # Only the calibrated rows have uncertainties, where the images have data
+    assert np.all(np.isnan(wavelength_unc[:ROW_START]))
+    assert np.all(np.isnan(wavelength_unc[ROW_END + 1:]))
+    average = interpolated.spectral_image_interpolated_average[ROW_START:ROW_END + 1]
+    np.testing.assert_array_equal(
+        np.isfinite(wavelength_unc[ROW_START:ROW_END + 1]), np.isfinite(average)
+    )
+    
+    # Wavelength of the source pixel of every grid point, for calibrations
+    # drawn from the covariance of each row
+    rng = np.random.default_rng(0)
+    for k, row in enumerate(range(ROW_START, ROW_END + 1)):
+        draws = rng.multivariate_normal([slopes[k], intercepts[k]], covariances[k], 20000)
+        pixels = (interpolated.reference_wavelength - intercepts[k]) / slopes[k]
+        monte_carlo = np.std(draws[:, :1] * pixels[None, :] + draws[:, 1:], axis=0)
+        inside = np.isfinite(wavelength_unc[row])
+        np.testing.assert_allclose(wavelength_unc[row][inside], monte_carlo[inside], rtol=0.03)
+
+
+@pytest.mark.parametrize('format', ['npz', 'npy', 'store'])
+def test_wavelength_unc_round_trip(interpolated, tmp_path, format):
+    path = str(tmp_path / ('interpolation.npz' if format == 'npz' else 'interpolation'))
+    interpolated.save_results(path, format=format)
+    loaded = PixelInterpolation()
+    assert loaded.load_results(path)
+    np.testing.assert_array_equal(np.asarray(loaded.wavelength_unc), interpolated.wavelength_unc)
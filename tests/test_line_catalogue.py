@@ -0,0 +1,51 @@
+"""Fitting windows cut from the row parameters by modules.line_catalogue."""
+
+import pytest
+
+from modules.line_catalogue import get_fit_windows, load_line_catalogue
+
+
+CATALOGUE = {'lines': [
+    {'name': 'A', 'rest_wavelength': 153.79, 'rough_pixel': 178.0, 'half_width': 3.0,
+     'blends': ['A_blend']},
+    {'name': 'A_blend', 'rest_wavelength': None, 'rough_pixel': 182.0, 'half_width': 2.0},
+    {'name': 'B', 'rest_wavelength': 154.22, 'rough_pixel': 279.0, 'half_width': 3.0},
+    {'name': 'C', 'rest_wavelength': 154.37, 'rough_pixel': 316.0, 'half_width': None},
+]}
+
+PARAMS = {
+    'idx_interval': {'0': [165, 200], '1': [270, 290], '2': [305, 330]},
+    'init_parameters': {
+        '0': [1.0, 40.0, 178.2, 2.5, 12.0, 182.3, 2.5, 8.0, 194.0, 2.0],
+        '1': [1.0, 30.0, 279.1, 2.4, 5.0, 286.0, 2.0],
+        '2': [1.0, 20.0, 316.0, 2.6, 15.0, 321.0, 2.6],
+    },
+}
+
+
+def test_windows_cover_lines_and_blend_partners():
+    idx_interval, init_parameters = get_fit_windows(
+        PARAMS, load_line_catalogue(CATALOGUE), ['A', 'B', 'C']
+    )
+    
+    # A is widened to its blend partner, then to one FWHM around both
+    # components; the component at 194 does not reach into the window
+    assert idx_interval['0'] == [175, 185]
+    assert init_parameters['0'] == [1.0, 40.0, 178.2, 2.5, 12.0, 182.3, 2.5]
+    # B keeps its half width and drops the component at 286
+    assert idx_interval['1'] == [276, 283]
+    assert init_parameters['1'] == [1.0, 30.0, 279.1, 2.4]
+    # A null half width fits the whole interval
+    assert idx_interval['2'] == [305, 330]
+    assert init_parameters['2'] == PARAMS['init_parameters']['2']
+
+
+def test_intervals_without_lines_in_use_are_not_fitted():
+    idx_interval, init_parameters = get_fit_windows(PARAMS, load_line_catalogue(CATALOGUE), ['B'])
+    assert list(idx_interval) == ['1'] and list(init_parameters) == ['1']
+
+
+def test_blend_with_unknown_line_is_rejected():
+    catalogue = {'lines': [dict(CATALOGUE['lines'][0], blends=['missing'])]}
+    with pytest.raises(ValueError, match='unknown lines'):
+        load_line_catalogue(catalogue)
@@ -0,0 +1,129 @@
+"""Cache keys of utils.result_cache: a hit exactly when nothing the result depends on changed."""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from tests.conftest import ROW_END, ROW_REFERENCE, ROW_START
+from utils.calibration import CalibrationParameters
+from utils.interpolations import PixelInterpolation
+from utils.result_cache import ResultCache, cached_calibration, cached_interpolation
+
+
+def _interpolate(cache, synthetic_raster, calibrated, options=None, row_end=ROW_END, **kwargs):
+    """Run `cached_interpolation` on the synthetic raster; (hit, interpolator)."""
+    data_path, filenames = synthetic_raster
+    interpolator = PixelInterpolation(
+        **{'row_reference': ROW_REFERENCE, 'show_progress': False, **(options or {})}
+    )
+    n_rows = row_end - ROW_START + 1
+    hit = cached_interpolation(
+        interpolator, data_path, filenames,
+        calibrated.get_slopes()[0][:n_rows], calibrated.get_intercepts()[0][:n_rows], cache,
+        row_start=ROW_START, row_end=row_end, **kwargs
+    )
+    return hit, interpolator
+
+
+def test_calibration_cache_hit_and_option_miss(tmp_path, synthetic_raster):
+    data_path, filenames = synthetic_raster
+    cache = ResultCache(str(tmp_path / 'cache'))
+    
+    def run(**options):
+        calibrator = CalibrationParameters(row_start=ROW_REFERENCE, row_end=ROW_REFERENCE, **options)
+        return cached_calibration(calibrator, data_path, filenames, cache), calibrator
+    
+    assert not run()[0]
+    hit, calibrator = run()
+    assert hit
+    assert calibrator.get_covariances().shape == (1, 2, 2)
+    assert not run(fit_method='lm')[0]
+    assert not run(qc_max_reduced_chi2=10.0)[0]
+
+
+@pytest.mark.parametrize('kwargs, hit', [
+    ({}, True),
+    ({'n_workers': 2}, True),
+    ({'streaming': True}, False),
+    ({'row_end': ROW_END - 1}, False),
+    ({'options': {'row_reference': ROW_REFERENCE + 1}}, False),
+    ({'options': {'dtype': np.float32}}, False),
+])
+def test_interpolation_cache_kwargs(tmp_path, synthetic_raster, calibrated, kwargs, hit):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert not _interpolate(cache, synthetic_raster, calibrated)[0]
+    assert _interpolate(cache, synthetic_raster, calibrated, **kwargs)[0] == hit
+
+
+def test_interpolation_cache_hit_propagates_covariances(tmp_path, synthetic_raster, calibrated):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    covariances = calibrated.get_covariances()
+    hit, computed = _interpolate(cache, synthetic_raster, calibrated, covariances=covariances)
+    assert not hit
+    assert computed.wavelength_unc is not None
+    
+    hit, interpolator = _interpolate(cache, synthetic_raster, calibrated)
+    assert hit
+    assert interpolator.wavelength_unc is None
+    
+    hit, interpolator = _interpolate(cache, synthetic_raster, calibrated, covariances=2 * covariances)
+    assert hit
+    np.testing.assert_allclose(
+        interpolator.wavelength_unc, np.sqrt(2) * computed.wavelength_unc, equal_nan=True
+    )
+
+
+def test_streaming_entry_does_not_answer_full_request(tmp_path, synthetic_raster, calibrated):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert not _interpolate(cache, synthetic_raster, calibrated, streaming=True)[0]
+    
+    hit, interpolator = _interpolate(cache, synthetic_raster, calibrated)
+    assert not hit
+    assert len(interpolator.spectral_image_interpolated_list) == len(synthetic_raster[1])
+    
+    hit, interpolator = _interpolate(cache, synthetic_raster, calibrated, streaming=True)
+    assert hit
+    assert len(interpolator.spectral_image_interpolated_list) == 0
+
+
+def test_output_dir_bypasses_cache(tmp_path, synthetic_raster, calibrated):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    assert not _interpolate(cache, synthetic_raster, calibrated, streaming=True)[0]
+    
+    images_dir = tmp_path / 'images'
+    hit, _ = _interpolate(
+        cache, synthetic_raster, calibrated, streaming=True, output_dir=str(images_dir)
+    )
+    assert not hit
+    assert len([f for f in os.listdir(images_dir) if f.endswith('_interp.npy')]) == len(synthetic_raster[1])
+
+
+@pytest.mark.parametrize('name', [
+    'utils/calibration.py', 'utils/interpolations.py', 'utils/bootstrap.py',
+    'modules/line_catalogue.py', 'modules/calibration_params_loader.py',
+])
+def test_code_version_covers_pipeline_module(tmp_path, monkeypatch, name):
+    from utils import result_cache
+    
+    root = Path(result_cache.__file__).parent.parent
+    assert root / name in result_cache.CODE_FILES
+    
+    # Editing any hashed module changes the code version
+    copies = []
+    for code_file in result_cache.CODE_FILES:
+        copy = tmp_path / code_file.relative_to(root)
+        copy.parent.mkdir(exist_ok=True)
+        copy.write_bytes(code_file.read_bytes())
+        copies.append(copy)
+    monkeypatch.setattr(result_cache, 'CODE_FILES', copies)
+    try:
+        result_cache.code_version.cache_clear()
+        before = result_cache.code_version()
+        with open(tmp_path / name, 'a') as f:
+            f.write('\n# edited\n')
+        result_cache.code_version.cache_clear()
+        assert result_cache.code_version() != before
+    finally:
+        result_cache.code_version.cache_clear()
@@ -0,0 +1,60 @@
+"""Tiled processing gives the results of the whole-raster calibration and interpolation."""
+
+import numpy as np
+
+from utils.calibration import CalibrationParameters
+from utils.interpolations import PixelInterpolation
+from utils.tiled import run_tiled
+
+
+ROW_START, ROW_END, ROW_REFERENCE = 110, 130, 120
+ROW_BINNING = 3
+# Blocks of 7 rows split the bins of 3 rows (blocks 105-111 and 112-118 split the bin 110-112)
+BLOCK_ROWS = 7
+
+
+def test_tiled_matches_whole_raster(synthetic_raster, tmp_path):
+    data_path, filenames = synthetic_raster
+    calibration_options = dict(row_start=ROW_START, row_end=ROW_END, row_binning=ROW_BINNING)
+    
+    calibrator = CalibrationParameters(**calibration_options)
+    calibrator.compute_calibration(data_path, filenames)
+    interpolator = PixelInterpolation(row_reference=ROW_REFERENCE, show_progress=False)
+    interpolator.interpolate_data(
+        data_path, filenames, calibrator.get_slopes()[0], calibrator.get_intercepts()[0],
+        row_start=ROW_START, row_end=ROW_END,
+    )
+    
+    output_path = str(tmp_path / 'tiled')
+    run_tiled(
+        data_path, filenames, output_path, calibration_options=calibration_options,
+        interpolation_options={'row_reference': ROW_REFERENCE}, block_rows=BLOCK_ROWS,
+    )
+    tiled_calibrator = CalibrationParameters(**calibration_options)
+    assert tiled_calibrator.load_results(output_path)
+    tiled_interpolator = PixelInterpolation(show_progress=False)
+    assert tiled_interpolator.load_results(output_path)
+    
+    assert tiled_calibrator.row_list == calibrator.row_list
+    for tiled, whole in [
+        (tiled_calibrator.get_slopes(), calibrator.get_slopes()),
+        (tiled_calibrator.get_intercepts(), calibrator.get_intercepts()),
+    ]:
+        np.testing.assert_array_equal(tiled[0], whole[0])
+        np.testing.assert_array_equal(tiled[1], whole[1])
+    np.testing.assert_array_equal(tiled_calibrator.get_covariances(), calibrator.get_covariances())
+    
+    np.testing.assert_array_equal(tiled_interpolator.reference_wavelength, interpolator.reference_wavelength)
+    np.testing.assert_array_equal(
+        tiled_interpolator.spectral_image_interpolated_average,
+        interpolator.spectral_image_interpolated_average,
+    )
+    np.testing.assert_array_equal(
+        tiled_interpolator.spectral_image_unc_interpolated_average,
+        interpolator.spectral_image_unc_interpolated_average,
+    )
+    assert len(tiled_interpolator.spectral_image_interpolated_list) == len(filenames)
+    for tiled, whole in zip(
+        tiled_interpolator.spectral_image_interpolated_list, interpolator.spectral_image_interpolated_list
+    ):
+        np.testing.assert_array_equal(np.asarray(tiled), whole)
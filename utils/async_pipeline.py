@@ -0,0 +1,249 @@
+"""
+Asyncio front-end overlapping FITS reading with calibration and interpolation.
+
+The synchronous pipeline reads every file, then fits every row, then reads
+every file again and interpolates it. Here FITS files are read on an I/O
+thread while the previous exposures are masked, interpolated or fitted, so
+exposure i is interpolated while exposure i+1 is being read. CPU-bound work
+runs on a worker thread (one worker) or in a process pool, so the event
+loop stays free for other tasks of an async ingest service.
+
+Results are folded in file order and equal those of `compute_calibration`
+and `interpolate_data`.
+
+Example
+-------
+>>> import asyncio
+>>> from utils.async_pipeline import calibrate_async, interpolate_async
+>>>
+>>> async def ingest(data_path, sumer_filename_list):
+...     calibrator = await calibrate_async(
+...         CalibrationParameters(), data_path, sumer_filename_list, n_workers=4
+...     )
+...     slopes, _ = calibrator.get_slopes()
+...     intercepts, _ = calibrator.get_intercepts()
+...     return await interpolate_async(
+...         PixelInterpolation(show_progress=False), data_path, sumer_filename_list,
+...         slopes, intercepts, streaming=True, n_workers=4,
+...     )
+>>>
+>>> interpolator = asyncio.run(ingest('../data/soho/sumer/', sumer_filename_list))
+"""
+
+import os
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFETCH = 2
+
+
+async def _read_frames(loader, data_path: str, sumer_filename_list: list,
+                       io_executor, queue: asyncio.Queue):
+    """Read exposures on the I/O thread into `queue` (None marks the end)."""
+    loop = asyncio.get_running_loop()
+    try:
+        for filename in sumer_filename_list:
+            frame = await loop.run_in_executor(io_executor, loader, data_path, filename)
+            if frame is not None:
+                await queue.put((filename,) + frame)
+    finally:
+        await queue.put(None)
+
+
+async def _frames(loader, data_path: str, sumer_filename_list: list, prefetch: int):
+    """Iterate over the readable exposures, reading up to `prefetch` of them ahead."""
+    queue = asyncio.Queue(maxsize=max(1, prefetch))
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='fits-reader') as io_executor:
+        reader = asyncio.create_task(
+            _read_frames(loader, data_path, sumer_filename_list, io_executor, queue)
+        )
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+            await reader
+        finally:
+            if not reader.done():
+                reader.cancel()
+                try:
+                    await reader
+                except asyncio.CancelledError:
+                    pass
+
+
+async def calibrate_async(calibrator, data_path: str, sumer_filename_list: list,
+                          n_workers: int = 1, prefetch: int = DEFAULT_PREFETCH):
+    """
+    Compute the calibration without blocking the event loop.
+    
+    The FITS files are read on an I/O thread while the previous ones are
+    masked and folded into the raster average on a worker thread. The row
+    fits run on the worker thread too (in a process pool when n_workers > 1).
+    
+    Parameters
+    ----------
+    calibrator : CalibrationParameters
+        Calibrator to fill with results
+    data_path : str
+        Path to SUMER FITS files
+    sumer_filename_list : list
+        List of FITS filenames
+    n_workers : int, default=1
+        Number of worker processes fitting rows (see `compute_calibration`)
+    prefetch : int, default=2
+        Number of exposures read ahead
+    
+    Returns
+    -------
+    CalibrationParameters
+        `calibrator`, with its results computed
+    """
+    loop = asyncio.get_running_loop()
+    if calibrator.averaging != 'mean':
+        # Clipped averages read row blocks of every file, not whole exposures
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='calibration') as executor:
+            await loop.run_in_executor(
+                executor, calibrator.compute_calibration, data_path, sumer_filename_list,
+                False, n_workers,
+            )
+        return calibrator
+    
+    calibrator._reset_frame_accumulators()
+    calibrator.raster_rejected = None
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='calibration') as executor:
+        # Each exposure is folded into the average while the next one is read
+        async for _, data, data_unc in _frames(
+                calibrator._load_frame, data_path, sumer_filename_list, prefetch):
+            await loop.run_in_executor(executor, calibrator._accumulate_frame, data, data_unc)
+        
+        if calibrator._n_frames == 0:
+            raise ValueError(f"No data files loaded from {data_path}")
+        logger.info("Loaded %d FITS files from %s", calibrator._n_frames, data_path)
+        
+        await loop.run_in_executor(executor, calibrator._finalize_frames)
+        await loop.run_in_executor(
+            executor, calibrator.calibrate_raster,
+            calibrator._raster_average, calibrator._raster_average_unc, False, n_workers,
+        )
+    return calibrator
+
+
+async def interpolate_async(interpolator, data_path: str, sumer_filename_list: list,
+                            slopes, intercepts, row_start: int = 6, row_end: int = 323,
+                            streaming: bool = False, output_dir: str = None,
+                            n_workers: int = 1, prefetch: int = DEFAULT_PREFETCH):
+    """
+    Interpolate every exposure without blocking the event loop.
+    
+    Exposure i+1 is read on an I/O thread while exposure i is interpolated
+    (on a worker thread, or in a pool of n_workers processes with up to
+    n_workers exposures in flight). Interpolated exposures are folded into
+    the results in file order.
+    
+    Parameters
+    ----------
+    interpolator : PixelInterpolation
+        Interpolator to fill with results
+    data_path : str
+        Path to SUMER FITS files
+    sumer_filename_list : list
+        List of FITS filenames
+    slopes, intercepts : array
+        Calibration for rows row_start to row_end
+    row_start, row_end : int
+        Row range of the calibration
+    streaming : bool, default=False
+        Only keep the running average, not every interpolated image
+    output_dir : str, default=None
+        Directory to write every interpolated image to (see `interpolate_data`)
+    n_workers : int, default=1
+        Number of worker processes
+    prefetch : int, default=2
+        Number of exposures read ahead
+    
+    Returns
+    -------
+    PixelInterpolation
+        `interpolator`, with its results computed
+    """
+    from utils.interpolations import _interpolate_image_worker
+    
+    loop = asyncio.get_running_loop()
+    interpolator._start_interpolation(slopes, intercepts, row_start, row_end)
+    interpolator._spectral_image_list = []
+    interpolator._spectral_image_unc_list = []
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    keep_images = not streaming
+    
+    if n_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=n_workers)
+        options = interpolator.get_options()
+        
+        def submit(spectral_image, spectral_image_unc):
+            return loop.run_in_executor(
+                executor, _interpolate_image_worker, options, spectral_image, spectral_image_unc,
+                slopes, intercepts, row_start, row_end,
+            )
+    else:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='interpolation')
+        
+        def submit(spectral_image, spectral_image_unc):
+            return loop.run_in_executor(
+                executor, interpolator._interpolate_spectral_image,
+                spectral_image, spectral_image_unc, slopes, intercepts, row_start, row_end,
+            )
+    
+    in_flight = deque()
+    
+    async def fold_oldest():
+        filename, future = in_flight.popleft()
+        interpolator._fold_image(filename, *(await future), keep_images, output_dir)
+    
+    try:
+        async for filename, spectral_image, spectral_image_unc in _frames(
+                interpolator._load_frame, data_path, sumer_filename_list, prefetch):
+            in_flight.append((filename, submit(spectral_image, spectral_image_unc)))
+            if len(in_flight) >= max(1, n_workers):
+                await fold_oldest()
+        while in_flight:
+            await fold_oldest()
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
+    
+    if interpolator._n_accumulated == 0:
+        raise ValueError(f"No data files loaded from {data_path}")
+    interpolator._finalize_average()
+    logger.info("Interpolated %d FITS files", interpolator._n_accumulated)
+    return interpolator
+
+
+async def process_async(calibrator, interpolator, data_path: str, sumer_filename_list: list,
+                        streaming: bool = True, n_workers: int = 1,
+                        prefetch: int = DEFAULT_PREFETCH) -> tuple:
+    """
+    Calibrate a file set and interpolate it with the new calibration.
+    
+    Returns
+    -------
+    tuple
+        (calibrator, interpolator) with their results computed
+    """
+    await calibrate_async(calibrator, data_path, sumer_filename_list, n_workers, prefetch)
+    slopes, _ = calibrator.get_slopes()
+    intercepts, _ = calibrator.get_intercepts()
+    await interpolate_async(
+        interpolator, data_path, sumer_filename_list, slopes, intercepts,
+        row_start=calibrator.row_start, row_end=calibrator.row_end,
+        streaming=streaming, n_workers=n_workers, prefetch=prefetch,
+    )
+    return calibrator, interpolator
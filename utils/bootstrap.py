@@ -0,0 +1,218 @@
+"""
+Vectorized bootstrap of the calibration of one row.
+
+The averaged spectrum of a row is resampled within its uncertainties (one
+normal draw per pixel and realization) and every realization is refitted.
+Instead of looping over `curve_fit`, the multi-gaussian fits of all the
+realizations of a window run as one batched Levenberg-Marquardt problem:
+models, Jacobians and normal equations are stacked along a leading
+realization axis and solved with a single `np.linalg.solve` per iteration.
+The fits start from the nominal fit of the row, which is the solution of
+the unperturbed spectrum, so they converge in a few iterations.
+
+The straight calibration line of every realization is then fitted in
+closed form. Without x uncertainties, the orthogonal distance regression
+of `CalibrationParameters._fit_calibration_line` minimises the residuals
+in wavelength weighted by 1 / (sy^2 + slope^2); the batched fit
+reweights with each realization's slope for a few passes, which reaches
+the same solution.
+
+Example
+-------
+>>> from utils.bootstrap import bootstrap_window_fits, bootstrap_calibration_lines
+>>>
+>>> rng = np.random.default_rng(0)
+>>> popt_samples = bootstrap_window_fits(x_data, y_data, y_unc_data, popt, lower, upper, 200, rng)
+>>> slopes, intercepts = bootstrap_calibration_lines(means_samples, rest_wavelengths, means_unc_px)
+"""
+
+import numpy as np
+
+
+# Levenberg-Marquardt iterations of the batched fits, and their stopping rules
+MAX_ITERATIONS = 50
+RELATIVE_CHI2_TOLERANCE = 1e-8
+MAX_DAMPING = 1e10
+# Reweighting passes of the batched calibration line fits
+LINE_FIT_PASSES = 3
+
+
+def multigaussian_batch(x, params):
+    """
+    Multi-gaussian model and its Jacobian for a batch of parameter sets.
+    
+    Parameters
+    ----------
+    x : array
+        Pixels (n_x)
+    params : array
+        (n_batch, n_params) parameters [background, amplitude1, mean1,
+        fwhm1, ...] as in `CalibrationParameters._multigaussian_for_curvefit`
+    
+    Returns
+    -------
+    tuple
+        (model, jacobian) of shapes (n_batch, n_x) and (n_batch, n_x, n_params)
+    """
+    x = np.asarray(x, dtype=float)
+    amplitude, mean, fwhm = params[:, 1::3, None], params[:, 2::3, None], params[:, 3::3, None]
+    sigma2 = (fwhm / (2 * np.sqrt(2 * np.log(2))))**2
+    dx = x[None, None, :] - mean
+    gaussian = np.exp(-dx**2 / (2 * sigma2))
+    
+    model = params[:, :1] + np.sum(amplitude * gaussian, axis=1)
+    jacobian = np.empty((params.shape[0], len(x), params.shape[1]))
+    jacobian[:, :, 0] = 1.0
+    jacobian[:, :, 1::3] = np.swapaxes(gaussian, 1, 2)
+    jacobian[:, :, 2::3] = np.swapaxes(amplitude * gaussian * dx / sigma2, 1, 2)
+    jacobian[:, :, 3::3] = np.swapaxes(amplitude * gaussian * dx**2 / (sigma2 * fwhm), 1, 2)
+    return model, jacobian
+
+
+def fit_multigaussian_batch(x, y, y_unc, p0, lower=None, upper=None):
+    """
+    Weighted least-squares multi-gaussian fits of many spectra at once.
+    
+    Levenberg-Marquardt with one damping factor per spectrum. Parameters on
+    a bound are held there while the gradient points outwards, and steps
+    leaving the bounds are clipped back onto them.
+    
+    Parameters
+    ----------
+    x : array
+        Pixels (n_x)
+    y : array
+        Spectra (n_batch, n_x)
+    y_unc : array
+        Uncertainties (n_x), shared by the spectra
+    p0 : array
+        Initial parameters (n_params), shared by the spectra
+    lower, upper : array, default=None
+        Bounds of the parameters (unbounded if None)
+    
+    Returns
+    -------
+    tuple
+        (params, converged): (n_batch, n_params) fitted parameters and a
+        (n_batch,) mask of the fits that converged
+    """
+    n_batch, n_params = y.shape[0], len(p0)
+    lower = np.full(n_params, -np.inf) if lower is None else np.asarray(lower, dtype=float)
+    upper = np.full(n_params, np.inf) if upper is None else np.asarray(upper, dtype=float)
+    weights = 1.0 / np.asarray(y_unc, dtype=float)
+    
+    params = np.tile(np.clip(np.asarray(p0, dtype=float), lower, upper), (n_batch, 1))
+    model, jacobian = multigaussian_batch(x, params)
+    chi2 = np.sum(((y - model) * weights)**2, axis=1)
+    damping = np.full(n_batch, 1e-3)
+    converged = np.zeros(n_batch, dtype=bool)
+    
+    for _ in range(MAX_ITERATIONS):
+        active = ~converged
+        if not np.any(active):
+            break
+        
+        # Damped normal equations of the spectra still iterating
+        weighted_jacobian = jacobian[active] * weights[None, :, None]
+        residuals = (y[active] - model[active]) * weights
+        normal = np.einsum('bxi,bxj->bij', weighted_jacobian, weighted_jacobian)
+        gradient = np.einsum('bxi,bx->bi', weighted_jacobian, residuals)
+        diagonal = np.diagonal(normal, axis1=1, axis2=2)
+        ridge = damping[active, None] * diagonal + 1e-12 * np.max(diagonal, axis=1, keepdims=True)
+        normal = normal + np.einsum('bi,ij->bij', ridge, np.eye(n_params))
+        
+        # Parameters on a bound that the gradient pushes outwards stay there
+        # (their rows and columns are decoupled), the others are solved for
+        free = ~(((params[active] <= lower) & (gradient < 0)) | ((params[active] >= upper) & (gradient > 0)))
+        coupling = free[:, :, None] & free[:, None, :]
+        normal = np.where(coupling, normal, np.eye(n_params)[None] * np.maximum(ridge, 1.0)[:, :, None])
+        gradient = np.where(free, gradient, 0.0)
+        try:
+            step = np.linalg.solve(normal, gradient[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            step = np.stack([np.linalg.lstsq(a, g, rcond=None)[0] for a, g in zip(normal, gradient)])
+        
+        candidate = np.clip(params[active] + step, lower, upper)
+        candidate_model, candidate_jacobian = multigaussian_batch(x, candidate)
+        candidate_chi2 = np.sum(((y[active] - candidate_model) * weights)**2, axis=1)
+        
+        # Accept the steps that lower chi-square and relax their damping; a
+        # fit is done once a step no longer changes chi-square
+        indices = np.flatnonzero(active)
+        accepted = candidate_chi2 <= chi2[indices]
+        done = (
+            np.abs(chi2[indices] - candidate_chi2)
+            <= RELATIVE_CHI2_TOLERANCE * np.maximum(candidate_chi2, 1.0)
+        )
+        accepted_indices = indices[accepted]
+        params[accepted_indices] = candidate[accepted]
+        model[accepted_indices] = candidate_model[accepted]
+        jacobian[accepted_indices] = candidate_jacobian[accepted]
+        chi2[accepted_indices] = candidate_chi2[accepted]
+        damping[indices] = np.where(accepted, damping[indices] / 10, damping[indices] * 10)
+        converged[indices] = done | (damping[indices] > MAX_DAMPING)
+    
+    return params, converged & (damping <= MAX_DAMPING)
+
+
+def bootstrap_window_fits(x, y, y_unc, popt, lower, upper, n_bootstrap: int, rng):
+    """
+    Refit one window on `n_bootstrap` realizations of its spectrum.
+    
+    Parameters
+    ----------
+    x, y, y_unc : array
+        Pixels, spectrum and uncertainties of the window
+    popt : array
+        Nominal fit of the window (starting point of every refit)
+    lower, upper : array
+        Bounds of the parameters (None for unbounded fits)
+    n_bootstrap : int
+        Number of realizations
+    rng : numpy.random.Generator
+        Source of the realizations
+    
+    Returns
+    -------
+    array
+        (n_bootstrap, n_params) fitted parameters, NaN for the refits that
+        did not converge
+    """
+    y_unc = np.asarray(y_unc, dtype=float)
+    realizations = np.asarray(y, dtype=float)[None, :] + rng.standard_normal((n_bootstrap, len(y))) * y_unc
+    params, converged = fit_multigaussian_batch(x, realizations, y_unc, popt, lower, upper)
+    params[~converged] = np.nan
+    return params
+
+
+def bootstrap_calibration_lines(means_px, rest_wavelengths, means_unc_px):
+    """
+    Fit wavelength = slope * pixel + intercept to many sets of line centroids.
+    
+    Parameters
+    ----------
+    means_px : array
+        (n_bootstrap, n_lines) centroids of the calibration lines
+    rest_wavelengths : array
+        Rest wavelengths of the lines (n_lines)
+    means_unc_px : array
+        Nominal centroid uncertainties (n_lines), used as in the orthogonal
+        distance regression of the nominal calibration
+    
+    Returns
+    -------
+    tuple
+        (slopes, intercepts) of the realizations (NaN where a centroid is NaN)
+    """
+    x = np.asarray(means_px, dtype=float)
+    y = np.asarray(rest_wavelengths, dtype=float)[None, :]
+    variance = np.asarray(means_unc_px, dtype=float)[None, :]**2
+    
+    slopes = np.zeros(x.shape[0])
+    for _ in range(LINE_FIT_PASSES):
+        w = 1.0 / (variance + slopes[:, None]**2)
+        s, sx, sy = np.sum(w, axis=1), np.sum(w * x, axis=1), np.sum(w * y, axis=1)
+        sxx, sxy = np.sum(w * x * x, axis=1), np.sum(w * x * y, axis=1)
+        slopes = (s * sxy - sx * sy) / (s * sxx - sx**2)
+        intercepts = (sy - slopes * sx) / s
+    return slopes, intercepts
@@ -11,13 +11,59 @@ wavelength calibration pipeline:
 """
 
 import numpy as np
-from scipy.optimize import curve_fit
+from scipy.optimize import curve_fit, OptimizeWarning
 from astropy.io import fits
 import sys
 import os
+import json
+import time
+import hashlib
+import logging
 import warnings
+from contextlib import contextmanager
+from utils.instrumentation import get_instrumentation
+from utils.log import log_metrics, metrics_enabled
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+
+# Defective pixels of SUMER detector A in the flipped frame (list of [x,y] positions)
+_DEFECTS_XY_PX_DetA_0 = [[210, 255], [213, 254], [213, 253], [213, 252], [212, 255], [212, 254], [212, 253], [212, 252], [212, 251], [212, 250], [211, 255], [211, 254], [211, 253], [211, 252], [211, 251], [211, 250], [210, 256], [210, 255], [210, 254], [210, 253], [210, 252], [210, 251], [210, 250], [209, 256], [209, 255], [209, 254], [209, 253], [209, 252], [209, 251], [209, 250], [208, 256], [208, 255], [208, 254], [208, 253], [208, 252], [208, 251], [208, 250], [207, 255], [207, 254], [207, 253], [207, 252], [207, 251], [207, 250], [206, 254], [206, 253], [206, 252], [206, 251], [205, 253], [205, 252]]
+_DEFECTS_XY_PX_DetA_1 = [[442, 8], [443, 8], [444, 8], [445, 8], [446, 8], [442, 9], [443, 9], [444, 9], [445, 9], [446, 9], [442, 10], [443, 10], [444, 10], [445, 10], [446, 10], [442, 11], [443, 11], [444, 11], [445, 11], [446, 11], [442, 12], [443, 12], [444, 12], [445, 12], [446, 12]]
+_DEFECTS_XY_PX_DetA_2 = [[470, 19], [471, 19], [472, 19], [473, 19], [474, 19], [470, 20], [471, 20], [472, 20], [473, 20], [474, 20], [470, 21], [471, 21], [472, 21], [473, 21], [474, 21], [470, 22], [471, 22], [472, 22], [473, 22], [474, 22], [470, 23], [471, 23], [472, 23], [473, 23], [474, 23]]
+_DEFECTS_XY_PX_DetA_3 = [[471, 61], [472, 61], [473, 61], [474, 61], [471, 62], [472, 62], [473, 62], [474, 62], [471, 63], [472, 63], [473, 63], [474, 63], [471, 64], [472, 64], [473, 64], [474, 64]]
+_DEFECTS_XY_PX_DetA_4 = [[458, 92], [459, 92], [460, 92], [461, 92], [462, 92], [463, 92], [458, 93], [459, 93], [460, 93], [461, 93], [462, 93], [463, 93], [458, 94], [459, 94], [460, 94], [461, 94], [462, 94], [463, 94], [458, 95], [459, 95], [460, 95], [461, 95], [462, 95], [463, 95], [458, 96], [459, 96], [460, 96], [461, 96], [462, 96], [463, 96], [458, 97], [459, 97], [460, 97], [461, 97], [462, 97], [463, 97]]
+_DEFECTS_XY_PX_DetA_5 = [[459, 88], [460, 88], [461, 88], [462, 88], [463, 88], [459, 89], [460, 89], [461, 89], [462, 89], [463, 89], [459, 90], [460, 90], [461, 90], [462, 90], [463, 90], [459, 91], [460, 91], [461, 91], [462, 91], [463, 91], [459, 92], [460, 92], [461, 92], [462, 92], [463, 92]]
+_DEFECTS_XY_PX_DetA_6 = [[488, 110], [489, 110], [490, 110], [491, 110], [492, 110], [493, 110], [494, 110], [488, 111], [489, 111], [490, 111], [491, 111], [492, 111], [493, 111], [494, 111], [488, 112], [489, 112], [490, 112], [491, 112], [492, 112], [493, 112], [494, 112], [488, 113], [489, 113], [490, 113], [491, 113], [492, 113], [493, 113], [494, 113], [488, 114], [489, 114], [490, 114], [491, 114], [492, 114], [493, 114], [494, 114], [488, 115], [489, 115], [490, 115], [491, 115], [492, 115], [493, 115], [494, 115], [488, 116], [489, 116], [490, 116], [491, 116], [492, 116], [493, 116], [494, 116]]
+DEFECTS_XY_PX_DetA = np.concatenate([_DEFECTS_XY_PX_DetA_0, _DEFECTS_XY_PX_DetA_1, _DEFECTS_XY_PX_DetA_2, _DEFECTS_XY_PX_DetA_3, _DEFECTS_XY_PX_DetA_4, _DEFECTS_XY_PX_DetA_5, _DEFECTS_XY_PX_DetA_6])
+
+_DEFECT_MASKS = {}
+
+
+def get_defect_mask_DetA(shape=(360, 512)):
+    """
+    Get the boolean mask of the defective pixels of SUMER detector A.
+    
+    The mask is built once per shape and shared by every caller (it must
+    not be modified).
+    """
+    shape = tuple(shape)
+    mask = _DEFECT_MASKS.get(shape)
+    if mask is None:
+        mask = np.zeros(shape, dtype=bool)
+        mask[DEFECTS_XY_PX_DetA[:, 1], DEFECTS_XY_PX_DetA[:, 0]] = True
+        mask.flags.writeable = False
+        _DEFECT_MASKS[shape] = mask
+    return mask
+
+
+def set_defect_mask_DetA(mask):
+    """Install a defect mask built elsewhere (e.g. shared with worker processes)."""
+    mask = np.array(mask, dtype=bool)
+    mask.flags.writeable = False
+    _DEFECT_MASKS[mask.shape] = mask
+
 
 def _mask_all_defective_pixels_DetA(array_to_mask):
     """
@@ -26,25 +72,62 @@ def _mask_all_defective_pixels_DetA(array_to_mask):
     """
     array_to_mask_copy = np.copy(array_to_mask)
     
-    # Defective pixels in the detector frame (list of [x,y] positions)
-    defects_xy_px_0 = [[210, 255], [213, 254], [213, 253], [213, 252], [212, 255], [212, 254], [212, 253], [212, 252], [212, 251], [212, 250], [211, 255], [211, 254], [211, 253], [211, 252], [211, 251], [211, 250], [210, 256], [210, 255], [210, 254], [210, 253], [210, 252], [210, 251], [210, 250], [209, 256], [209, 255], [209, 254], [209, 253], [209, 252], [209, 251], [209, 250], [208, 256], [208, 255], [208, 254], [208, 253], [208, 252], [208, 251], [208, 250], [207, 255], [207, 254], [207, 253], [207, 252], [207, 251], [207, 250], [206, 254], [206, 253], [206, 252], [206, 251], [205, 253], [205, 252]]
-    defects_xy_px_1 = [[442, 8], [443, 8], [444, 8], [445, 8], [446, 8], [442, 9], [443, 9], [444, 9], [445, 9], [446, 9], [442, 10], [443, 10], [444, 10], [445, 10], [446, 10], [442, 11], [443, 11], [444, 11], [445, 11], [446, 11], [442, 12], [443, 12], [444, 12], [445, 12], [446, 12]]
-    defects_xy_px_2 = [[470, 19], [471, 19], [472, 19], [473, 19], [474, 19], [470, 20], [471, 20], [472, 20], [473, 20], [474, 20], [470, 21], [471, 21], [472, 21], [473, 21], [474, 21], [470, 22], [471, 22], [472, 22], [473, 22], [474, 22], [470, 23], [471, 23], [472, 23], [473, 23], [474, 23]]
-    defects_xy_px_3 = [[471, 61], [472, 61], [473, 61], [474, 61], [471, 62], [472, 62], [473, 62], [474, 62], [471, 63], [472, 63], [473, 63], [474, 63], [471, 64], [472, 64], [473, 64], [474, 64]]
-    defects_xy_px_4 = [[458, 92], [459, 92], [460, 92], [461, 92], [462, 92], [463, 92], [458, 93], [459, 93], [460, 93], [461, 93], [462, 93], [463, 93], [458, 94], [459, 94], [460, 94], [461, 94], [462, 94], [463, 94], [458, 95], [459, 95], [460, 95], [461, 95], [462, 95], [463, 95], [458, 96], [459, 96], [460, 96], [461, 96], [462, 96], [463, 96], [458, 97], [459, 97], [460, 97], [461, 97], [462, 97], [463, 97]]
-    defects_xy_px_5 = [[459, 88], [460, 88], [461, 88], [462, 88], [463, 88], [459, 89], [460, 89], [461, 89], [462, 89], [463, 89], [459, 90], [460, 90], [461, 90], [462, 90], [463, 90], [459, 91], [460, 91], [461, 91], [462, 91], [463, 91], [459, 92], [460, 92], [461, 92], [462, 92], [463, 92]]
-    defects_xy_px_6 = [[488, 110], [489, 110], [490, 110], [491, 110], [492, 110], [493, 110], [494, 110], [488, 111], [489, 111], [490, 111], [491, 111], [492, 111], [493, 111], [494, 111], [488, 112], [489, 112], [490, 112], [491, 112], [492, 112], [493, 112], [494, 112], [488, 113], [489, 113], [490, 113], [491, 113], [492, 113], [493, 113], [494, 113], [488, 114], [489, 114], [490, 114], [491, 114], [492, 114], [493, 114], [494, 114], [488, 115], [489, 115], [490, 115], [491, 115], [492, 115], [493, 115], [494, 115], [488, 116], [489, 116], [490, 116], [491, 116], [492, 116], [493, 116], [494, 116]]
-    defects_xy_px = np.concatenate([defects_xy_px_0, defects_xy_px_1, defects_xy_px_2, defects_xy_px_3, defects_xy_px_4, defects_xy_px_5, defects_xy_px_6])
-    
     # Assign a rare negative value to the defective pixels
-    for col_defective, row_defective in defects_xy_px:
-        array_to_mask_copy[row_defective, col_defective] = -999.9
+    array_to_mask_copy[get_defect_mask_DetA(array_to_mask_copy.shape)] = -999.9
     
     # Mask the negative values
     array_masked = np.ma.masked_less(array_to_mask_copy, 0)
     return array_masked
 
 
+@contextmanager
+def memmapped_frames(data_path: str, sumer_filename_list: list):
+    """
+    Open SUMER FITS files memory-mapped, for reading blocks of rows.
+    
+    Level 1, unreadable and empty files are skipped (with a warning).
+    
+    Yields
+    ------
+    tuple
+        (filenames, frames): the opened files and their memory-mapped images
+        (in FITS row order, i.e. flipped with respect to the pipeline)
+    
+    Raises
+    ------
+    ValueError
+        If no file could be opened, or the images differ in shape
+    """
+    hdul_list = []
+    filenames = []
+    frames = []
+    try:
+        for filename in sumer_filename_list:
+            if '_l1.fits' in filename.lower():
+                continue
+            try:
+                hdul = fits.open(os.path.join(data_path, filename), memmap=True)
+            except Exception as e:
+                logger.warning("Could not load %s: %s", filename, e)
+                continue
+            hdul_list.append(hdul)
+            data = next((hdu.data for hdu in hdul if hdu.data is not None), None)
+            if data is None:
+                logger.warning("No data in %s", filename)
+                continue
+            if frames and data.shape != frames[0].shape:
+                raise ValueError(f"{filename} has shape {data.shape}, expected {frames[0].shape}")
+            filenames.append(filename)
+            frames.append(data)
+        
+        if not frames:
+            raise ValueError(f"No data files loaded from {data_path}")
+        yield filenames, frames
+    finally:
+        for hdul in hdul_list:
+            hdul.close()
+
+
 class CalibrationParameters:
     """
     Compute wavelength calibration parameters from SUMER spectral data.
@@ -53,13 +136,16 @@ class CalibrationParameters:
     of SUMER spectral data. For each row:
       1. Loads SUMER spectral FITS data from files
       2. Averages all spectral images
-      3. Performs multi-gaussian fits on selected spectral intervals
+      3. Performs multi-gaussian fits on the windows of the calibration lines
       4. Extracts line centroids from individual gaussians
       5. Fits a straight line: wavelength = slope * pixel + intercept
       6. Returns calibration parameters (slope, intercept, and uncertainties)
     
     The row-specific fitting parameters (initial guesses, interval ranges) are
     loaded from a configuration module to keep the code clean and parameters safe.
+    The calibration lines, their fitting windows and blend partners come from a
+    line catalogue (see modules.line_catalogue); only the windows of the lines
+    in use are fitted.
     
     This class is self-contained and does not depend on external auxiliary functions.
     All necessary data loading and processing is integrated internally.
@@ -77,9 +163,87 @@ class CalibrationParameters:
     factor_fullspectrum : float, default=1.0
         Scaling factor for full spectrum
     rest_wavelengths : list, default=None
-        Rest wavelengths (in Angstroms) of calibration lines [1537.94, 1542.18, 1543.72, 1543.96]
+        Rest wavelengths (in nm) of the calibration lines in use, overriding
+        those of the line catalogue
     rough_pixel_estimates : list, default=None
-        Rough pixel positions corresponding to rest wavelengths
+        Rough pixel positions of the calibration lines in use, overriding
+        those of the line catalogue
+    line_catalogue : str or dict, default=None
+        Line catalogue (path to a JSON file or parsed catalogue, see
+        modules.line_catalogue). The catalogue shipped in
+        modules/line_catalogue.json if None.
+    lines : list of str, default=None
+        Names of the catalogue lines used for the calibration (every line of
+        the catalogue with a rest wavelength if None)
+    row_binning : int, default=1
+        Number of adjacent rows averaged into one spectrum before fitting.
+        With the default of 1 every row is fitted on its own.
+    bin_assignment : str, default='assign'
+        How binned calibrations are mapped back to the member rows:
+        'assign' gives every row of a bin the bin's calibration, 'interpolate'
+        interpolates linearly between the bin centres.
+    centroid_mode : str, default='fit'
+        How line centroids are measured. 'fit' runs the multi-gaussian fits on
+        every row. 'xcorr' fits only `reference_row` and measures the shift of
+        every other row by cross-correlating each interval with the reference
+        fit model, falling back to the full fit when the correlation is poor.
+    reference_row : int, default=None
+        Reference row for the 'xcorr' mode (defaults to the middle of the row range)
+    xcorr_stretch : bool, default=False
+        Also search for a stretch of each interval about its centre (±1%)
+    xcorr_min_quality : float, default=0.95
+        Minimum normalised correlation peak below which a row is fully fitted
+    fit_method : str, default='trf'
+        Solver of the multi-gaussian fits. 'trf' fits within bounds derived
+        from the window and the initial guesses (non-negative background and
+        amplitudes, means within the window, FWHMs within a factor
+        `FWHM_FACTOR` of their initial guess): a Levenberg-Marquardt fit with
+        the analytic Jacobian is kept when it converges inside the bounds,
+        otherwise a bounded trust-region fit runs, retried once with more
+        evaluations (see `fit_solver`). 'lm' runs the unbounded
+        Levenberg-Marquardt fit, retried with more evaluations and then
+        without uncertainties.
+    qc_max_reduced_chi2 : float, default=1e4
+        Largest reduced chi-square of the window of a calibration line
+        passing the quality control (None to skip this check). Rows failing
+        the quality control are refitted once from the fit of a neighbouring
+        row; if they still fail, their calibration is NaN (see
+        `qc_reason_list` and `get_qc_failures`).
+    uncertainty : str, default='odr'
+        Source of the slope and intercept uncertainties. 'odr' keeps the
+        standard errors of the calibration line fit, from the centroid
+        uncertainties of the multi-gaussian fits. 'bootstrap' resamples the
+        averaged spectrum of every row within its uncertainties, refits the
+        windows of all realizations at once (see utils.bootstrap) and takes
+        the covariance of their slopes and intercepts. Needs
+        centroid_mode='fit'.
+    n_bootstrap : int, default=200
+        Number of realizations of the 'bootstrap' uncertainties
+    bootstrap_seed : int, default=0
+        Seed of the realizations, drawn per fitted row so that the results do
+        not depend on how rows are split between workers
+    dtype : data-type, default=np.float64
+        Floating point type of the loaded images and of the raster average.
+        np.float32 halves their memory; averages are still accumulated in
+        float64 and the fits always run in float64.
+    averaging : str, default='mean'
+        How the exposures are averaged. 'mean' averages every valid pixel
+        value. 'sigma_clip' first rejects values (cosmic-ray hits, transient
+        hot pixels) further than `clip_sigma` standard deviations from the
+        per-pixel median of the exposures. The expected Poisson uncertainty
+        of the median is used as standard deviation when it exceeds the
+        scatter (1.4826 * MAD), which matters for short rasters.
+    clip_sigma : float, default=3.0
+        Rejection threshold of the 'sigma_clip' averaging
+    clip_iterations : int, default=3
+        Maximum number of rejection passes of the 'sigma_clip' averaging
+    block_rows : int, default=32
+        Number of detector rows of all exposures held in memory at once by
+        the 'sigma_clip' averaging (the files are memory-mapped)
+    instrumentation : Instrumentation, default=None
+        Records the time (and optionally memory) of the stages 'load', 'mask',
+        'average', 'fit_row', 'fit_interval', 'fit_line', 'bootstrap' and 'save' (see
+        utils.instrumentation). Disabled if None.
     
     Attributes
     ----------
@@ -91,6 +255,33 @@ class CalibrationParameters:
         Intercepts of calibration lines for each row
     pixelscale_intercept_unc_list : list
         Uncertainties of intercepts
+    pixelscale_intercept_cov_list : list
+        Covariances of the slopes and intercepts (see `get_covariances`)
+    xcorr_fallback_rows : list
+        Rows for which the 'xcorr' mode fell back to the full fit
+    fit_status : dict
+        Status of the multi-gaussian fits of the last run, by fitted row (the
+        central row of a bin) and window: 'converged', 'at_bound' (converged
+        with a mean or FWHM on its bound), 'retried', 'unweighted' ('lm' fit
+        without uncertainties) or 'failed'
+    fit_solver : dict
+        Solver that produced each fit status, by fitted row and window: 'lm'
+        (Levenberg-Marquardt) or 'trf' (bounded trust-region)
+    qc_reason_list : list
+        Quality control outcome of every row, aligned with row_list: 'ok' or
+        the reason (one of `QC_REASONS`) its calibration is NaN
+    reseeded_rows : list
+        Fitted rows refitted from a neighbour's fit in the last run
+    row_list : list
+        Detector rows of the results, aligned with the lists above
+    row_fingerprints : list
+        Fingerprint of the fit that produced each row's calibration
+    refitted_rows : list
+        Rows that were actually fitted in the last run (all rows unless
+        `compute_calibration` ran with incremental=True)
+    raster_rejected : array
+        Per-pixel number of values rejected by the 'sigma_clip' averaging
+        (None for the 'mean' averaging)
     
     Examples
     --------
@@ -112,6 +303,25 @@ class CalibrationParameters:
     >>> intercepts, intercepts_unc = calibrator.get_intercepts()
     """
     
+    # Smallest FWHM (pixels) allowed by the bounded fits
+    FWHM_MIN = 0.5
+    # Bounded fits keep every FWHM within this factor of its initial guess
+    FWHM_FACTOR = 3.0
+    # Function evaluations of the retried fits
+    FIT_RETRY_MAX_NFEV = 20000
+    # Function evaluations of the Levenberg-Marquardt fit tried first by the
+    # bounded fits (well-posed windows converge in a few tens)
+    FIT_LM_MAX_NFEV = 200
+    # Quality control: reason codes (saved by index), minimum distance (pixels)
+    # of a line centroid from the edges of its window, and offsets of the
+    # neighbouring rows (or bins) whose fits seed the refit of a failed row
+    QC_REASONS = (
+        'ok', 'fit_failed', 'line_missing', 'centroid_outside_window', 'fwhm_out_of_range',
+        'chi2_too_high',
+    )
+    QC_EDGE_MARGIN = 0.5
+    QC_RESEED_OFFSETS = (-1, 1, -2, 2)
+    
     def __init__(
         self,
         row_start: int = 6,
@@ -121,33 +331,130 @@ class CalibrationParameters:
         factor_fullspectrum: float = 1.0,
         rest_wavelengths: list = None,
         rough_pixel_estimates: list = None,
+        line_catalogue=None,
+        lines: list = None,
+        row_binning: int = 1,
+        bin_assignment: str = 'assign',
+        centroid_mode: str = 'fit',
+        reference_row: int = None,
+        xcorr_stretch: bool = False,
+        xcorr_min_quality: float = 0.95,
+        fit_method: str = 'trf',
+        qc_max_reduced_chi2: float = 1e4,
+        uncertainty: str = 'odr',
+        n_bootstrap: int = 200,
+        bootstrap_seed: int = 0,
+        dtype=np.float64,
+        averaging: str = 'mean',
+        clip_sigma: float = 3.0,
+        clip_iterations: int = 3,
+        block_rows: int = 32,
+        instrumentation=None,
     ):
         """Initialize calibration parameters object."""
+        from modules.line_catalogue import load_line_catalogue, get_calibration_lines, get_line
+        
+        if row_binning < 1:
+            raise ValueError(f"row_binning must be >= 1, got {row_binning}")
+        if bin_assignment not in ('assign', 'interpolate'):
+            raise ValueError(
+                f"bin_assignment must be 'assign' or 'interpolate', got {bin_assignment!r}"
+            )
+        if centroid_mode not in ('fit', 'xcorr'):
+            raise ValueError(f"centroid_mode must be 'fit' or 'xcorr', got {centroid_mode!r}")
+        if fit_method not in ('trf', 'lm'):
+            raise ValueError(f"fit_method must be 'trf' or 'lm', got {fit_method!r}")
+        if uncertainty not in ('odr', 'bootstrap'):
+            raise ValueError(f"uncertainty must be 'odr' or 'bootstrap', got {uncertainty!r}")
+        if uncertainty == 'bootstrap' and centroid_mode != 'fit':
+            raise ValueError("uncertainty='bootstrap' needs centroid_mode='fit'")
+        if n_bootstrap < 2:
+            raise ValueError(f"n_bootstrap must be >= 2, got {n_bootstrap}")
+        if not np.issubdtype(np.dtype(dtype), np.floating):
+            raise ValueError(f"dtype must be a floating point type, got {dtype!r}")
+        if averaging not in ('mean', 'sigma_clip'):
+            raise ValueError(f"averaging must be 'mean' or 'sigma_clip', got {averaging!r}")
+        if block_rows < 1:
+            raise ValueError(f"block_rows must be >= 1, got {block_rows}")
+        
         self.row_start = row_start
         self.row_end = row_end
         self.show_figures = show_figures
         self.exposure_time = exposure_time
         self.factor_fullspectrum = factor_fullspectrum
+        self.row_binning = int(row_binning)
+        self.bin_assignment = bin_assignment
+        self.centroid_mode = centroid_mode
+        self.reference_row = (
+            reference_row if reference_row is not None else (row_start + row_end) // 2
+        )
+        self.xcorr_stretch = xcorr_stretch
+        self.xcorr_min_quality = xcorr_min_quality
+        self.fit_method = fit_method
+        self.qc_max_reduced_chi2 = qc_max_reduced_chi2
+        self.uncertainty = uncertainty
+        self.n_bootstrap = int(n_bootstrap)
+        self.bootstrap_seed = int(bootstrap_seed)
+        self.dtype = np.dtype(dtype)
+        self.averaging = averaging
+        self.clip_sigma = clip_sigma
+        self.clip_iterations = int(clip_iterations)
+        self.block_rows = int(block_rows)
+        self.instrumentation = get_instrumentation(instrumentation)
         
-        # Default calibration line info
-        self.rest_wavelengths = rest_wavelengths or [153.7935, 154.2177, 154.3724, 154.3960]
-        self.rough_pixel_estimates = rough_pixel_estimates or [178., 279., 316., 321.]
+        # Calibration lines in use, from the line catalogue
+        self.line_catalogue = load_line_catalogue(line_catalogue)
+        self.lines = list(lines) if lines else get_calibration_lines(self.line_catalogue)
+        line_entries = [get_line(self.line_catalogue, name) for name in self.lines]
+        if len(line_entries) < 2 or any(line['rest_wavelength'] is None for line in line_entries):
+            raise ValueError(
+                f"The calibration needs at least two lines with a rest wavelength, got {self.lines}"
+            )
+        self.rest_wavelengths = list(rest_wavelengths or [line['rest_wavelength'] for line in line_entries])
+        self.rough_pixel_estimates = list(
+            rough_pixel_estimates or [line['rough_pixel'] for line in line_entries]
+        )
+        if not len(self.rest_wavelengths) == len(self.rough_pixel_estimates) == len(self.lines):
+            raise ValueError(
+                f"rest_wavelengths and rough_pixel_estimates must give one value per line "
+                f"in use ({len(self.lines)})"
+            )
         
         # Output lists
         self.pixelscale_list = []
         self.pixelscale_unc_list = []
         self.pixelscale_intercept_list = []
         self.pixelscale_intercept_unc_list = []
+        self.pixelscale_intercept_cov_list = []
+        self.xcorr_fallback_rows = []
+        self.fit_status = {}
+        self.fit_solver = {}
+        self.reseeded_rows = []
+        self.qc_reason_list = []
+        self.row_list = []
+        self.row_fingerprints = []
+        self.refitted_rows = []
         
         # Internal state
         self._raster_average = None
         self._raster_average_unc = None
+        self.raster_rejected = None
+        self._reset_frame_accumulators()
+        self._xcorr_reference = None
+        self._neighbour_fits = {}
+        self._fit_cache = {}
+        self._new_fit_cache = {}
+        self._incremental = False
+        self._options_fingerprint = ''
+        self._last_fit_seconds = None
         self._color_list = ['blue', 'red', 'green', 'orange', 'magenta', 'olive', 'brown', 'lime']
     
     def compute_calibration(
         self,
         data_path: str,
         sumer_filename_list: list,
+        incremental: bool = False,
+        n_workers: int = 1,
     ):
         """
         Compute wavelength calibration for all specified rows.
@@ -158,62 +465,421 @@ class CalibrationParameters:
             Path to SUMER data directory
         sumer_filename_list : list
             List of SUMER FITS filenames to process
+        incremental : bool, default=False
+            Reuse the fit results of a previous run (held by this object or
+            restored with `load_results`) for every row whose fingerprint is
+            unchanged, and only re-fit the others. The fingerprint covers the
+            row's parameter set, its averaged spectrum and the options. The
+            parameter JSON is re-read so that edits are picked up.
+        n_workers : int, default=1
+            Number of worker processes fitting contiguous blocks of rows (or
+            of whole bins) in parallel. The raster is loaded and averaged
+            once and shared with the workers. Not used with
+            bin_assignment='interpolate', which needs every bin at once.
         """
-        from modules.calibration_params_loader import get_parameters_for_row
-        
         # Load and average SUMER data
         self._load_data(data_path, sumer_filename_list)
+        self._calibrate_raster(incremental, n_workers)
+    
+    def calibrate_raster(self, raster_average, raster_average_unc,
+                         incremental: bool = False, n_workers: int = 1):
+        """
+        Compute the calibration of an already loaded and averaged raster.
+        
+        Lets callers that keep averaged rasters in memory (e.g. the
+        calibration service) skip reading and averaging the FITS files.
+        
+        Parameters
+        ----------
+        raster_average : masked array
+            Average spectral image (as computed by `compute_calibration`)
+        raster_average_unc : array
+            Uncertainty of the average spectral image
+        incremental, n_workers
+            See `compute_calibration`
+        """
+        self._raster_average = raster_average
+        self._raster_average_unc = raster_average_unc
+        self._calibrate_raster(incremental, n_workers)
+    
+    def _calibrate_raster(self, incremental: bool, n_workers: int):
+        """Fit every row of the loaded raster average."""
+        self._start_calibration(incremental)
+        
+        if n_workers > 1 and not (self.row_binning > 1 and self.bin_assignment == 'interpolate'):
+            self._compute_parallel_calibration(n_workers)
+        elif self.row_binning > 1:
+            self._compute_binned_calibration()
+        else:
+            self._compute_row_calibration()
+        
+        self._finish_calibration()
+    
+    def _start_calibration(self, incremental: bool):
+        """
+        Clear earlier results and prepare the fits.
+        
+        The raster average must be loaded (for 'xcorr' at least the reference row).
+        """
+        from modules.calibration_params_loader import reload_parameters
+        
+        if incremental:
+            reload_parameters()
+        else:
+            self._fit_cache = {}
+        self._incremental = incremental
+        self._new_fit_cache = {}
+        self.refitted_rows = []
         
+        # Results of an earlier run are replaced, not appended to
+        self.pixelscale_list = []
+        self.pixelscale_unc_list = []
+        self.pixelscale_intercept_list = []
+        self.pixelscale_intercept_unc_list = []
+        self.pixelscale_intercept_cov_list = []
+        self.row_list = []
+        self.row_fingerprints = []
+        self.qc_reason_list = []
+        self.xcorr_fallback_rows = []
+        self.fit_status = {}
+        self.fit_solver = {}
+        self.reseeded_rows = []
+        self._neighbour_fits = {}
+        
+        if self.centroid_mode == 'xcorr':
+            self._prepare_xcorr_reference()
+        self._options_fingerprint = self._compute_options_fingerprint()
+    
+    def _finish_calibration(self):
+        """Keep the fits of this run for the next incremental run."""
+        self._fit_cache = self._new_fit_cache
+        if self._incremental:
+            logger.info("Re-fitted %d of %d rows", len(self.refitted_rows), len(self.row_list))
+        counts = {}
+        for row, statuses in self.fit_status.items():
+            for key, status in statuses.items():
+                label = f"{status} ({self.fit_solver[row][key]})"
+                counts[label] = counts.get(label, 0) + 1
+        if counts:
+            logger.info(
+                "Fit status: %s", ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+            )
+        failures = self.get_qc_failures()
+        if failures:
+            logger.warning(
+                "%d rows failed the quality control (%d refitted from a neighbour): %s%s",
+                len(failures), len(self.reseeded_rows),
+                ', '.join(f"{f['row']} ({f['reason']})" for f in failures[:10]),
+                ', ...' if len(failures) > 10 else '',
+            )
+    
+    def _fit_rows(self, first_row: int, last_row: int):
+        """
+        Fit rows first_row to last_row, appending to the results.
+        
+        The range must hold whole bins (as in `_compute_parallel_calibration`)
+        for the results to equal those of a run over all rows.
+        """
+        row_start, row_end = self.row_start, self.row_end
+        self.row_start, self.row_end = first_row, last_row
+        try:
+            if self.row_binning > 1:
+                self._compute_binned_calibration()
+            else:
+                self._compute_row_calibration()
+        finally:
+            self.row_start, self.row_end = row_start, row_end
+    
+    def _sort_results(self):
+        """Put the results (fitted in any order of row ranges) in row order."""
+        order = np.argsort(self.row_list, kind='stable')
+        for name in ('row_list', 'row_fingerprints', 'pixelscale_list', 'pixelscale_unc_list',
+                     'pixelscale_intercept_list', 'pixelscale_intercept_unc_list',
+                     'pixelscale_intercept_cov_list', 'qc_reason_list'):
+            values = getattr(self, name)
+            setattr(self, name, [values[i] for i in order])
+    
+    def _compute_parallel_calibration(self, n_workers: int):
+        """
+        Split the rows into contiguous blocks and fit them in worker processes.
+        
+        Blocks hold whole bins, so the results equal those of a serial run.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from modules.calibration_params_loader import get_all_rows, _get_cached_parameters
+        from utils.campaign import init_worker
+        
+        rows = [row for row in get_all_rows() if self.row_start <= row <= self.row_end]
+        units = [rows[i:i + self.row_binning] for i in range(0, len(rows), self.row_binning)]
+        blocks = [block for block in np.array_split(np.arange(len(units)), n_workers) if len(block)]
+        row_ranges = [(units[block[0]][0], units[block[-1]][-1]) for block in blocks]
+        
+        state = {
+            'options': self.get_options(),
+            'raster_average': self._raster_average,
+            'raster_average_unc': self._raster_average_unc,
+            'xcorr_reference': self._xcorr_reference,
+            'fit_cache': self._fit_cache,
+            'incremental': self._incremental,
+            'options_fingerprint': self._options_fingerprint,
+        }
+        parameters, is_new_format = _get_cached_parameters()
+        with ProcessPoolExecutor(
+            max_workers=len(row_ranges),
+            initializer=init_worker,
+            initargs=(parameters, is_new_format, get_defect_mask_DetA()),
+        ) as executor:
+            results = list(executor.map(_calibrate_row_range, [state] * len(row_ranges), row_ranges))
+        
+        # Blocks come back in row order
+        for result in results:
+            self.row_list.extend(result['row_list'])
+            self.row_fingerprints.extend(result['row_fingerprints'])
+            self.pixelscale_list.extend(result['pixelscale_list'])
+            self.pixelscale_unc_list.extend(result['pixelscale_unc_list'])
+            self.pixelscale_intercept_list.extend(result['pixelscale_intercept_list'])
+            self.pixelscale_intercept_unc_list.extend(result['pixelscale_intercept_unc_list'])
+            self.pixelscale_intercept_cov_list.extend(result['pixelscale_intercept_cov_list'])
+            self.refitted_rows.extend(result['refitted_rows'])
+            self.xcorr_fallback_rows.extend(result['xcorr_fallback_rows'])
+            self.fit_status.update(result['fit_status'])
+            self.fit_solver.update(result['fit_solver'])
+            self.reseeded_rows.extend(result['reseeded_rows'])
+            self.qc_reason_list.extend(result['qc_reason_list'])
+            self._new_fit_cache.update(result['fit_cache'])
+    
+    def _compute_row_calibration(self):
+        """Fit the calibration of every row on its own."""
         # Process each row
         for row in np.arange(self.row_start, self.row_end + 1):
-            print(f'Row: {row}')
+            logger.debug('Row: %d', row)
             
             try:
-                params = get_parameters_for_row(row)
+                params = self._get_row_parameters(row)
             except ValueError:
-                print(f"  Parameters not defined for row {row}, skipping...")
+                logger.debug("Parameters not defined for row %d, skipping", row)
                 continue
             
             idx_interval_dic = params['idx_interval']
             init_parameters_dic = params['init_parameters']
             
-            # Process this row
-            slope_fit, slope_unc_fit, intercept_fit, intercept_unc_fit = self._process_row(
-                row, idx_interval_dic, init_parameters_dic
+            # Process this row (or reuse its previous result if unchanged)
+            fingerprint = self._fit_fingerprint(row, params)
+            slope_fit, slope_unc_fit, intercept_fit, intercept_unc_fit, cov_fit, qc_code = (
+                self._cached_process_row(fingerprint, [row], row, idx_interval_dic, init_parameters_dic)
             )
             
             # Store results
+            self.row_list.append(int(row))
+            self.row_fingerprints.append(fingerprint)
             self.pixelscale_list.append(float(slope_fit))
             self.pixelscale_unc_list.append(float(slope_unc_fit))
             self.pixelscale_intercept_list.append(float(intercept_fit))
             self.pixelscale_intercept_unc_list.append(float(intercept_unc_fit))
+            self.pixelscale_intercept_cov_list.append(float(cov_fit))
+            self.qc_reason_list.append(self.QC_REASONS[int(qc_code)])
+            if metrics_enabled():
+                self._log_row_metrics(row, row, self._last_fit_seconds)
+    
+    def _compute_binned_calibration(self):
+        """
+        Fit the calibration on bins of `row_binning` adjacent rows.
+        
+        Each bin is fitted once with the parameters of its central row, and the
+        result is assigned (or interpolated) back to every member row.
+        """
+        from modules.calibration_params_loader import get_parameters_for_row
+        
+        # Only rows with defined parameters take part in the binning
+        rows = []
+        for row in np.arange(self.row_start, self.row_end + 1):
+            try:
+                get_parameters_for_row(row)
+            except ValueError:
+                logger.debug("Parameters not defined for row %d, skipping", row)
+                continue
+            rows.append(int(row))
+        
+        bins = [rows[i:i + self.row_binning] for i in range(0, len(rows), self.row_binning)]
+        
+        bin_centres, bin_results, bin_fingerprints, bin_fit_seconds = [], [], [], []
+        for bin_rows in bins:
+            central_row = bin_rows[len(bin_rows) // 2]
+            logger.debug('Rows: %d-%d', bin_rows[0], bin_rows[-1])
+            
+            params = self._get_row_parameters(central_row)
+            fingerprint = self._fit_fingerprint(central_row, params, bin_rows)
+            bin_results.append(self._cached_process_row(
+                fingerprint, bin_rows,
+                central_row, params['idx_interval'], params['init_parameters'], bin_rows=bin_rows
+            ))
+            bin_centres.append(np.mean(bin_rows))
+            bin_fingerprints.append(fingerprint)
+            bin_fit_seconds.append((central_row, self._last_fit_seconds))
+        
+        bin_results = np.array(bin_results, dtype=float)
+        passed = bin_results[:, 5] == 0
+        if self.bin_assignment == 'interpolate' and np.count_nonzero(passed) > 1:
+            # Linear interpolation between the centres of the bins passing the
+            # quality control (clamped at the edges); failed bins stay NaN
+            row_results = np.column_stack([
+                np.interp(rows, np.asarray(bin_centres)[passed], bin_results[passed, k])
+                for k in range(5)
+            ] + [np.repeat(bin_results[:, 5], [len(b) for b in bins])])
+            row_results[row_results[:, 5] != 0, :5] = np.nan
+        else:
+            row_results = np.repeat(bin_results, [len(b) for b in bins], axis=0)
+        
+        self.row_list.extend(rows)
+        self.row_fingerprints.extend(np.repeat(bin_fingerprints, [len(b) for b in bins]).tolist())
+        row_fits = [bin_fit for bin_fit, b in zip(bin_fit_seconds, bins) for _ in b]
+        for row, (central_row, fit_seconds), row_result in zip(rows, row_fits, row_results):
+            slope_fit, slope_unc_fit, intercept_fit, intercept_unc_fit, cov_fit, qc_code = row_result
+            self.pixelscale_list.append(float(slope_fit))
+            self.pixelscale_unc_list.append(float(slope_unc_fit))
+            self.pixelscale_intercept_list.append(float(intercept_fit))
+            self.pixelscale_intercept_unc_list.append(float(intercept_unc_fit))
+            self.pixelscale_intercept_cov_list.append(float(cov_fit))
+            self.qc_reason_list.append(self.QC_REASONS[int(qc_code)])
+            if metrics_enabled():
+                self._log_row_metrics(row, central_row, fit_seconds)
+    
+    def _get_row_parameters(self, row: int) -> dict:
+        """
+        Fitting parameters of a row, cut down to the windows of the lines in use.
+        
+        Raises
+        ------
+        ValueError
+            If the row has no parameters
+        """
+        from modules.calibration_params_loader import get_parameters_for_row
+        from modules.line_catalogue import get_fit_windows
+        
+        params = get_parameters_for_row(row)
+        idx_interval_dic, init_parameters_dic = get_fit_windows(params, self.line_catalogue, self.lines)
+        return {**params, 'idx_interval': idx_interval_dic, 'init_parameters': init_parameters_dic}
+    
+    def _compute_options_fingerprint(self) -> str:
+        """
+        Fingerprint of everything besides a row's own data and parameters
+        that affects its fit (options and, for 'xcorr', the reference fit).
+        """
+        options = self.get_options()
+        options.pop('row_start')
+        options.pop('row_end')
+        digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8'))
+        if self.centroid_mode == 'xcorr':
+            for interval_str in sorted(self._xcorr_reference.keys()):
+                idx_interval, popt, perr = self._xcorr_reference[interval_str]
+                digest.update(np.asarray(popt, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+    
+    def _fit_fingerprint(self, row: int, params: dict, bin_rows: list = None) -> str:
+        """
+        Fingerprint of one fit: its parameter set and the averaged spectra it uses.
+        """
+        rows = list(bin_rows) if bin_rows is not None else [int(row)]
+        digest = hashlib.sha256(self._options_fingerprint.encode('utf-8'))
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        digest.update(np.asarray(rows, dtype=np.int64).tobytes())
+        for raster in (self._raster_average, self._raster_average_unc):
+            block = raster[rows, :]
+            digest.update(np.ascontiguousarray(np.ma.getdata(block)).tobytes())
+            digest.update(np.ascontiguousarray(np.ma.getmaskarray(block)).tobytes())
+        return digest.hexdigest()
+    
+    def _cached_process_row(self, fingerprint: str, rows: list, *args, **kwargs):
+        """
+        Run `_process_row`, or reuse the stored result of an identical fit.
+        """
+        if self._incremental and fingerprint in self._fit_cache:
+            result = self._fit_cache[fingerprint]
+            self._last_fit_seconds = None
+        else:
+            t0 = time.perf_counter()
+            with self.instrumentation.stage('fit_row'):
+                result = tuple(float(x) for x in self._process_row(*args, **kwargs))
+            self._last_fit_seconds = time.perf_counter() - t0
+            self.refitted_rows.extend(int(r) for r in rows)
+        self._new_fit_cache[fingerprint] = result
+        return result
+    
+    def _log_row_metrics(self, row: int, fitted_row: int, fit_seconds: float):
+        """
+        Write the metrics record of the last row appended to the results.
+        
+        `fitted_row` is the row whose spectrum (or bin) was fitted, and
+        `fit_seconds` is None when a stored result was reused.
+        """
+        log_metrics(
+            'calibration_row',
+            row=int(row),
+            fitted_row=int(fitted_row),
+            slope=self.pixelscale_list[-1],
+            slope_unc=self.pixelscale_unc_list[-1],
+            intercept=self.pixelscale_intercept_list[-1],
+            intercept_unc=self.pixelscale_intercept_unc_list[-1],
+            slope_intercept_cov=self.pixelscale_intercept_cov_list[-1],
+            fit_seconds=fit_seconds,
+            refitted=fit_seconds is not None,
+            xcorr_fallback=int(fitted_row) in self.xcorr_fallback_rows,
+            fit_status=self.fit_status.get(int(fitted_row)),
+            fit_solver=self.fit_solver.get(int(fitted_row)),
+            qc_reason=self.qc_reason_list[-1],
+            reseeded=int(fitted_row) in self.reseeded_rows,
+        )
     
     def _load_data(self, data_path: str, sumer_filename_list: list):
         """Load and average SUMER spectral data from FITS files."""
-        print("Loading SUMER data...")
+        logger.info("Loading SUMER data...")
         
-        # Load all data files
-        sumer_data_list = []
-        sumer_data_unc_list = []
-        files_loaded = 0
+        if self.averaging == 'sigma_clip':
+            self._load_data_clipped(data_path, sumer_filename_list)
+            return
         
+        # Fold the files one at a time into the accumulators
+        self._reset_frame_accumulators()
+        self.raster_rejected = None
         for filename in sumer_filename_list:
-            # Skip Level 1 files (they have different structure)
-            if '_l1.fits' in filename.lower():
-                continue
-            
-            filepath = os.path.join(data_path, filename)
-            try:
+            frame = self._load_frame(data_path, filename)
+            if frame is not None:
+                self._accumulate_frame(*frame)
+        
+        # Average all spectral images
+        if self._n_frames == 0:
+            raise ValueError(f"No data files loaded from {data_path}")
+        
+        self._finalize_frames()
+        logger.info("Loaded %d FITS files from %s", self._n_frames, data_path)
+    
+    def _load_frame(self, data_path: str, filename: str):
+        """
+        Read and mask one SUMER exposure.
+        
+        Returns
+        -------
+        tuple or None
+            (data, data_unc), or None for Level 1 and unreadable files
+        """
+        # Skip Level 1 files (they have different structure)
+        if '_l1.fits' in filename.lower():
+            return None
+        
+        filepath = os.path.join(data_path, filename)
+        try:
+            with self.instrumentation.stage('load'):
                 # Use fits.getdata() which handles different HDUs automatically
                 data = fits.getdata(filepath)
-                
-                # Check if data is None
-                if data is None:
-                    print(f"Warning: No data in {filename}")
-                    continue
-                
+            
+            # Check if data is None
+            if data is None:
+                logger.warning("No data in %s", filename)
+                return None
+            
+            with self.instrumentation.stage('mask'):
                 # Convert to float and reverse row order (as in original code)
-                data = data.astype(float)[::-1, :]
+                data = data.astype(self.dtype)[::-1, :]
                 
                 # Mask defective pixels
                 data = _mask_all_defective_pixels_DetA(data)
@@ -221,44 +887,213 @@ class CalibrationParameters:
                 # Calculate uncertainties (assuming Poisson noise)
                 # Data uncertainty = sqrt(data * factor_fullspectrum) / t_exp
                 data_unc = np.sqrt(np.abs(data) * self.factor_fullspectrum) / self.exposure_time
-                
-                sumer_data_list.append(data)
-                sumer_data_unc_list.append(data_unc)
-                files_loaded += 1
-                
-            except Exception as e:
-                print(f"Warning: Could not load {filename}: {e}")
         
-        # Average all spectral images
-        if not sumer_data_list:
-            raise ValueError(f"No data files loaded from {data_path}")
+        except Exception as e:
+            logger.warning("Could not load %s: %s", filename, e)
+            return None
         
-        # Use np.mean() on masked arrays directly - automatically ignores masked values
-        # This matches the original code behavior
-        self._raster_average = np.mean(sumer_data_list, axis=0)
+        return data, data_unc
+    
+    def _load_data_clipped(self, data_path: str, sumer_filename_list: list):
+        """
+        Average the exposures with sigma clipping, one block of rows at a time.
+        
+        The FITS files are memory-mapped, so only `block_rows` rows of every
+        exposure are read into memory at once.
+        """
+        with memmapped_frames(data_path, sumer_filename_list) as (_, frames):
+            self._start_block_average(frames)
+            for r0 in range(0, frames[0].shape[0], self.block_rows):
+                self._average_row_block(frames, r0, r0 + self.block_rows)
         
-        # Average uncertainty: sqrt(sum(unc^2)) / N
-        data_unc_sumsquare = np.zeros(self._raster_average.shape)
-        for data_unc_i in sumer_data_unc_list:
-            data_unc_sumsquare = data_unc_sumsquare + data_unc_i**2
-        self._raster_average_unc = (1/files_loaded) * np.sqrt(data_unc_sumsquare)
+        self._frame_sum = self._frame_unc_sumsquare = self._frame_scratch = None
+        logger.info(
+            "Loaded %d FITS files from %s (%d values rejected by sigma clipping)",
+            self._n_frames, data_path, int(self.raster_rejected.sum()),
+        )
+    
+    def _start_block_average(self, frames: list):
+        """
+        Prepare averaging memory-mapped exposures block by block.
         
-        print(f"Loaded {files_loaded} FITS files from {data_path}")
+        The raster average starts fully masked; `_average_row_block` fills it.
+        """
+        shape = frames[0].shape
+        self._reset_frame_accumulators()
+        self._frame_sum = np.zeros(shape, dtype=np.float64)
+        self._frame_unc_sumsquare = np.zeros(shape, dtype=np.float64)
+        self._raster_count = np.zeros(shape, dtype=np.int32)
+        self.raster_rejected = (
+            np.zeros(shape, dtype=np.int32) if self.averaging == 'sigma_clip' else None
+        )
+        self._n_frames = len(frames)
+        self._raster_average = np.ma.masked_all(shape, dtype=self.dtype)
+        self._raster_average_unc = np.ma.masked_all(shape, dtype=self.dtype)
     
-    def _process_row(self, row: int, idx_interval_dic: dict, init_parameters_dic: dict):
+    def _average_row_block(self, frames: list, r0: int, r1: int):
         """
-        Process a single row: fit gaussians and compute calibration line.
+        Average rows [r0, r1) of memory-mapped exposures (see `memmapped_frames`).
+        
+        Gives the same values as averaging whole exposures with
+        `_accumulate_frame`; with 'sigma_clip' averaging outliers are
+        rejected first.
+        """
+        n_rows = frames[0].shape[0]
+        r1 = min(r1, n_rows)
+        rows = slice(r0, r1)
+        with self.instrumentation.stage('load'):
+            # FITS files hold the rows in the opposite order
+            block = np.stack([
+                np.asarray(frame[n_rows - r1:n_rows - r0])[::-1] for frame in frames
+            ]).astype(self.dtype)
+        
+        with self.instrumentation.stage('average'):
+            # Same valid pixels as `_load_frame` (defects and negative values masked)
+            valid = (block >= 0) & ~get_defect_mask_DetA(frames[0].shape)[rows]
+            if self.averaging == 'sigma_clip':
+                keep = self._clip_block(block, valid)
+                self.raster_rejected[rows] = (valid & ~keep).sum(axis=0)
+            else:
+                keep = valid
+            
+            # Data uncertainty = sqrt(data * factor_fullspectrum) / t_exp
+            block_unc = np.sqrt(np.abs(block) * self.factor_fullspectrum) / self.exposure_time
+            frame_sum = self._frame_sum[rows]
+            frame_unc_sumsquare = self._frame_unc_sumsquare[rows]
+            scratch = np.empty(frame_sum.shape, dtype=np.float64)
+            for data, data_unc, keep_i in zip(block, block_unc, keep):
+                np.add(frame_sum, data, out=frame_sum, where=keep_i)
+                np.square(data_unc, out=scratch)
+                np.add(frame_unc_sumsquare, scratch, out=frame_unc_sumsquare, where=keep_i)
+            self._raster_count[rows] = keep.sum(axis=0)
+        
+        self._finalize_frames(rows)
+    
+    def _clip_block(self, block, valid):
+        """
+        Sigma-clip a block of rows of all exposures.
+        
+        Parameters
+        ----------
+        block : array
+            (n_exposures, n_rows, n_columns) block of the exposures
+        valid : array
+            Valid (unmasked) values of the block
         
         Returns
         -------
-        tuple
-            (slope, slope_unc, intercept, intercept_unc)
+        array
+            Values kept after clipping
         """
-        x_pixels = np.arange(0, 512)
+        keep = valid
+        for _ in range(max(1, self.clip_iterations)):
+            kept = np.ma.masked_array(block, mask=~keep, dtype=np.float64)
+            center = np.ma.median(kept, axis=0).filled(0.0)
+            scatter = 1.4826 * np.ma.median(np.abs(kept - center), axis=0).filled(0.0)
+            poisson = np.sqrt(np.abs(center) * self.factor_fullspectrum) / self.exposure_time
+            sigma = np.maximum(scatter, poisson)
+            new_keep = valid & (np.abs(block - center) <= self.clip_sigma * sigma)
+            if np.array_equal(new_keep, keep):
+                break
+            keep = new_keep
+        return keep
+    
+    def _reset_frame_accumulators(self):
+        """Reset the per-pixel sums and valid counts of the raster average."""
+        self._frame_sum = None
+        self._frame_unc_sumsquare = None
+        self._frame_scratch = None
+        self._raster_count = None
+        self._n_frames = 0
+    
+    def _accumulate_frame(self, data, data_unc):
+        """
+        Fold one masked exposure into the float64 accumulators, in place.
+        
+        Only unmasked pixels are added, and every pixel counts the exposures
+        it was valid in, so the mean and its uncertainty use the same N.
+        """
+        with self.instrumentation.stage('average'):
+            if self._frame_sum is None:
+                self._frame_sum = np.zeros(data.shape, dtype=np.float64)
+                self._frame_unc_sumsquare = np.zeros(data.shape, dtype=np.float64)
+                self._frame_scratch = np.empty(data.shape, dtype=np.float64)
+                self._raster_count = np.zeros(data.shape, dtype=np.int32)
+            
+            valid = ~(np.ma.getmaskarray(data) | np.ma.getmaskarray(data_unc))
+            np.add(self._frame_sum, np.ma.getdata(data), out=self._frame_sum, where=valid)
+            np.square(np.ma.getdata(data_unc), out=self._frame_scratch)
+            np.add(self._frame_unc_sumsquare, self._frame_scratch,
+                   out=self._frame_unc_sumsquare, where=valid)
+            self._raster_count += valid
+            self._n_frames += 1
+    
+    def _finalize_frames(self, rows: slice = None):
+        """
+        Turn the accumulators into the masked raster average and its uncertainty.
+        
+        average = sum(data_i) / n and uncertainty = sqrt(sum(unc_i^2)) / n,
+        where n counts the exposures in which the pixel is valid. Pixels
+        that are never valid are masked.
+        
+        Parameters
+        ----------
+        rows : slice, default=None
+            Only finalize these rows of the raster average (set up by
+            `_start_block_average`). If None, new raster average arrays are
+            made from all rows and the accumulators are released.
+        """
+        with self.instrumentation.stage('average'):
+            block = slice(None) if rows is None else rows
+            count = self._raster_count[block]
+            no_data = count == 0
+            average = np.zeros(count.shape, dtype=np.float64)
+            np.divide(self._frame_sum[block], count, out=average, where=~no_data)
+            average_unc = np.sqrt(self._frame_unc_sumsquare[block])
+            np.divide(average_unc, count, out=average_unc, where=~no_data)
+            average_unc[no_data] = 0.0
+            
+            average = np.ma.masked_array(average.astype(self.dtype), mask=no_data)
+            average_unc = np.ma.masked_array(average_unc.astype(self.dtype), mask=no_data)
+            if rows is None:
+                self._raster_average = average
+                self._raster_average_unc = average_unc
+                # Only the valid counts are kept
+                self._frame_sum = self._frame_unc_sumsquare = self._frame_scratch = None
+            else:
+                self._raster_average[rows] = average
+                self._raster_average_unc[rows] = average_unc
+    
+    def _get_binned_spectrum(self, bin_rows: list):
+        """
+        Average several rows of the raster average with propagated uncertainties.
+        
+        The mean of k rows has uncertainty sqrt(sum(unc_i^2)) / k, counting only
+        the unmasked rows of each column.
+        """
+        block = self._raster_average[bin_rows, :]
+        block_unc = self._raster_average_unc[bin_rows, :]
         
+        n_valid = np.ma.count(block, axis=0)
+        y_radiance_row = np.ma.mean(block, axis=0)
+        y_unc_radiance_row = np.ma.sqrt(np.ma.sum(block_unc**2, axis=0)) / n_valid
+        return y_radiance_row, y_unc_radiance_row
+    
+    def _get_row_spectrum(self, row: int, bin_rows: list = None):
+        """
+        Get the (scaled) spectrum of one row, or of a bin of rows, ready for fitting.
+        
+        Returns
+        -------
+        tuple
+            (y_radiance, y_unc_radiance) with masked values filled
+        """
         # Extract row data and handle masked arrays
-        y_radiance_row = self._raster_average[row, :]
-        y_unc_radiance_row = self._raster_average_unc[row, :]
+        if bin_rows is not None and len(bin_rows) > 1:
+            y_radiance_row, y_unc_radiance_row = self._get_binned_spectrum(bin_rows)
+        else:
+            y_radiance_row = self._raster_average[row, :]
+            y_unc_radiance_row = self._raster_average_unc[row, :]
         
         # Convert masked arrays to regular arrays if necessary
         if np.ma.is_masked(y_radiance_row):
@@ -266,115 +1101,576 @@ class CalibrationParameters:
         if np.ma.is_masked(y_unc_radiance_row):
             y_unc_radiance_row = np.ma.filled(y_unc_radiance_row, np.mean(y_unc_radiance_row.compressed()))
         
-        y_radiance = 10 * y_radiance_row
-        y_unc_radiance = 10 * y_unc_radiance_row
+        # Fits always run in double precision
+        y_radiance = 10 * np.asarray(y_radiance_row, dtype=np.float64)
+        y_unc_radiance = 10 * np.asarray(y_unc_radiance_row, dtype=np.float64)
+        return y_radiance, y_unc_radiance
+    
+    def _process_row(self, row: int, idx_interval_dic: dict, init_parameters_dic: dict,
+                     bin_rows: list = None):
+        """
+        Process a single row: fit gaussians and compute calibration line.
         
-        # Perform multi-gaussian fits and extract means
-        means_fit, means_unc_fit = self._fit_spectral_intervals(
-            x_pixels, y_radiance, y_unc_radiance, idx_interval_dic, init_parameters_dic
-        )
+        If `bin_rows` is given, the spectra of those rows are averaged and the
+        fit is performed on the binned spectrum instead of on `row` alone.
+        
+        A row whose line fits fail the quality control (see `_check_line_fits`)
+        is refitted once, seeded with the fit of a neighbouring row that
+        passes it. If it still fails, its calibration is NaN.
+        
+        Returns
+        -------
+        tuple
+            (slope, slope_unc, intercept, intercept_unc, slope_intercept_cov,
+            qc_code) where qc_code indexes `QC_REASONS` (0 if the row passed
+            the quality control)
+        """
+        x_pixels = np.arange(0, 512)
+        y_radiance, y_unc_radiance = self._get_row_spectrum(row, bin_rows)
+        
+        means_fit = None
+        if self.centroid_mode == 'xcorr' and row != self.reference_row:
+            # Fast path: shift the reference fit; full fit if the correlation is poor
+            means_fit, means_unc_fit = self._xcorr_centroids(x_pixels, y_radiance)
+            if means_fit is None:
+                self.xcorr_fallback_rows.append(int(row))
+            else:
+                reason = 'ok' if self._match_line_indices(means_fit) is not None else 'line_missing'
+        
+        if means_fit is None:
+            # Perform multi-gaussian fits and extract means
+            means_fit, means_unc_fit, window_fits = self._fit_spectral_intervals(
+                x_pixels, y_radiance, y_unc_radiance, idx_interval_dic, init_parameters_dic
+            )
+            reason = self._check_line_fits(means_fit, window_fits)
+            if reason != 'ok':
+                seeded_parameters_dic = self._reseed_parameters(row, bin_rows, init_parameters_dic)
+                if seeded_parameters_dic is not None:
+                    self.reseeded_rows.append(int(row))
+                    means_fit, means_unc_fit, window_fits = self._fit_spectral_intervals(
+                        x_pixels, y_radiance, y_unc_radiance, idx_interval_dic, seeded_parameters_dic
+                    )
+                    reason = self._check_line_fits(means_fit, window_fits)
+            self.fit_status[int(row)] = {key: fit['status'] for key, fit in window_fits.items()}
+            self.fit_solver[int(row)] = {key: fit['solver'] for key, fit in window_fits.items()}
+        
+        if reason != 'ok':
+            logger.info("Row %d failed the quality control: %s", row, reason)
+            return np.nan, np.nan, np.nan, np.nan, np.nan, self.QC_REASONS.index(reason)
         
         # Match fitted means to calibration lines based on rough estimates
         means_px, means_unc_px = self._match_lines_to_calibration(means_fit, means_unc_fit)
         
         # Fit calibration line
-        slope_fit, slope_unc_fit, intercept_fit, intercept_unc_fit = (
-            self._fit_calibration_line(means_px, means_unc_px)
-        )
+        with self.instrumentation.stage('fit_line'):
+            slope_fit, intercept_fit, covariance = self._fit_calibration_line(means_px, means_unc_px)
         
-        return slope_fit, slope_unc_fit, intercept_fit, intercept_unc_fit
+        if self.uncertainty == 'bootstrap':
+            with self.instrumentation.stage('bootstrap'):
+                covariance = self._bootstrap_covariance(
+                    row, x_pixels, y_radiance, y_unc_radiance, idx_interval_dic, window_fits,
+                    self._match_line_indices(means_fit), means_unc_px,
+                )
+        
+        slope_unc_fit, intercept_unc_fit = np.sqrt(np.diag(covariance))
+        return slope_fit, slope_unc_fit, intercept_fit, intercept_unc_fit, covariance[0, 1], 0
     
     def _fit_spectral_intervals(self, x_pixels, y_radiance, y_unc_radiance, idx_interval_dic, init_parameters_dic):
-        """Fit multi-gaussian functions to spectral intervals."""
+        """
+        Fit multi-gaussian functions to spectral intervals.
+        
+        Returns
+        -------
+        tuple
+            (means_fit, means_unc_fit, window_fits) where window_fits gives,
+            for every interval, its fit status and solver, parameters (None if
+            the fit failed), bounds, reduced chi-square and the index of its
+            first component in means_fit
+        """
         means_fit, means_unc_fit = [], []
+        window_fits = {}
         
         for interval_str in sorted(idx_interval_dic.keys()):
             init_parameters = init_parameters_dic[interval_str]
             idx_interval = idx_interval_dic[interval_str]
+            n_gaussians = (len(init_parameters) - 1) // 3
             
+            with self.instrumentation.stage('fit_interval'):
+                popt, perr, status, solver = self._fit_interval(
+                    x_pixels, y_radiance, y_unc_radiance, interval_str, idx_interval, init_parameters
+                )
             x_data = x_pixels[idx_interval[0]:idx_interval[1]+1]
-            y_data = y_radiance[idx_interval[0]:idx_interval[1]+1]
-            y_unc_data = y_unc_radiance[idx_interval[0]:idx_interval[1]+1]
-            
-            # Convert masked arrays to regular arrays for curve_fit
-            if np.ma.is_masked(y_data):
-                y_data = np.ma.filled(y_data, np.mean(y_data.compressed()))
-            if np.ma.is_masked(y_unc_data):
-                y_unc_data = np.ma.filled(y_unc_data, np.mean(y_unc_data.compressed()))
+            lower, upper, _ = self._interval_bounds(x_data, init_parameters)
+            window_fits[interval_str] = {
+                'status': status,
+                'solver': solver,
+                'popt': popt,
+                'lower': lower,
+                'upper': upper,
+                'reduced_chi2': np.nan,
+                'first': len(means_fit),
+            }
+            if popt is None:
+                # Append NaNs for each gaussian component means to keep indexing
+                for _ in range(n_gaussians):
+                    means_fit.append(np.nan)
+                    means_unc_fit.append(np.nan)
+                continue
             
-            # Fit multi-gaussian with robust error handling
-            try:
-                popt, pcov = curve_fit(
-                    self._multigaussian_for_curvefit,
-                    x_data, y_data,
-                    p0=init_parameters,
-                    sigma=y_unc_data,
-                    absolute_sigma=True,
+            n_dof = len(x_data) - len(popt)
+            if n_dof > 0:
+                residuals = (
+                    (y_radiance[idx_interval[0]:idx_interval[1]+1]
+                     - self._multigaussian_for_curvefit(x_data, *popt))
+                    / y_unc_radiance[idx_interval[0]:idx_interval[1]+1]
                 )
-            except RuntimeError as e:
-                # Retry with larger maxfev, then without sigma as fallback
-                try:
-                    popt, pcov = curve_fit(
-                        self._multigaussian_for_curvefit,
-                        x_data, y_data,
-                        p0=init_parameters,
-                        sigma=y_unc_data,
-                        absolute_sigma=True,
-                        maxfev=20000,
-                    )
-                except Exception:
-                    try:
-                        popt, pcov = curve_fit(
-                            self._multigaussian_for_curvefit,
-                            x_data, y_data,
-                            p0=init_parameters,
-                            maxfev=20000,
-                        )
-                    except Exception as e_final:
-                        # Emit diagnostic info and skip this interval
-                        print('  Warning: fit failed for interval', interval_str)
-                        print('    idx_interval =', idx_interval)
-                        print('    init_parameters =', init_parameters)
-                        print('    x_data len =', len(x_data), 'y_data min/max =', np.min(y_data), np.max(y_data))
-                        print('    y_unc_data min/max =', np.min(y_unc_data), np.max(y_unc_data))
-                        print('    curve_fit error:', e_final)
-                        # Append NaNs for each gaussian component means to keep indexing
-                        n_gaussians = (len(init_parameters) - 1) // 3
-                        for _ in range(n_gaussians):
-                            means_fit.append(np.nan)
-                            means_unc_fit.append(np.nan)
-                        continue
-
-            # Compute parameter uncertainties safely
-            try:
-                perr = np.sqrt(np.diag(pcov))
-            except Exception:
-                perr = np.full(len(popt), np.nan)
+                window_fits[interval_str]['reduced_chi2'] = float(np.sum(residuals**2) / n_dof)
             
             # Extract means from each gaussian component
-            n_gaussians = (len(init_parameters) - 1) // 3
             for n_gaussian_to_analyze in range(n_gaussians):
                 mean_fit = popt[3*n_gaussian_to_analyze + 2]
                 mean_unc_fit = perr[3*n_gaussian_to_analyze + 2]
                 means_fit.append(mean_fit)
                 means_unc_fit.append(mean_unc_fit)
         
+        return means_fit, means_unc_fit, window_fits
+    
+    def _check_line_fits(self, means_fit, window_fits) -> str:
+        """
+        Quality control of the fits of the calibration lines of one row.
+        
+        Returns
+        -------
+        str
+            'ok', or the first reason (see `QC_REASONS`) the row fails:
+            a window fit failed, a line has no centroid of its own, a line
+            centroid is not inside its window (by `QC_EDGE_MARGIN`), a line
+            FWHM is not strictly within its bounds, or the reduced chi-square
+            of a line window exceeds `qc_max_reduced_chi2`
+        """
+        if any(fit['popt'] is None for fit in window_fits.values()):
+            return 'fit_failed'
+        
+        line_indices = self._match_line_indices(means_fit)
+        if line_indices is None:
+            return 'line_missing'
+        
+        windows = sorted(window_fits.values(), key=lambda fit: fit['first'])
+        for index in line_indices:
+            fit = [fit for fit in windows if fit['first'] <= index][-1]
+            k = index - fit['first']
+            mean, fwhm = fit['popt'][3*k + 2], fit['popt'][3*k + 3]
+            if not fit['lower'][3*k + 2] + self.QC_EDGE_MARGIN <= mean <= fit['upper'][3*k + 2] - self.QC_EDGE_MARGIN:
+                return 'centroid_outside_window'
+            tolerance = 1e-6 * max(1.0, abs(fwhm))
+            if not fit['lower'][3*k + 3] + tolerance < fwhm < fit['upper'][3*k + 3] - tolerance:
+                return 'fwhm_out_of_range'
+            if self.qc_max_reduced_chi2 is not None and fit['reduced_chi2'] > self.qc_max_reduced_chi2:
+                return 'chi2_too_high'
+        return 'ok'
+    
+    def _reseed_parameters(self, row: int, bin_rows: list, init_parameters_dic: dict):
+        """
+        Initial parameters taken from the fit of the nearest neighbouring row
+        (or bin) that passes the quality control.
+        
+        Neighbours are tried at the offsets `QC_RESEED_OFFSETS` (in rows, or
+        in bins of the same size), whatever the row range of this run, so
+        the seeds do not depend on how the rows are split between workers.
+        
+        Returns
+        -------
+        dict
+            Initial parameters of every interval (the neighbour's fitted
+            parameters where its interval has the same components), or None
+            if no neighbour passes the quality control
+        """
+        from modules.calibration_params_loader import get_all_rows
+        
+        rows = list(bin_rows) if bin_rows is not None else [int(row)]
+        available = set(get_all_rows())
+        x_pixels = np.arange(0, 512)
+        
+        for offset in self.QC_RESEED_OFFSETS:
+            neighbour_rows = [r + offset * len(rows) for r in rows]
+            if not all(r in available for r in neighbour_rows):
+                continue
+            key = tuple(neighbour_rows)
+            if key not in self._neighbour_fits:
+                neighbour_row = int(row) + offset * len(rows)
+                params = self._get_row_parameters(neighbour_row)
+                y_radiance, y_unc_radiance = self._get_row_spectrum(
+                    neighbour_row, neighbour_rows if bin_rows is not None else None
+                )
+                means_fit, _, window_fits = self._fit_spectral_intervals(
+                    x_pixels, y_radiance, y_unc_radiance, params['idx_interval'], params['init_parameters']
+                )
+                passed = self._check_line_fits(means_fit, window_fits) == 'ok'
+                self._neighbour_fits[key] = window_fits if passed else None
+            
+            window_fits = self._neighbour_fits[key]
+            if window_fits is None:
+                continue
+            return {
+                interval_str: (
+                    [float(x) for x in window_fits[interval_str]['popt']]
+                    if interval_str in window_fits
+                    and len(window_fits[interval_str]['popt']) == len(init_parameters)
+                    else init_parameters
+                )
+                for interval_str, init_parameters in init_parameters_dic.items()
+            }
+        return None
+    
+    def _fit_interval(self, x_pixels, y_radiance, y_unc_radiance, interval_str, idx_interval, init_parameters):
+        """
+        Fit a multi-gaussian function to one spectral interval.
+        
+        Returns
+        -------
+        tuple
+            (popt, perr, status, solver), with popt and perr None if the fit
+            failed (see the `fit_status` and `fit_solver` attributes)
+        """
+        x_data = x_pixels[idx_interval[0]:idx_interval[1]+1]
+        y_data = y_radiance[idx_interval[0]:idx_interval[1]+1]
+        y_unc_data = y_unc_radiance[idx_interval[0]:idx_interval[1]+1]
+        
+        # Convert masked arrays to regular arrays for curve_fit
+        if np.ma.is_masked(y_data):
+            y_data = np.ma.filled(y_data, np.mean(y_data.compressed()))
+        if np.ma.is_masked(y_unc_data):
+            y_unc_data = np.ma.filled(y_unc_data, np.mean(y_unc_data.compressed()))
+        
+        if self.fit_method == 'trf':
+            popt, pcov, status, solver = self._fit_interval_bounded(x_data, y_data, y_unc_data, init_parameters)
+        else:
+            popt, pcov, status = self._fit_interval_unbounded(x_data, y_data, y_unc_data, init_parameters)
+            solver = 'lm'
+        
+        if popt is None:
+            # Emit diagnostic info and skip this interval
+            logger.warning("Fit failed for interval %s: %s", interval_str, pcov)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "idx_interval = %s, init_parameters = %s, x_data len = %d, "
+                    "y_data min/max = %g/%g, y_unc_data min/max = %g/%g",
+                    idx_interval, init_parameters, len(x_data),
+                    np.min(y_data), np.max(y_data), np.min(y_unc_data), np.max(y_unc_data),
+                )
+            return None, None, status, solver
+        
+        # Compute parameter uncertainties safely
+        try:
+            perr = np.sqrt(np.diag(pcov))
+        except Exception:
+            perr = np.full(len(popt), np.nan)
+        
+        return popt, perr, status, solver
+    
+    @classmethod
+    def _interval_bounds(cls, x_data, init_parameters):
+        """
+        Bounds of the multi-gaussian parameters over one fitting window.
+        
+        The background and the amplitudes are non-negative, the means lie
+        within the window and every FWHM stays within a factor `FWHM_FACTOR`
+        of its initial guess (and between `FWHM_MIN` and the window width).
+        
+        Returns
+        -------
+        tuple
+            (lower, upper) bounds, and the initial parameters clipped to them
+        """
+        p0 = np.asarray(init_parameters, dtype=float)
+        n = (len(p0) - 1) // 3
+        width = max(float(x_data[-1] - x_data[0]), cls.FWHM_MIN)
+        fwhm0 = np.clip(p0[3::3], cls.FWHM_MIN, width)
+        
+        lower = np.zeros(len(p0))
+        upper = np.full(len(p0), np.inf)
+        lower[2::3], upper[2::3] = x_data[0], x_data[-1]
+        lower[3::3] = np.maximum(cls.FWHM_MIN, fwhm0 / cls.FWHM_FACTOR)
+        upper[3::3] = np.minimum(width, fwhm0 * cls.FWHM_FACTOR)
+        return lower, upper, np.clip(p0, lower, upper)
+    
+    def _fit_interval_bounded(self, x_data, y_data, y_unc_data, init_parameters):
+        """
+        Bounded fit of one window.
+        
+        A Levenberg-Marquardt fit with the analytic Jacobian runs first, with
+        at most `FIT_LM_MAX_NFEV` evaluations: when it converges inside the
+        bounds, it is also the solution of the bounded problem. Otherwise the
+        bounded trust-region fit runs, retried once with more evaluations if
+        it does not converge.
+        
+        Returns
+        -------
+        tuple
+            (popt, pcov, status, solver), or (None, error, 'failed', 'trf')
+        """
+        lower, upper, p0 = self._interval_bounds(x_data, init_parameters)
+        fit_kwargs = dict(
+            p0=p0, sigma=y_unc_data, absolute_sigma=True, jac=self._multigaussian_jacobian,
+        )
+        
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', OptimizeWarning)
+                popt, pcov = curve_fit(
+                    self._multigaussian_for_curvefit, x_data, y_data,
+                    maxfev=self.FIT_LM_MAX_NFEV, **fit_kwargs,
+                )
+            if np.all((popt >= lower) & (popt <= upper)) and np.all(np.isfinite(pcov)):
+                status = 'at_bound' if self._means_or_fwhms_at_bound(popt, lower, upper) else 'converged'
+                return popt, pcov, status, 'lm'
+        except (RuntimeError, ValueError):
+            pass
+        
+        status = 'converged'
+        for max_nfev in (None, self.FIT_RETRY_MAX_NFEV):
+            try:
+                popt, pcov = curve_fit(
+                    self._multigaussian_for_curvefit, x_data, y_data,
+                    bounds=(lower, upper), method='trf', max_nfev=max_nfev, **fit_kwargs,
+                )
+                break
+            except (RuntimeError, ValueError) as e:
+                if max_nfev is not None or isinstance(e, ValueError):
+                    return None, e, 'failed', 'trf'
+                status = 'retried'
+        
+        if status == 'converged' and self._means_or_fwhms_at_bound(popt, lower, upper):
+            status = 'at_bound'
+        return popt, pcov, status, 'trf'
+    
+    @staticmethod
+    def _means_or_fwhms_at_bound(popt, lower, upper):
+        """
+        Whether a fitted mean or FWHM lies on its bound.
+        
+        A mean on the window edge or a FWHM on its limit means the model does
+        not describe the data well. The background and the amplitudes are
+        left out: a zero background or a faint line is a good fit.
+        """
+        shape = np.zeros(len(popt), dtype=bool)
+        shape[2::3] = True
+        shape[3::3] = True
+        tolerance = 1e-6 * np.maximum(1.0, np.abs(popt))
+        return bool(np.any(shape & ((popt - lower <= tolerance) | (upper - popt <= tolerance))))
+    
+    def _fit_interval_unbounded(self, x_data, y_data, y_unc_data, init_parameters):
+        """
+        Unbounded Levenberg-Marquardt fit of one window, retried with more
+        evaluations and then without uncertainties.
+        
+        Returns
+        -------
+        tuple
+            (popt, pcov, status), or (None, error, 'failed')
+        """
+        # Fit multi-gaussian with robust error handling
+        try:
+            popt, pcov = curve_fit(
+                self._multigaussian_for_curvefit,
+                x_data, y_data,
+                p0=init_parameters,
+                sigma=y_unc_data,
+                absolute_sigma=True,
+            )
+            return popt, pcov, 'converged'
+        except RuntimeError:
+            pass
+        
+        # Retry with larger maxfev, then without sigma as fallback
+        try:
+            popt, pcov = curve_fit(
+                self._multigaussian_for_curvefit,
+                x_data, y_data,
+                p0=init_parameters,
+                sigma=y_unc_data,
+                absolute_sigma=True,
+                maxfev=self.FIT_RETRY_MAX_NFEV,
+            )
+            return popt, pcov, 'retried'
+        except Exception:
+            pass
+        try:
+            popt, pcov = curve_fit(
+                self._multigaussian_for_curvefit,
+                x_data, y_data,
+                p0=init_parameters,
+                maxfev=self.FIT_RETRY_MAX_NFEV,
+            )
+            return popt, pcov, 'unweighted'
+        except Exception as e_final:
+            return None, e_final, 'failed'
+    
+    def _prepare_xcorr_reference(self):
+        """
+        Run the full multi-gaussian fit on the reference row for the xcorr mode.
+        
+        The fitted model of every interval is kept as the template against
+        which the other rows are cross-correlated.
+        """
+        params = self._get_row_parameters(self.reference_row)
+        x_pixels = np.arange(0, 512)
+        y_radiance, y_unc_radiance = self._get_row_spectrum(self.reference_row)
+        
+        self._xcorr_reference = {}
+        for interval_str in sorted(params['idx_interval'].keys()):
+            idx_interval = params['idx_interval'][interval_str]
+            popt, perr, _, _ = self._fit_interval(
+                x_pixels, y_radiance, y_unc_radiance, interval_str, idx_interval,
+                params['init_parameters'][interval_str]
+            )
+            if popt is None:
+                raise RuntimeError(
+                    f"Reference row {self.reference_row} could not be fitted in interval "
+                    f"{interval_str}; choose another reference_row"
+                )
+            self._xcorr_reference[interval_str] = (idx_interval, popt, perr)
+    
+    def _xcorr_centroids(self, x_pixels, y_radiance):
+        """
+        Measure line centroids of a row by cross-correlation with the reference fit.
+        
+        Each interval of the row is cross-correlated (FFT, sub-pixel peak
+        interpolation) with the reference multi-gaussian model. The shift, and
+        optionally a stretch about the interval centre, is applied to the
+        reference means. Centroid uncertainties are taken from the reference fit.
+        
+        Returns
+        -------
+        tuple
+            (means_fit, means_unc_fit), or (None, None) if the correlation peak
+            quality of any interval is below `xcorr_min_quality`
+        """
+        means_fit, means_unc_fit = [], []
+        stretches = np.linspace(-0.01, 0.01, 21) if self.xcorr_stretch else np.zeros(1)
+        
+        for interval_str in sorted(self._xcorr_reference.keys()):
+            idx_interval, popt, perr = self._xcorr_reference[interval_str]
+            x_data = x_pixels[idx_interval[0]:idx_interval[1]+1]
+            y_data = y_radiance[idx_interval[0]:idx_interval[1]+1]
+            if np.ma.is_masked(y_data):
+                y_data = np.ma.filled(y_data, np.mean(y_data.compressed()))
+            y_data = np.asarray(y_data, dtype=float)
+            x_centre = 0.5 * (x_data[0] + x_data[-1])
+            
+            best = None
+            for stretch in stretches:
+                params = np.array(popt, dtype=float)
+                params[2::3] = x_centre + (1 + stretch) * (params[2::3] - x_centre)
+                params[3::3] = (1 + stretch) * params[3::3]
+                model = self._multigaussian_for_curvefit(x_data, *params)
+                shift, quality = self._xcorr_shift(y_data, model)
+                if best is None or quality > best[2]:
+                    best = (stretch, shift, quality)
+            
+            stretch, shift, quality = best
+            if not quality >= self.xcorr_min_quality:
+                return None, None
+            
+            means_ref = np.asarray(popt[2::3], dtype=float)
+            means_fit.extend(x_centre + (1 + stretch) * (means_ref - x_centre) + shift)
+            means_unc_fit.extend(perr[2::3])
+        
         return means_fit, means_unc_fit
     
-    def _match_lines_to_calibration(self, means_fit, means_unc_fit):
-        """Match fitted line means to known calibration wavelengths."""
-        means_px, means_unc_px = [], []
+    @staticmethod
+    def _xcorr_shift(y_data, model):
+        """
+        Sub-pixel shift of `y_data` relative to `model` from their cross-correlation.
+        
+        Returns
+        -------
+        tuple
+            (shift, quality) where quality is the normalised correlation
+            coefficient at the peak (1 for a perfect match)
+        """
+        a = y_data - np.mean(y_data)
+        b = model - np.mean(model)
+        n = len(a)
+        
+        # Zero-padded FFT correlation, reordered to lags -(n-1)..(n-1)
+        n_fft = 1 << int(np.ceil(np.log2(2 * n)))
+        cc = np.fft.irfft(np.fft.rfft(a, n_fft) * np.conj(np.fft.rfft(b, n_fft)), n_fft)
+        cc = np.concatenate([cc[-(n - 1):], cc[:n]])
+        lags = np.arange(-(n - 1), n)
+        
+        norm = np.sqrt(np.sum(a**2) * np.sum(b**2))
+        i_peak = int(np.argmax(cc))
+        quality = cc[i_peak] / norm if norm > 0 else 0.0
+        
+        # Gaussian (log-parabolic) peak interpolation, parabolic if not positive
+        delta = 0.0
+        if 0 < i_peak < len(cc) - 1:
+            c_m, c_0, c_p = cc[i_peak - 1], cc[i_peak], cc[i_peak + 1]
+            if c_m > 0 and c_0 > 0 and c_p > 0:
+                c_m, c_0, c_p = np.log(c_m), np.log(c_0), np.log(c_p)
+            denominator = c_m - 2 * c_0 + c_p
+            if denominator < 0:
+                delta = 0.5 * (c_m - c_p) / denominator
         
-        for rough_px in self.rough_pixel_estimates:
-            # Find the fitted mean closest to this rough estimate
-            nearest_index = min(range(len(means_fit)), key=lambda i: abs(means_fit[i] - rough_px))
-            means_px.append(means_fit[nearest_index])
-            means_unc_px.append(means_unc_fit[nearest_index])
+        return lags[i_peak] + delta, quality
+    
+    def _match_line_indices(self, means_fit):
+        """
+        Index in means_fit of the centroid of every calibration line.
+        
+        The lines take distinct finite fitted means in the order of their
+        rough pixel estimates, with the smallest total distance to those
+        estimates (so two close lines shifted on the detector do not both
+        take the same centroid). Returns None if there are fewer finite
+        means than lines.
+        """
+        finite = sorted(
+            (i for i in range(len(means_fit)) if np.isfinite(means_fit[i])), key=lambda i: means_fit[i]
+        )
+        order = np.argsort(self.rough_pixel_estimates, kind='stable')
+        n_lines, n_means = len(order), len(finite)
+        if n_means < n_lines:
+            return None
+        
+        # cost[k, j]: lines order[:k+1] matched, line order[k] taking finite[j]
+        distance = np.abs(
+            np.asarray(means_fit)[finite][None, :]
+            - np.asarray(self.rough_pixel_estimates, dtype=float)[order][:, None]
+        )
+        cost = np.full((n_lines, n_means), np.inf)
+        previous = np.zeros((n_lines, n_means), dtype=int)
+        cost[0] = distance[0]
+        for k in range(1, n_lines):
+            for j in range(k, n_means):
+                best = int(np.argmin(cost[k - 1, :j]))
+                cost[k, j] = cost[k - 1, best] + distance[k, j]
+                previous[k, j] = best
         
+        indices = [0] * n_lines
+        j = int(np.argmin(cost[-1]))
+        for k in range(n_lines - 1, -1, -1):
+            indices[order[k]] = finite[j]
+            j = previous[k, j]
+        return indices
+    
+    def _match_lines_to_calibration(self, means_fit, means_unc_fit):
+        """Match fitted line means to known calibration wavelengths."""
+        indices = self._match_line_indices(means_fit)
+        means_px = [means_fit[i] for i in indices]
+        means_unc_px = [means_unc_fit[i] for i in indices]
         return means_px, means_unc_px
     
     def _fit_calibration_line(self, means_px, means_unc_px):
-        """Fit wavelength = slope * pixel + intercept."""
+        """
+        Fit wavelength = slope * pixel + intercept.
+        
+        Returns
+        -------
+        tuple
+            (slope, intercept, covariance) with the (2, 2) covariance of
+            (slope, intercept)
+        """
         from scipy.odr import Model, RealData, ODR
         
         # Orthogonal Distance Regression (accounts for uncertainties in both x and y)
@@ -388,10 +1684,58 @@ class CalibrationParameters:
         
         slope_fit = output.beta[0]
         intercept_fit = output.beta[1]
-        slope_unc_fit = output.sd_beta[0]
-        intercept_unc_fit = output.sd_beta[1]
+        # Scaled like sd_beta, whose squares are its diagonal
+        covariance = output.cov_beta * output.res_var
         
-        return slope_fit, slope_unc_fit, intercept_fit, intercept_unc_fit
+        return slope_fit, intercept_fit, covariance
+    
+    def _bootstrap_covariance(self, row: int, x_pixels, y_radiance, y_unc_radiance,
+                              idx_interval_dic: dict, window_fits: dict, line_indices: list,
+                              means_unc_px: list):
+        """
+        Covariance of the slope and intercept from `n_bootstrap` realizations
+        of the spectrum of one row (see utils.bootstrap).
+        
+        Every window is refitted on all realizations at once, starting from
+        its nominal fit; realizations in which a window fit does not converge
+        are left out.
+        
+        Returns
+        -------
+        array
+            (2, 2) covariance of (slope, intercept), NaN if fewer than two
+            realizations converged
+        """
+        from utils.bootstrap import bootstrap_window_fits, bootstrap_calibration_lines
+        
+        rng = np.random.default_rng([self.bootstrap_seed, int(row)])
+        means_samples = np.empty((self.n_bootstrap, len(means_unc_px)))
+        windows = sorted(window_fits.items(), key=lambda item: item[1]['first'])
+        for interval_str, fit in windows:
+            first_px, last_px = idx_interval_dic[interval_str]
+            window = slice(first_px, last_px + 1)
+            lower, upper = (fit['lower'], fit['upper']) if self.fit_method == 'trf' else (None, None)
+            params = bootstrap_window_fits(
+                x_pixels[window], y_radiance[window], y_unc_radiance[window],
+                fit['popt'], lower, upper, self.n_bootstrap, rng,
+            )
+            n_components = (len(fit['popt']) - 1) // 3
+            for i_line, index in enumerate(line_indices):
+                if fit['first'] <= index < fit['first'] + n_components:
+                    means_samples[:, i_line] = params[:, 3*(index - fit['first']) + 2]
+        
+        slopes, intercepts = bootstrap_calibration_lines(
+            means_samples, self.rest_wavelengths, means_unc_px
+        )
+        valid = np.isfinite(slopes) & np.isfinite(intercepts)
+        if np.count_nonzero(valid) < self.n_bootstrap:
+            logger.debug(
+                "Row %d: %d of %d bootstrap realizations did not converge",
+                row, self.n_bootstrap - np.count_nonzero(valid), self.n_bootstrap,
+            )
+        if np.count_nonzero(valid) < 2:
+            return np.full((2, 2), np.nan)
+        return np.cov(slopes[valid], intercepts[valid])
     
     @staticmethod
     def _multigaussian_for_curvefit(x, *params):
@@ -423,6 +1767,71 @@ class CalibrationParameters:
         
         return result
     
+    @staticmethod
+    def _multigaussian_jacobian(x, *params):
+        """
+        Jacobian of `_multigaussian_for_curvefit` with respect to its parameters.
+        
+        Returns
+        -------
+        array
+            (len(x), len(params)) derivatives
+        """
+        n = (len(params) - 1) // 3
+        x = np.asarray(x, dtype=float)
+        jacobian = np.empty((len(x), len(params)))
+        jacobian[:, 0] = 1.0
+        
+        for i in range(n):
+            amplitude = params[3*i + 1]
+            mean = params[3*i + 2]
+            fwhm = params[3*i + 3]
+            sigma = fwhm / (2 * np.sqrt(2 * np.log(2)))
+            dx = x - mean
+            gaussian = np.exp(-dx**2 / (2 * sigma**2))
+            jacobian[:, 3*i + 1] = gaussian
+            jacobian[:, 3*i + 2] = amplitude * gaussian * dx / sigma**2
+            jacobian[:, 3*i + 3] = amplitude * gaussian * dx**2 / (sigma**2 * fwhm)
+        
+        return jacobian
+    
+    def get_options(self) -> dict:
+        """
+        Get the constructor options that affect the calibration results.
+        
+        Returns
+        -------
+        dict
+            JSON-serialisable dictionary of options (used e.g. as cache key)
+        """
+        return {
+            'row_start': int(self.row_start),
+            'row_end': int(self.row_end),
+            'exposure_time': float(self.exposure_time),
+            'factor_fullspectrum': float(self.factor_fullspectrum),
+            'rest_wavelengths': [float(x) for x in self.rest_wavelengths],
+            'rough_pixel_estimates': [float(x) for x in self.rough_pixel_estimates],
+            'line_catalogue': self.line_catalogue,
+            'lines': list(self.lines),
+            'row_binning': self.row_binning,
+            'bin_assignment': self.bin_assignment,
+            'centroid_mode': self.centroid_mode,
+            'reference_row': int(self.reference_row),
+            'xcorr_stretch': bool(self.xcorr_stretch),
+            'xcorr_min_quality': float(self.xcorr_min_quality),
+            'fit_method': self.fit_method,
+            'qc_max_reduced_chi2': (
+                None if self.qc_max_reduced_chi2 is None else float(self.qc_max_reduced_chi2)
+            ),
+            'uncertainty': self.uncertainty,
+            'n_bootstrap': self.n_bootstrap,
+            'bootstrap_seed': self.bootstrap_seed,
+            'dtype': self.dtype.name,
+            'averaging': self.averaging,
+            'clip_sigma': float(self.clip_sigma),
+            'clip_iterations': self.clip_iterations,
+        }
+    
     def get_slopes(self):
         """Get slopes and their uncertainties."""
         return np.array(self.pixelscale_list), np.array(self.pixelscale_unc_list)
@@ -431,6 +1840,30 @@ class CalibrationParameters:
         """Get intercepts and their uncertainties."""
         return np.array(self.pixelscale_intercept_list), np.array(self.pixelscale_intercept_unc_list)
     
+    def get_covariances(self):
+        """
+        Get the covariance of the slope and intercept of every row.
+        
+        Slopes and intercepts are strongly anti-correlated (the intercept is
+        the wavelength at pixel 0, far from the lines), so wavelengths should
+        be propagated with the full covariance rather than the uncertainties
+        alone (see `PixelInterpolation.propagate_calibration_covariance`).
+        
+        Returns
+        -------
+        array
+            (n_rows, 2, 2) covariances of (slope, intercept), aligned with
+            `get_slopes`, or None if the results were loaded from a file
+            saved without covariances
+        """
+        if len(self.pixelscale_intercept_cov_list) != len(self.pixelscale_list):
+            return None
+        covariances = np.empty((len(self.pixelscale_list), 2, 2))
+        covariances[:, 0, 0] = np.square(self.pixelscale_unc_list)
+        covariances[:, 1, 1] = np.square(self.pixelscale_intercept_unc_list)
+        covariances[:, 0, 1] = covariances[:, 1, 0] = self.pixelscale_intercept_cov_list
+        return covariances
+    
     def get_all_results(self):
         """
         Get all calibration results.
@@ -438,36 +1871,78 @@ class CalibrationParameters:
         Returns
         -------
         dict
-            Dictionary with keys: 'slopes', 'slopes_unc', 'intercepts', 'intercepts_unc'
+            Dictionary with keys: 'slopes', 'slopes_unc', 'intercepts',
+            'intercepts_unc' and 'covariances' (see `get_covariances`)
         """
         return {
             'slopes': np.array(self.pixelscale_list),
             'slopes_unc': np.array(self.pixelscale_unc_list),
             'intercepts': np.array(self.pixelscale_intercept_list),
             'intercepts_unc': np.array(self.pixelscale_intercept_unc_list),
+            'covariances': self.get_covariances(),
         }
     
-    def save_results(self, output_path: str):
+    def get_qc_failures(self) -> list:
         """
-        Save results to npz file.
+        Rows whose calibration failed the quality control.
+        
+        Returns
+        -------
+        list
+            One dict per failed row: {'row': int, 'reason': str}
+        """
+        return [
+            {'row': int(row), 'reason': reason}
+            for row, reason in zip(self.row_list, self.qc_reason_list) if reason != 'ok'
+        ]
+    
+    def save_results(self, output_path: str, format: str = 'npz'):
+        """
+        Save results to disk.
         
         Parameters
         ----------
         output_path : str
             Path to save results (e.g., 'calibration_results.npz')
+        format : str, default='npz'
+            'npz' writes a single NPZ file. 'store' writes the results as
+            arrays of a chunked ResultStore (see utils.result_store), which
+            can also hold the interpolation results of the same raster.
         """
-        np.savez(
-            output_path,
+        results = dict(
             pixelscale_list=np.array(self.pixelscale_list),
             pixelscale_unc_list=np.array(self.pixelscale_unc_list),
             pixelscale_intercept_list=np.array(self.pixelscale_intercept_list),
             pixelscale_intercept_unc_list=np.array(self.pixelscale_intercept_unc_list),
+            qc_reason_list=np.array(self.qc_reason_list, dtype='S32'),
+            **self._get_fit_state(),
         )
-        print(f"Results saved to {output_path}")
+        covariances = self.get_covariances()
+        if covariances is not None:
+            results['pixelscale_covariance'] = covariances
+        
+        if format not in ('npz', 'store'):
+            raise ValueError(f"format must be 'npz' or 'store', got {format!r}")
+        
+        with self.instrumentation.stage('save'):
+            if format == 'store':
+                from utils.result_store import ResultStore
+                with ResultStore(output_path, mode='a') as store:
+                    for name, array in results.items():
+                        store.write_array(name, array)
+                    store.set_attrs(
+                        row_start=int(self.row_start),
+                        row_end=int(self.row_end),
+                        rest_wavelengths=[float(x) for x in self.rest_wavelengths],
+                        lines=list(self.lines),
+                    )
+            else:
+                np.savez(output_path, **results)
+        logger.info("Results saved to %s", output_path)
     
     def load_results(self, output_path: str):
         """
-        Load results from npz file.
+        Load results from an NPZ file or a result store.
         
         Parameters
         ----------
@@ -483,13 +1958,113 @@ class CalibrationParameters:
             return False
         
         try:
-            data = np.load(output_path)
+            from utils.result_store import ResultStore, is_result_store
+            if is_result_store(output_path):
+                with ResultStore(output_path, mode='r') as store:
+                    data = {
+                        name: store.read_array(name) for name in (
+                            'pixelscale_list', 'pixelscale_unc_list',
+                            'pixelscale_intercept_list', 'pixelscale_intercept_unc_list',
+                        )
+                    }
+                    for name in ('row_list', 'row_fingerprints', 'fit_fingerprints', 'fit_results',
+                                 'qc_reason_list', 'pixelscale_covariance'):
+                        if store.has_array(name):
+                            data[name] = store.read_array(name)
+            else:
+                data = np.load(output_path)
+            
             self.pixelscale_list = data['pixelscale_list'].tolist()
             self.pixelscale_unc_list = data['pixelscale_unc_list'].tolist()
             self.pixelscale_intercept_list = data['pixelscale_intercept_list'].tolist()
             self.pixelscale_intercept_unc_list = data['pixelscale_intercept_unc_list'].tolist()
-            print(f"Results loaded from {output_path}")
+            self.pixelscale_intercept_cov_list = (
+                np.asarray(data['pixelscale_covariance'])[:, 0, 1].tolist()
+                if 'pixelscale_covariance' in data else []
+            )
+            self.qc_reason_list = (
+                [reason.decode('ascii') for reason in np.asarray(data['qc_reason_list'])]
+                if 'qc_reason_list' in data else []
+            )
+            self._set_fit_state(data)
+            logger.info("Results loaded from %s", output_path)
             return True
         except Exception as e:
-            print(f"Could not load results from {output_path}: {e}")
+            logger.warning("Could not load results from %s: %s", output_path, e)
             return False
+    
+    def _get_fit_state(self) -> dict:
+        """Arrays needed to reuse the fits in an incremental `compute_calibration`."""
+        fingerprints = list(self._fit_cache.keys())
+        return dict(
+            row_list=np.array(self.row_list, dtype=np.int64),
+            row_fingerprints=np.array(self.row_fingerprints, dtype='S64'),
+            fit_fingerprints=np.array(fingerprints, dtype='S64'),
+            fit_results=np.array(
+                [self._fit_cache[f] for f in fingerprints], dtype=np.float64
+            ).reshape(-1, 6),
+        )
+    
+    def _set_fit_state(self, data):
+        """Restore the state saved by `_get_fit_state` (if present)."""
+        # Results saved before the covariances (or the quality control) kept
+        # fewer values per fit
+        if 'fit_fingerprints' not in data or np.asarray(data['fit_results']).shape[1:] != (6,):
+            self.row_list, self.row_fingerprints, self._fit_cache = [], [], {}
+            return
+        self.row_list = np.asarray(data['row_list']).tolist()
+        self.row_fingerprints = [f.decode('ascii') for f in np.asarray(data['row_fingerprints'])]
+        self._fit_cache = {
+            fingerprint.decode('ascii'): tuple(float(x) for x in result)
+            for fingerprint, result in zip(np.asarray(data['fit_fingerprints']),
+                                           np.asarray(data['fit_results']))
+        }
+
+
+def _calibrate_row_range(state: dict, row_range: tuple) -> dict:
+    """
+    Fit one block of rows in a worker process (see `_compute_parallel_calibration`).
+    
+    Parameters
+    ----------
+    state : dict
+        Options, averaged raster and fit state of the parent calibrator
+    row_range : tuple
+        (row_start, row_end) of the block
+    
+    Returns
+    -------
+    dict
+        Results of the block
+    """
+    calibrator = CalibrationParameters(
+        **{**state['options'], 'row_start': row_range[0], 'row_end': row_range[1]}
+    )
+    calibrator._raster_average = state['raster_average']
+    calibrator._raster_average_unc = state['raster_average_unc']
+    calibrator._xcorr_reference = state['xcorr_reference']
+    calibrator._fit_cache = state['fit_cache']
+    calibrator._incremental = state['incremental']
+    calibrator._options_fingerprint = state['options_fingerprint']
+    
+    if calibrator.row_binning > 1:
+        calibrator._compute_binned_calibration()
+    else:
+        calibrator._compute_row_calibration()
+    
+    return {
+        'row_list': calibrator.row_list,
+        'row_fingerprints': calibrator.row_fingerprints,
+        'pixelscale_list': calibrator.pixelscale_list,
+        'pixelscale_unc_list': calibrator.pixelscale_unc_list,
+        'pixelscale_intercept_list': calibrator.pixelscale_intercept_list,
+        'pixelscale_intercept_unc_list': calibrator.pixelscale_intercept_unc_list,
+        'pixelscale_intercept_cov_list': calibrator.pixelscale_intercept_cov_list,
+        'refitted_rows': calibrator.refitted_rows,
+        'xcorr_fallback_rows': calibrator.xcorr_fallback_rows,
+        'fit_status': calibrator.fit_status,
+        'fit_solver': calibrator.fit_solver,
+        'reseeded_rows': calibrator.reseeded_rows,
+        'qc_reason_list': calibrator.qc_reason_list,
+        'fit_cache': calibrator._new_fit_cache,
+    }
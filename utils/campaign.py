@@ -0,0 +1,366 @@
+"""
+Batch processing of many SUMER observation sets.
+
+A campaign manifest lists observation sets (a data directory and optionally
+its FITS files). Every set is calibrated and then interpolated; sets are
+processed in parallel by a pool of worker processes. The calibration
+parameters are parsed and the detector A defect mask is built once, in the
+parent process, and handed to every worker.
+
+Each set writes its results to <output_dir>/<name>/ together with a
+summary.json. A set whose summary shows it completed with the same inputs
+(files, options, parameters and code version) is skipped, so an interrupted
+campaign resumes where it stopped. <output_dir>/campaign_index.json lists
+every set with its status, outputs and throughput.
+
+Manifest format (JSON)
+----------------------
+{
+    "defaults": {
+        "calibration": {"row_start": 6, "row_end": 323},
+        "interpolation": {"row_reference": 120, "streaming": true, "format": "npy"}
+    },
+    "observation_sets": [
+        {"name": "1996-05-31", "data_path": "/data/sumer/1996-05-31/"},
+        {"name": "1996-06-01", "data_path": "/data/sumer/1996-06-01/",
+         "files": ["sum_960601_1.fits", "sum_960601_2.fits"],
+         "calibration": {"row_binning": 2}}
+    ]
+}
+
+Without "files", every FITS file of the directory except Level 1 files is used.
+
+Example
+-------
+>>> from utils.campaign import run_campaign
+>>>
+>>> index = run_campaign('campaign.json', '../output/campaign', max_workers=8)
+>>> print(index['throughput'])
+"""
+
+import numpy as np
+import os
+import glob
+import json
+import time
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'campaign_index.json'
+SUMMARY_FILENAME = 'summary.json'
+CALIBRATION_FILENAME = 'calibration_results.npz'
+INTERPOLATION_FILENAMES = {
+    'npz': 'interpolation_results.npz',
+    'npy': 'interpolation_results',
+    'store': 'interpolation_results.store',
+}
+DEFAULT_INTERPOLATION_OPTIONS = {
+    'row_reference': 120,
+    'dtype': 'float64',
+    'streaming': True,
+    'save_images': False,
+    'format': 'npy',
+}
+
+
+def load_manifest(manifest) -> list:
+    """
+    Read a campaign manifest and resolve every observation set.
+    
+    Parameters
+    ----------
+    manifest : str or dict
+        Path to a JSON manifest, or the parsed manifest
+    
+    Returns
+    -------
+    list
+        Observation sets as dicts with 'name', 'data_path', 'files',
+        'calibration' and 'interpolation' (defaults merged in)
+    """
+    if not isinstance(manifest, dict):
+        with open(manifest, 'r') as f:
+            manifest = json.load(f)
+    
+    defaults = manifest.get('defaults', {})
+    observation_sets = []
+    names = set()
+    for entry in manifest['observation_sets']:
+        data_path = entry['data_path']
+        name = entry.get('name') or os.path.basename(os.path.normpath(data_path))
+        if name in names:
+            raise ValueError(f"Duplicate observation set name {name!r} in the manifest")
+        names.add(name)
+        
+        files = entry.get('files')
+        if files is None:
+            files = sorted(
+                os.path.basename(f) for f in glob.glob(os.path.join(data_path, '*.fits'))
+                if '_l1.fits' not in f.lower()
+            )
+        
+        observation_sets.append({
+            'name': name,
+            'data_path': data_path,
+            'files': list(files),
+            'calibration': {**defaults.get('calibration', {}), **entry.get('calibration', {})},
+            'interpolation': {
+                **DEFAULT_INTERPOLATION_OPTIONS,
+                **defaults.get('interpolation', {}),
+                **entry.get('interpolation', {}),
+            },
+        })
+    return observation_sets
+
+
+def observation_set_key(observation_set: dict) -> str:
+    """Key of everything the outputs of an observation set depend on."""
+    from modules.calibration_params_loader import get_parameters_hash
+    from utils.result_cache import compute_cache_key
+    
+    return compute_cache_key(
+        'campaign', observation_set['data_path'], observation_set['files'],
+        {
+            'calibration': observation_set['calibration'],
+            'interpolation': observation_set['interpolation'],
+        },
+        parameters_hash=get_parameters_hash(),
+    )
+
+
+def _read_json(path: str):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data):
+    """Write JSON atomically (readers never see a partial file)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def init_worker(parameters, is_new_format, defect_mask):
+    """Install the parameters and defect mask parsed by the parent process."""
+    from modules.calibration_params_loader import set_parameters
+    from utils.calibration import set_defect_mask_DetA
+    
+    set_parameters(parameters, is_new_format)
+    set_defect_mask_DetA(defect_mask)
+
+
+def run_observation_set(observation_set: dict, output_dir: str, cache_dir: str = None) -> dict:
+    """
+    Calibrate and interpolate one observation set.
+    
+    Parameters
+    ----------
+    observation_set : dict
+        Observation set (see `load_manifest`)
+    output_dir : str
+        Campaign output directory (results go to <output_dir>/<name>/)
+    cache_dir : str, default=None
+        ResultCache directory for the calibrations, shared by the campaign
+        (no cache if None)
+    
+    Returns
+    -------
+    dict
+        Summary of the set: status ('done' or 'failed'), outputs, timings,
+        numbers of frames and rows, and the error if it failed
+    """
+    from utils.calibration import CalibrationParameters
+    from utils.interpolations import PixelInterpolation
+    from utils.result_cache import ResultCache, cached_calibration
+    
+    name = observation_set['name']
+    set_dir = os.path.join(output_dir, name)
+    os.makedirs(set_dir, exist_ok=True)
+    summary = {
+        'name': name,
+        'data_path': observation_set['data_path'],
+        'key': observation_set_key(observation_set),
+        'status': 'failed',
+        'n_files': len(observation_set['files']),
+    }
+    
+    t_start = time.perf_counter()
+    try:
+        data_path = observation_set['data_path']
+        files = observation_set['files']
+        calibration_options = dict(observation_set['calibration'])
+        interpolation_options = dict(observation_set['interpolation'])
+        
+        # ---- Calibration ----------------------------------------------------
+        calibrator = CalibrationParameters(**calibration_options)
+        if cache_dir is not None:
+            cached_calibration(calibrator, data_path, files, ResultCache(cache_dir))
+        else:
+            calibrator.compute_calibration(data_path=data_path, sumer_filename_list=files)
+        calibration_path = os.path.join(set_dir, CALIBRATION_FILENAME)
+        calibrator.save_results(calibration_path)
+        t_calibration = time.perf_counter()
+        
+        # ---- Interpolation --------------------------------------------------
+        slopes, _ = calibrator.get_slopes()
+        intercepts, _ = calibrator.get_intercepts()
+        output_format = interpolation_options.pop('format')
+        streaming = interpolation_options.pop('streaming')
+        save_images = interpolation_options.pop('save_images')
+        interpolator = PixelInterpolation(show_progress=False, **interpolation_options)
+        interpolator.interpolate_data(
+            data_path=data_path,
+            sumer_filename_list=files,
+            slopes=slopes,
+            intercepts=intercepts,
+            row_start=calibrator.row_start,
+            row_end=calibrator.row_end,
+            streaming=streaming,
+            output_dir=os.path.join(set_dir, 'interpolated_images') if streaming and save_images else None,
+        )
+        interpolation_path = os.path.join(set_dir, INTERPOLATION_FILENAMES[output_format])
+        interpolator.save_results(interpolation_path, format=output_format)
+        t_interpolation = time.perf_counter()
+        
+        n_frames = interpolator._n_accumulated
+        summary.update({
+            'status': 'done',
+            'calibration': os.path.relpath(calibration_path, output_dir),
+            'interpolation': os.path.relpath(interpolation_path, output_dir),
+            'n_frames': int(n_frames),
+            'n_rows': len(slopes),
+            'calibration_seconds': t_calibration - t_start,
+            'interpolation_seconds': t_interpolation - t_calibration,
+        })
+    except Exception as e:
+        logger.error("Observation set %s failed: %s", name, e)
+        summary['error'] = f"{type(e).__name__}: {e}"
+        summary['traceback'] = traceback.format_exc()
+    
+    summary['seconds'] = time.perf_counter() - t_start
+    _write_json(os.path.join(set_dir, SUMMARY_FILENAME), summary)
+    return summary
+
+
+def _throughput(summaries: list, wall_seconds: float) -> dict:
+    """Frames and rows processed per second of wall-clock time."""
+    done = [s for s in summaries if s.get('status') == 'done']
+    n_frames = sum(s['n_frames'] for s in done)
+    n_rows = sum(s['n_rows'] for s in done)
+    return {
+        'wall_seconds': wall_seconds,
+        'n_frames': n_frames,
+        'n_rows': n_rows,
+        'frames_per_second': n_frames / wall_seconds if wall_seconds > 0 else None,
+        'rows_per_second': n_rows / wall_seconds if wall_seconds > 0 else None,
+    }
+
+
+def run_campaign(manifest, output_dir: str, max_workers: int = None,
+                 cache_dir: str = None, resume: bool = True) -> dict:
+    """
+    Run the calibration and interpolation of every set of a campaign.
+    
+    Parameters
+    ----------
+    manifest : str or dict
+        Campaign manifest (see the module docstring)
+    output_dir : str
+        Output directory of the campaign
+    max_workers : int, default=None
+        Number of worker processes (os.cpu_count() if None). With 1 the sets
+        run one after the other in this process.
+    cache_dir : str, default=None
+        ResultCache directory for the calibrations, shared by all sets
+        (no cache if None)
+    resume : bool, default=True
+        Skip sets that already completed with the same inputs
+    
+    Returns
+    -------
+    dict
+        Campaign index: 'observation_sets' (summary of every set) and
+        'throughput' of this run (frames/s and rows/s of the sets processed)
+    """
+    from modules.calibration_params_loader import _get_cached_parameters
+    from utils.calibration import get_defect_mask_DetA
+    
+    os.makedirs(output_dir, exist_ok=True)
+    observation_sets = load_manifest(manifest)
+    
+    summaries = {}
+    pending = []
+    for observation_set in observation_sets:
+        previous = _read_json(os.path.join(output_dir, observation_set['name'], SUMMARY_FILENAME))
+        if (resume and previous is not None and previous.get('status') == 'done'
+                and previous.get('key') == observation_set_key(observation_set)):
+            summaries[observation_set['name']] = {**previous, 'skipped': True}
+        else:
+            pending.append(observation_set)
+    logger.info(
+        "Campaign: %d observation sets, %d already done, %d to process",
+        len(observation_sets), len(observation_sets) - len(pending), len(pending),
+    )
+    
+    index_path = os.path.join(output_dir, INDEX_FILENAME)
+    processed = []
+    
+    def _write_index(wall_seconds):
+        _write_json(index_path, {
+            'observation_sets': [
+                summaries.get(s['name'], {'name': s['name'], 'status': 'pending'})
+                for s in observation_sets
+            ],
+            'throughput': _throughput(processed, wall_seconds),
+        })
+    
+    def _record(summary, t_start):
+        summaries[summary['name']] = summary
+        processed.append(summary)
+        wall_seconds = time.perf_counter() - t_start
+        _write_index(wall_seconds)
+        if summary['status'] == 'done':
+            logger.info(
+                "Done %s (%d frames, %d rows) in %.1f s [%d/%d]",
+                summary['name'], summary['n_frames'], summary['n_rows'], summary['seconds'],
+                len(processed), len(pending),
+            )
+    
+    t_start = time.perf_counter()
+    if max_workers == 1 or len(pending) <= 1:
+        for observation_set in pending:
+            _record(run_observation_set(observation_set, output_dir, cache_dir), t_start)
+    else:
+        # Parse the parameters and build the defect mask once for all workers
+        parameters, is_new_format = _get_cached_parameters()
+        defect_mask = np.asarray(get_defect_mask_DetA())
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker,
+            initargs=(parameters, is_new_format, defect_mask),
+        ) as executor:
+            futures = [
+                executor.submit(run_observation_set, observation_set, output_dir, cache_dir)
+                for observation_set in pending
+            ]
+            for future in as_completed(futures):
+                _record(future.result(), t_start)
+    
+    wall_seconds = time.perf_counter() - t_start
+    _write_index(wall_seconds)
+    index = _read_json(index_path)
+    throughput = index['throughput']
+    if throughput['n_frames']:
+        logger.info(
+            "Campaign finished in %.1f s: %.2f frames/s, %.1f rows/s",
+            wall_seconds, throughput['frames_per_second'], throughput['rows_per_second'],
+        )
+    return index
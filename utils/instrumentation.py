@@ -0,0 +1,183 @@
+"""
+Per-stage timing and memory instrumentation for the pipeline.
+
+CalibrationParameters and PixelInterpolation wrap their stages (loading,
+masking, averaging, fits, interpolation, saving) in `Instrumentation.stage`
+blocks. A disabled Instrumentation (the default) hands out a shared no-op
+context manager, so the hooks cost a method call and nothing else.
+
+Example
+-------
+>>> from utils.instrumentation import Instrumentation
+>>>
+>>> instrumentation = Instrumentation(track_memory=True)
+>>> calibrator = CalibrationParameters(instrumentation=instrumentation)
+>>> calibrator.compute_calibration(data_path, sumer_filename_list)
+>>> instrumentation.summary()['fit_row']
+{'count': 318, 'total_s': 41.2, 'mean_s': 0.13, 'max_s': 0.9, 'peak_memory_bytes': 1843200}
+"""
+
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    """Context manager timing one stage run (and its traced memory peak)."""
+    
+    __slots__ = ('_instrumentation', '_name', '_t0')
+    
+    def __init__(self, instrumentation, name: str):
+        self._instrumentation = instrumentation
+        self._name = name
+    
+    def __enter__(self):
+        if self._instrumentation.track_memory:
+            self._instrumentation._push_memory_frame()
+        self._t0 = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self._t0
+        peak = None
+        if self._instrumentation.track_memory:
+            peak = self._instrumentation._pop_memory_frame()
+        self._instrumentation.record(self._name, elapsed, peak)
+        return False
+
+
+class Instrumentation:
+    """
+    Registry of stage timers with optional tracemalloc peak tracking.
+    
+    Parameters
+    ----------
+    enabled : bool, default=True
+        Whether stages are recorded. When False, `stage` returns a no-op
+        context manager.
+    track_memory : bool, default=False
+        Also record the peak traced memory of every stage (above the memory
+        in use when it started). Starts tracemalloc if it is not running,
+        which slows allocation-heavy code noticeably.
+    
+    Attributes
+    ----------
+    stages : dict
+        Per stage name: [count, total_s, max_s, peak_memory_bytes]
+    """
+    
+    def __init__(self, enabled: bool = True, track_memory: bool = False):
+        """Initialize an empty registry."""
+        self.enabled = enabled
+        self.track_memory = False
+        self.stages = {}
+        self._memory_frames = []
+        self._started_tracemalloc = False
+        if enabled and track_memory:
+            self.start_memory_tracking()
+    
+    def stage(self, name: str):
+        """
+        Get a context manager recording one run of stage `name`.
+        
+        Parameters
+        ----------
+        name : str
+            Stage name (e.g. 'load', 'fit_row', 'interpolate_image')
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+    
+    def record(self, name: str, elapsed: float, peak_memory: int = None):
+        """Add one run of stage `name` that took `elapsed` seconds."""
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = [0, 0.0, 0.0, None]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        if peak_memory is not None:
+            entry[3] = peak_memory if entry[3] is None else max(entry[3], peak_memory)
+    
+    def start_memory_tracking(self):
+        """Start recording stage memory peaks (and tracemalloc if needed)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.track_memory = True
+    
+    def stop_memory_tracking(self):
+        """Stop recording memory peaks (and tracemalloc if it was started here)."""
+        self.track_memory = False
+        self._memory_frames = []
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+    
+    def _push_memory_frame(self):
+        # tracemalloc has a single peak, so an enclosing stage keeps the
+        # highest peak seen before its inner stages reset it
+        current, peak = tracemalloc.get_traced_memory()
+        if self._memory_frames:
+            parent = self._memory_frames[-1]
+            parent[1] = max(parent[1], peak)
+        tracemalloc.reset_peak()
+        self._memory_frames.append([current, current])
+    
+    def _pop_memory_frame(self) -> int:
+        start, peak_seen = self._memory_frames.pop()
+        peak = max(peak_seen, tracemalloc.get_traced_memory()[1])
+        if self._memory_frames:
+            parent = self._memory_frames[-1]
+            parent[1] = max(parent[1], peak)
+        return peak - start
+    
+    def summary(self) -> dict:
+        """
+        Get the recorded stages.
+        
+        Returns
+        -------
+        dict
+            Per stage name: count, total_s, mean_s, max_s and (when memory is
+            tracked) peak_memory_bytes
+        """
+        summary = {}
+        for name, (count, total, maximum, peak_memory) in self.stages.items():
+            summary[name] = {
+                'count': count,
+                'total_s': total,
+                'mean_s': total / count,
+                'max_s': maximum,
+            }
+            if peak_memory is not None:
+                summary[name]['peak_memory_bytes'] = peak_memory
+        return summary
+    
+    def report(self) -> str:
+        """Format the summary as a table sorted by total time."""
+        lines = [f"{'stage':<24} {'count':>7} {'total [s]':>10} {'mean [ms]':>10} {'peak [MB]':>10}"]
+        for name, entry in sorted(self.summary().items(), key=lambda item: -item[1]['total_s']):
+            peak = entry.get('peak_memory_bytes')
+            peak_str = f"{peak / 1024**2:10.1f}" if peak is not None else f"{'-':>10}"
+            lines.append(
+                f"{name:<24} {entry['count']:>7} {entry['total_s']:10.3f} "
+                f"{entry['mean_s'] * 1e3:10.2f} {peak_str}"
+            )
+        return '\n'.join(lines)
+    
+    def reset(self):
+        """Forget all recorded stages."""
+        self.stages = {}
+        self._memory_frames = []
+
+
+def get_instrumentation(instrumentation=None) -> Instrumentation:
+    """Return `instrumentation`, or a disabled one if None."""
+    if instrumentation is None:
+        return Instrumentation(enabled=False)
+    return instrumentation
@@ -13,16 +13,22 @@ Algorithm:
      b. Interpolate all rows to this common wavelength scale
      c. Propagate uncertainties through the interpolation
   4. Average all interpolated images
-  5. Save results to NPZ format for future use
+  5. Save results to NPZ (or memory-mappable NPY) format for future use
 """
 
 import numpy as np
 from scipy.interpolate import interp1d
 from astropy.io import fits
 import os
+import json
+import hashlib
+import logging
 import warnings
+from utils.instrumentation import get_instrumentation
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
 
 def pixels_to_wavelength(pixel, slope_cal, intercept_cal):
     """
@@ -62,6 +68,14 @@ class PixelInterpolation:
         Row index to use as the reference wavelength scale
     show_progress : bool, default=True
         Whether to show progress bar during interpolation
+    dtype : data-type, default=np.float64
+        Floating point type of the loaded and interpolated images. np.float32
+        halves their memory; wavelengths stay in float64 and the averages are
+        accumulated in float64.
+    instrumentation : Instrumentation, default=None
+        Records the time (and optionally memory) of the stages 'load',
+        'interpolate_image', 'average' and 'save' (see utils.instrumentation).
+        Disabled if None.
     
     Attributes
     ----------
@@ -77,6 +91,12 @@ class PixelInterpolation:
         Average of all interpolated spectral images
     spectral_image_unc_interpolated_average : array
         Average of interpolated uncertainty images
+    source_files : list
+        Filenames of the exposures included in the results, in order
+    wavelength_unc : array
+        Uncertainty of the wavelength of every interpolated pixel due to the
+        calibration (see `propagate_calibration_covariance`), None if no
+        calibration covariances were given
     
     Examples
     --------
@@ -102,10 +122,16 @@ class PixelInterpolation:
     >>> print(interpolator.spectral_image_interpolated_average.shape)
     """
     
-    def __init__(self, row_reference: int = 120, show_progress: bool = True):
+    def __init__(self, row_reference: int = 120, show_progress: bool = True,
+                 dtype=np.float64, instrumentation=None):
         """Initialize interpolation parameters."""
+        if not np.issubdtype(np.dtype(dtype), np.floating):
+            raise ValueError(f"dtype must be a floating point type, got {dtype!r}")
+        
         self.row_reference = row_reference
         self.show_progress = show_progress
+        self.dtype = np.dtype(dtype)
+        self.instrumentation = get_instrumentation(instrumentation)
         
         # Output data
         self.spectral_image_interpolated_list = []
@@ -114,12 +140,17 @@ class PixelInterpolation:
         self.extent_reference_wavelength = None
         self.spectral_image_interpolated_average = None
         self.spectral_image_unc_interpolated_average = None
+        self.wavelength_unc = None
         
         # Internal state
         self._spectral_image_list = []
         self._spectral_image_unc_list = []
         self._slopes = None
         self._intercepts = None
+        self._result_store = None
+        self._calibration_hash = None
+        self.source_files = []
+        self._reset_accumulators()
     
     @staticmethod
     def _unc_linear_interpolation_1point(x_interp, x_data, y_unc_data):
@@ -212,7 +243,8 @@ class PixelInterpolation:
         return y_interp, y_unc_interp
     
     def _interpolate_spectral_image(self, spectral_image, spectral_image_unc,
-                                    slope_list, intercept_list, row_start=6, row_end=323):
+                                    slope_list, intercept_list, row_start=6, row_end=323,
+                                    row_offset=0):
         """
         Interpolate all rows of one spectral image to reference wavelength scale.
         
@@ -230,12 +262,23 @@ class PixelInterpolation:
             Starting row index for which calibration is available
         row_end : int
             Ending row index for which calibration is available
+        row_offset : int, default=0
+            Detector row of the first row of `spectral_image` (for blocks of rows)
         
         Returns
         -------
         tuple
             (interpolated_image, interpolated_unc, reference_wavelength, extent)
         """
+        with self.instrumentation.stage('interpolate_image'):
+            return self._interpolate_rows(
+                spectral_image, spectral_image_unc, slope_list, intercept_list, row_start, row_end,
+                row_offset,
+            )
+    
+    def _interpolate_rows(self, spectral_image, spectral_image_unc,
+                          slope_list, intercept_list, row_start, row_end, row_offset=0):
+        """Body of `_interpolate_spectral_image`."""
         N_rows, N_cols = spectral_image.shape
         
         # Determine which calibration row index corresponds to our reference row
@@ -248,6 +291,12 @@ class PixelInterpolation:
             raise ValueError(
                 f"Reference row {self.row_reference} not in calibration range ({row_start}-{row_end})"
             )
+        if not (np.isfinite(slope_list[cal_row_reference_idx])
+                and np.isfinite(intercept_list[cal_row_reference_idx])):
+            raise ValueError(
+                f"Reference row {self.row_reference} has no valid calibration "
+                f"(it failed the quality control); choose another row_reference"
+            )
         
         # Create reference wavelength scale from reference row
         pixel_positions = np.arange(0, N_cols)
@@ -265,21 +314,22 @@ class PixelInterpolation:
         ]
         
         # Interpolate each row to reference wavelength scale
-        # Only process rows that have calibration parameters
-        intensity_interpolated = []
-        intensity_unc_interpolated = []
+        # Only process rows that have calibration parameters; rows outside
+        # the calibration range or whose calibration failed the quality
+        # control keep NaN to indicate no data
+        intensity_interpolated = np.full((N_rows, N_cols), np.nan, dtype=self.dtype)
+        intensity_unc_interpolated = np.full((N_rows, N_cols), np.nan, dtype=self.dtype)
         
         for i_row in range(N_rows):
             # Check if this row has calibration parameters
-            if i_row < row_start or i_row > row_end:
-                # Skip rows outside calibration range
-                # Use NaN to indicate no data
-                intensity_interpolated.append(np.full(N_cols, np.nan))
-                intensity_unc_interpolated.append(np.full(N_cols, np.nan))
+            detector_row = row_offset + i_row
+            if detector_row < row_start or detector_row > row_end:
                 continue
             
             # Get calibration index for this row
-            cal_row_idx = i_row - row_start
+            cal_row_idx = detector_row - row_start
+            if not (np.isfinite(slope_list[cal_row_idx]) and np.isfinite(intercept_list[cal_row_idx])):
+                continue
             
             # Get wavelength positions for this row
             wavelength_row = pixels_to_wavelength(
@@ -296,73 +346,132 @@ class PixelInterpolation:
                 y_unc_data=spectral_image_unc[i_row, :]
             )
             
-            intensity_interpolated.append(y_interp)
-            intensity_unc_interpolated.append(y_unc_interp)
-        
-        intensity_interpolated = np.array(intensity_interpolated)
-        intensity_unc_interpolated = np.array(intensity_unc_interpolated)
+            intensity_interpolated[i_row] = y_interp
+            intensity_unc_interpolated[i_row] = y_unc_interp
         
         return (
             intensity_interpolated, intensity_unc_interpolated,
             reference_wavelength, extent_reference_wavelength
         )
     
-    def _load_data(self, data_path: str, sumer_filename_list: list):
+    def _iter_data(self, data_path: str, sumer_filename_list: list):
         """
-        Load SUMER spectral data from FITS files.
+        Read SUMER spectral images one at a time.
         
         Parameters
         ----------
         data_path : str
             Path to SUMER FITS files
         sumer_filename_list : list
-            List of FITS filenames to load
+            List of FITS filenames to read
+        
+        Yields
+        ------
+        tuple
+            (filename, data, data_unc) for every file that could be read
+        """
+        for filename in sumer_filename_list:
+            frame = self._load_frame(data_path, filename)
+            if frame is not None:
+                yield (filename,) + frame
+    
+    def _load_frame(self, data_path: str, filename: str):
         """
-        print("Loading SUMER data for interpolation...")
+        Read one SUMER spectral image.
         
-        self._spectral_image_list = []
-        self._spectral_image_unc_list = []
-        files_loaded = 0
+        Returns
+        -------
+        tuple or None
+            (data, data_unc), or None for Level 1 and unreadable files
+        """
+        # Skip Level 1 files
+        if '_l1.fits' in filename.lower():
+            return None
         
-        for filename in sumer_filename_list:
-            # Skip Level 1 files
-            if '_l1.fits' in filename.lower():
-                continue
-            
-            filepath = os.path.join(data_path, filename)
-            try:
+        filepath = os.path.join(data_path, filename)
+        try:
+            with self.instrumentation.stage('load'):
                 # Load data
                 data = fits.getdata(filepath)
                 
                 if data is None:
-                    print(f"Warning: No data in {filename}")
-                    continue
+                    logger.warning("No data in %s", filename)
+                    return None
                 
                 # Reverse row order and convert to float
-                data = data.astype(float)[::-1, :]
-                
-                # Mask defective pixels (assuming DetA)
-                # For interpolation, masked pixels will be handled by NaN values
-                
-                # Calculate uncertainties (Poisson noise)
-                # Assume exposure time and scaling factor are known
-                data_unc = np.sqrt(np.abs(data)) / 150.0  # t_exp = 150s
-                
-                self._spectral_image_list.append(data)
-                self._spectral_image_unc_list.append(data_unc)
-                files_loaded += 1
-                
-            except Exception as e:
-                print(f"Warning: Could not load {filename}: {e}")
+                return self._prepare_frame(data[::-1, :])
+        
+        except Exception as e:
+            logger.warning("Could not load %s: %s", filename, e)
+            return None
+    
+    def _prepare_frame(self, data):
+        """
+        Convert raw counts (in pipeline row order) to an image and its uncertainty.
+        
+        Returns
+        -------
+        tuple
+            (data, data_unc)
+        """
+        data = data.astype(self.dtype)
+        
+        # Mask defective pixels (assuming DetA)
+        # For interpolation, masked pixels will be handled by NaN values
+        
+        # Calculate uncertainties (Poisson noise)
+        # Assume exposure time and scaling factor are known
+        data_unc = np.sqrt(np.abs(data)) / 150.0  # t_exp = 150s
+        return data, data_unc
+    
+    def _load_data(self, data_path: str, sumer_filename_list: list):
+        """
+        Load SUMER spectral data from FITS files.
+        
+        Parameters
+        ----------
+        data_path : str
+            Path to SUMER FITS files
+        sumer_filename_list : list
+            List of FITS filenames to load
+        """
+        logger.info("Loading SUMER data for interpolation...")
+        
+        self._spectral_image_list = []
+        self._spectral_image_unc_list = []
+        files_loaded = 0
+        
+        for filename, data, data_unc in self._iter_data(data_path, sumer_filename_list):
+            self._spectral_image_list.append(data)
+            self._spectral_image_unc_list.append(data_unc)
+            self.source_files.append(filename)
+            files_loaded += 1
         
         if not self._spectral_image_list:
             raise ValueError(f"No data files loaded from {data_path}")
         
-        print(f"Loaded {files_loaded} FITS files")
+        logger.info("Loaded %d FITS files", files_loaded)
+    
+    def _progress(self, iterable, total: int):
+        """Wrap an iterable in a tqdm progress bar if available and enabled."""
+        if not self.show_progress:
+            return iterable
+        try:
+            from tqdm import tqdm
+            return tqdm(
+                iterable,
+                total=total,
+                desc="Interpolating spectral images",
+                unit="image"
+            )
+        except ImportError:
+            return iterable
     
     def interpolate_data(self, data_path: str, sumer_filename_list: list,
                         slopes: np.ndarray, intercepts: np.ndarray,
-                        row_start: int = 6, row_end: int = 323):
+                        row_start: int = 6, row_end: int = 323,
+                        streaming: bool = False, output_dir: str = None,
+                        n_workers: int = 1, covariances: np.ndarray = None):
         """
         Perform interpolation on all SUMER spectral images.
         
@@ -380,38 +489,45 @@ class PixelInterpolation:
             Starting row index for calibration data
         row_end : int, default=323
             Ending row index for calibration data
+        streaming : bool, default=False
+            Interpolate each exposure as it is read and fold it into running
+            accumulators instead of keeping every raw and interpolated image
+            in memory. The per-image lists stay empty in this mode.
+        output_dir : str, default=None
+            If given in streaming mode, every interpolated image and its
+            uncertainty are written to this directory as
+            '<name>_interp.npy' and '<name>_interp_unc.npy'.
+        n_workers : int, default=1
+            Number of worker processes interpolating images in parallel.
+            Images are read in this process and results are folded in
+            in order, so the output does not depend on n_workers.
+        covariances : array, default=None
+            (n_rows, 2, 2) covariances of the slopes and intercepts (see
+            `CalibrationParameters.get_covariances`). If given, the
+            calibration uncertainty of the wavelengths is propagated into
+            `wavelength_unc`.
         """
+        self._start_interpolation(slopes, intercepts, row_start, row_end)
+        
+        if streaming:
+            self._interpolate_streaming(
+                data_path, sumer_filename_list, row_start, row_end, output_dir, n_workers
+            )
+            if covariances is not None:
+                self.propagate_calibration_covariance(slopes, intercepts, covariances, row_start, row_end)
+            logger.info("Interpolation complete.")
+            return
+        
         # Load data
         self._load_data(data_path, sumer_filename_list)
-        self._slopes = slopes
-        self._intercepts = intercepts
         
         # Interpolate all spectral images
-        self.spectral_image_interpolated_list = []
-        self.spectral_image_unc_interpolated_list = []
-        
-        try:
-            from tqdm import tqdm
-            n_images = len(self._spectral_image_list)
-            iterator = tqdm(
-                range(n_images),
-                desc="Interpolating spectral images",
-                unit="image"
-            )
-        except ImportError:
-            iterator = range(len(self._spectral_image_list))
-        
-        for i_img in iterator:
-            spectral_image_interp, spectral_image_unc_interp, \
-                reference_wavelength, extent_ref = self._interpolate_spectral_image(
-                    spectral_image=self._spectral_image_list[i_img],
-                    spectral_image_unc=self._spectral_image_unc_list[i_img],
-                    slope_list=self._slopes,
-                    intercept_list=self._intercepts,
-                    row_start=row_start,
-                    row_end=row_end
-                )
-            
+        n_images = len(self._spectral_image_list)
+        images = zip(self.source_files, self._spectral_image_list, self._spectral_image_unc_list)
+        for _, spectral_image_interp, spectral_image_unc_interp, \
+                reference_wavelength, extent_ref in self._progress(
+                    self._interpolate_images(images, row_start, row_end, n_workers), n_images
+                ):
             self.spectral_image_interpolated_list.append(spectral_image_interp)
             self.spectral_image_unc_interpolated_list.append(spectral_image_unc_interp)
             
@@ -423,36 +539,400 @@ class PixelInterpolation:
         # Average all interpolated images
         self._compute_average()
         
-        print(f"Interpolation complete.")
+        if covariances is not None:
+            self.propagate_calibration_covariance(slopes, intercepts, covariances, row_start, row_end)
+        logger.info("Interpolation complete.")
     
-    def _compute_average(self):
-        """Compute average of interpolated spectral images."""
-        if not self.spectral_image_interpolated_list:
+    def _interpolate_streaming(self, data_path: str, sumer_filename_list: list,
+                               row_start: int, row_end: int, output_dir: str = None,
+                               n_workers: int = 1):
+        """
+        Interpolate exposures one at a time, folding them into the running average.
+        
+        Only the current exposure and the accumulators are held in memory, so
+        peak memory does not grow with the number of exposures.
+        """
+        logger.info("Streaming SUMER data for interpolation...")
+        
+        self._spectral_image_list = []
+        self._spectral_image_unc_list = []
+        
+        self._interpolate_and_accumulate(
+            data_path, sumer_filename_list, row_start, row_end,
+            keep_images=False, output_dir=output_dir, n_workers=n_workers,
+        )
+        
+        if self._n_accumulated == 0:
+            raise ValueError(f"No data files loaded from {data_path}")
+        
+        logger.info("Interpolated %d FITS files", self._n_accumulated)
+        self._finalize_average()
+    
+    def _interpolate_and_accumulate(self, data_path: str, sumer_filename_list: list,
+                                    row_start: int, row_end: int,
+                                    keep_images: bool = False, output_dir: str = None,
+                                    n_workers: int = 1) -> int:
+        """
+        Read, interpolate and accumulate exposures one at a time.
+        
+        Parameters
+        ----------
+        keep_images : bool, default=False
+            Append the interpolated images to the per-image lists
+        output_dir : str, default=None
+            Directory to write every interpolated image and uncertainty to
+        n_workers : int, default=1
+            Number of worker processes (see `_interpolate_images`)
+        
+        Returns
+        -------
+        int
+            Number of exposures processed
+        """
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        n_candidates = sum(1 for f in sumer_filename_list if '_l1.fits' not in f.lower())
+        images = self._iter_data(data_path, sumer_filename_list)
+        n_processed = 0
+        
+        for filename, spectral_image_interp, spectral_image_unc_interp, \
+                reference_wavelength, extent_ref in self._progress(
+                    self._interpolate_images(images, row_start, row_end, n_workers), n_candidates
+                ):
+            self._fold_image(
+                filename, spectral_image_interp, spectral_image_unc_interp,
+                reference_wavelength, extent_ref, keep_images, output_dir,
+            )
+            n_processed += 1
+        
+        return n_processed
+    
+    def _fold_image(self, filename: str, spectral_image_interp, spectral_image_unc_interp,
+                    reference_wavelength, extent_ref, keep_images: bool = False,
+                    output_dir: str = None):
+        """Add one interpolated exposure to the results (see `_interpolate_and_accumulate`)."""
+        self._accumulate(spectral_image_interp, spectral_image_unc_interp)
+        self.source_files.append(filename)
+        
+        if keep_images:
+            self.spectral_image_interpolated_list.append(spectral_image_interp)
+            self.spectral_image_unc_interpolated_list.append(spectral_image_unc_interp)
+        
+        if output_dir is not None:
+            stem = os.path.splitext(os.path.basename(filename))[0]
+            np.save(os.path.join(output_dir, f'{stem}_interp.npy'), spectral_image_interp)
+            np.save(os.path.join(output_dir, f'{stem}_interp_unc.npy'), spectral_image_unc_interp)
+        
+        if self.reference_wavelength is None:
+            self.reference_wavelength = reference_wavelength
+            self.extent_reference_wavelength = extent_ref
+    
+    def _interpolate_images(self, images, row_start: int, row_end: int, n_workers: int = 1):
+        """
+        Interpolate a sequence of images, in order.
+        
+        Parameters
+        ----------
+        images : iterable
+            (filename, spectral_image, spectral_image_unc) tuples
+        n_workers : int, default=1
+            With more than one worker, images are sent to a process pool with
+            at most 2 * n_workers images in flight, so memory stays bounded
+            when `images` reads them lazily.
+        
+        Yields
+        ------
+        tuple
+            (filename, interpolated_image, interpolated_unc, reference_wavelength, extent)
+        """
+        if n_workers <= 1:
+            for filename, spectral_image, spectral_image_unc in images:
+                yield (filename,) + self._interpolate_spectral_image(
+                    spectral_image=spectral_image,
+                    spectral_image_unc=spectral_image_unc,
+                    slope_list=self._slopes,
+                    intercept_list=self._intercepts,
+                    row_start=row_start,
+                    row_end=row_end
+                )
             return
         
-        # Convert to arrays
-        spectral_array = np.array(self.spectral_image_interpolated_list)
-        unc_array = np.array(self.spectral_image_unc_interpolated_list)
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+        
+        options = self.get_options()
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for filename, spectral_image, spectral_image_unc in images:
+                in_flight.append((filename, executor.submit(
+                    _interpolate_image_worker, options, spectral_image, spectral_image_unc,
+                    self._slopes, self._intercepts, row_start, row_end,
+                )))
+                if len(in_flight) >= 2 * n_workers:
+                    filename, future = in_flight.popleft()
+                    yield (filename,) + future.result()
+            while in_flight:
+                filename, future = in_flight.popleft()
+                yield (filename,) + future.result()
+    
+    def update_data(self, data_path: str, sumer_filename_list: list,
+                    slopes: np.ndarray, intercepts: np.ndarray,
+                    row_start: int = 6, row_end: int = 323,
+                    streaming: bool = False, output_dir: str = None,
+                    n_workers: int = 1):
+        """
+        Interpolate only the exposures missing from the current results and merge them in.
+        
+        Exposures already listed in `source_files` are skipped. The new ones
+        are folded into the stored sum and sum-of-squared-uncertainty
+        accumulators, so the updated average costs time proportional to the
+        new data only. Without existing results this is `interpolate_data`.
         
-        # Average values
-        self.spectral_image_interpolated_average = np.mean(spectral_array, axis=0)
+        Parameters
+        ----------
+        data_path : str
+            Path to SUMER FITS files
+        sumer_filename_list : list
+            Full list of FITS filenames (old and new)
+        slopes : array
+            Calibration slopes; must be the ones used for the existing results
+        intercepts : array
+            Calibration intercepts; must be the ones used for the existing results
+        row_start : int, default=6
+            Starting row index for calibration data
+        row_end : int, default=323
+            Ending row index for calibration data
+        streaming : bool, default=False
+            Only update the average; do not append the new images to the
+            per-image lists
+        output_dir : str, default=None
+            Directory to write the new interpolated images to
+        n_workers : int, default=1
+            Number of worker processes interpolating images in parallel
         
-        # Average uncertainties: sqrt(sum(unc^2)) / N
-        n_images = len(self.spectral_image_interpolated_list)
-        unc_sumsquare = np.sum(unc_array**2, axis=0)
-        self.spectral_image_unc_interpolated_average = (
-            np.sqrt(unc_sumsquare) / n_images
+        Raises
+        ------
+        ValueError
+            If the existing results were made with a different calibration or
+            do not record their source files and accumulators
+        """
+        if self.spectral_image_interpolated_average is None:
+            self.interpolate_data(
+                data_path, sumer_filename_list, slopes, intercepts,
+                row_start=row_start, row_end=row_end, streaming=streaming, output_dir=output_dir,
+                n_workers=n_workers,
+            )
+            return
+        
+        calibration_hash = self._compute_calibration_hash(slopes, intercepts, row_start, row_end)
+        if calibration_hash != self._calibration_hash:
+            raise ValueError(
+                "The calibration differs from the one used for the existing results; "
+                "run interpolate_data to re-interpolate all exposures"
+            )
+        if self._n_accumulated == 0 or not self.source_files:
+            raise ValueError(
+                "The existing results do not record their source files and accumulators; "
+                "run interpolate_data to re-interpolate all exposures"
+            )
+        
+        known_files = set(self.source_files)
+        new_files = [f for f in sumer_filename_list if f not in known_files]
+        if not new_files:
+            logger.info("No new exposures to interpolate.")
+            return
+        
+        self._slopes = slopes
+        self._intercepts = intercepts
+        keep_images = not streaming
+        if keep_images and not isinstance(self.spectral_image_interpolated_list, list):
+            # Results loaded from disk: memmapped stacks become lists of views,
+            # stored stacks are read so that the new images can be appended
+            self.spectral_image_interpolated_list = list(self.spectral_image_interpolated_list)
+            self.spectral_image_unc_interpolated_list = list(self.spectral_image_unc_interpolated_list)
+        
+        n_new = self._interpolate_and_accumulate(
+            data_path, new_files, row_start, row_end,
+            keep_images=keep_images, output_dir=output_dir, n_workers=n_workers,
         )
+        self._finalize_average()
+        
+        logger.info("Added %d new exposures (%d in total).", n_new, self._n_accumulated)
+    
+    def _start_interpolation(self, slopes, intercepts, row_start: int, row_end: int):
+        """Set the calibration and clear the results of an earlier interpolation."""
+        self._slopes = slopes
+        self._intercepts = intercepts
+        self._calibration_hash = self._compute_calibration_hash(slopes, intercepts, row_start, row_end)
+        self.spectral_image_interpolated_list = []
+        self.spectral_image_unc_interpolated_list = []
+        self.source_files = []
+        self.wavelength_unc = None
+        self._reset_accumulators()
+    
+    def propagate_calibration_covariance(self, slopes, intercepts, covariances,
+                                         row_start: int = 6, row_end: int = 323):
+        """
+        Propagate the calibration covariances into the interpolated wavelength grid.
+        
+        The pixel (row, j) of the interpolated images holds the spectrum of
+        that row at pixel u = (reference_wavelength[j] - intercept) / slope.
+        Its wavelength slope * u + intercept has the variance
+        
+            u^2 var(slope) + 2 u cov(slope, intercept) + var(intercept),
+        
+        which is evaluated for every row and column at once. The covariance
+        term matters: slopes and intercepts are strongly anti-correlated, so
+        the uncertainties alone overestimate the wavelength uncertainty. On
+        the reference row this is the uncertainty of the grid itself.
+        
+        Parameters
+        ----------
+        slopes, intercepts : array
+            Calibration used for the interpolation (rows row_start to row_end)
+        covariances : array
+            (n_rows, 2, 2) covariances of the slopes and intercepts (see
+            `CalibrationParameters.get_covariances`)
+        row_start : int, default=6
+            Starting row index for calibration data
+        row_end : int, default=323
+            Ending row index for calibration data
+        
+        Returns
+        -------
+        array
+            `wavelength_unc`: (rows, 512) wavelength uncertainties, NaN where
+            the interpolated images have no data (rows without a valid
+            calibration, wavelengths outside the range of the row)
+        """
+        if self.reference_wavelength is None or self.spectral_image_interpolated_average is None:
+            raise ValueError("No results available; run interpolate_data or load_results first")
+        slopes = np.asarray(slopes, dtype=np.float64)
+        intercepts = np.asarray(intercepts, dtype=np.float64)
+        covariances = np.asarray(covariances, dtype=np.float64)
+        if covariances.shape != (len(slopes), 2, 2) or len(intercepts) != len(slopes):
+            raise ValueError(
+                f"covariances must have shape ({len(slopes)}, 2, 2) to match the slopes and "
+                f"intercepts, got {covariances.shape}"
+            )
+        
+        n_rows, n_cols = self.spectral_image_interpolated_average.shape
+        wavelength_unc = np.full((n_rows, n_cols), np.nan)
+        n_cal = min(len(slopes), row_end - row_start + 1, n_rows - row_start)
+        if n_cal > 0:
+            slopes, intercepts, covariances = slopes[:n_cal], intercepts[:n_cal], covariances[:n_cal]
+            reference_wavelength = np.asarray(self.reference_wavelength, dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                pixels = (reference_wavelength[None, :] - intercepts[:, None]) / slopes[:, None]
+                variance = (
+                    pixels**2 * covariances[:, None, 0, 0]
+                    + 2 * pixels * covariances[:, None, 0, 1]
+                    + covariances[:, None, 1, 1]
+                )
+            # Same range test as the interpolation: in wavelength, between
+            # the first and last pixels of the row
+            first = pixels_to_wavelength(0, slopes, intercepts)
+            last = pixels_to_wavelength(n_cols - 1, slopes, intercepts)
+            inside = (
+                (reference_wavelength[None, :] >= first[:, None])
+                & (reference_wavelength[None, :] <= last[:, None])
+            )
+            wavelength_unc[row_start:row_start + n_cal] = np.where(
+                inside, np.sqrt(np.maximum(variance, 0.0)), np.nan
+            )
+        
+        self.wavelength_unc = wavelength_unc
+        return wavelength_unc
     
-    def save_results(self, output_path: str):
+    @staticmethod
+    def _compute_calibration_hash(slopes, intercepts, row_start: int, row_end: int) -> str:
+        """Hash identifying the calibration used for an interpolation."""
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(np.asarray(slopes, dtype=np.float64)).tobytes())
+        digest.update(np.ascontiguousarray(np.asarray(intercepts, dtype=np.float64)).tobytes())
+        digest.update(f'{int(row_start)}:{int(row_end)}'.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _reset_accumulators(self):
+        """Reset the running sum and sum-of-squared-uncertainty accumulators."""
+        self._interpolated_sum = None
+        self._interpolated_unc_sumsquare = None
+        self._n_accumulated = 0
+    
+    def _accumulate(self, spectral_image_interp, spectral_image_unc_interp):
+        """Fold one interpolated image into the float64 running accumulators."""
+        with self.instrumentation.stage('average'):
+            if self._interpolated_sum is None:
+                self._interpolated_sum = np.zeros(spectral_image_interp.shape, dtype=np.float64)
+                self._interpolated_unc_sumsquare = np.zeros(spectral_image_interp.shape, dtype=np.float64)
+            
+            self._interpolated_sum += spectral_image_interp
+            self._interpolated_unc_sumsquare += np.square(spectral_image_unc_interp, dtype=np.float64)
+            self._n_accumulated += 1
+    
+    def _finalize_average(self):
+        """Turn the accumulators into the average image and its uncertainty."""
+        if self._n_accumulated == 0:
+            return
+        
+        with self.instrumentation.stage('average'):
+            self.spectral_image_interpolated_average = (
+                self._interpolated_sum / self._n_accumulated
+            ).astype(self.dtype)
+            
+            # Average uncertainties: sqrt(sum(unc^2)) / N
+            self.spectral_image_unc_interpolated_average = (
+                np.sqrt(self._interpolated_unc_sumsquare) / self._n_accumulated
+            ).astype(self.dtype)
+    
+    def _compute_average(self):
+        """Compute average of interpolated spectral images."""
+        if len(self.spectral_image_interpolated_list) == 0:
+            return
+        
+        # Fold images one by one instead of stacking them into a new array
+        self._reset_accumulators()
+        for spectral_image_interp, spectral_image_unc_interp in zip(
+            self.spectral_image_interpolated_list, self.spectral_image_unc_interpolated_list
+        ):
+            self._accumulate(spectral_image_interp, spectral_image_unc_interp)
+        
+        self._finalize_average()
+    
+    def save_results(self, output_path: str, format: str = 'npz'):
         """
-        Save interpolated results to NPZ file.
+        Save interpolated results to disk.
         
         Parameters
         ----------
         output_path : str
-            Path to save results (e.g., 'interpolation_results.npz')
+            Path to save results (e.g., 'interpolation_results.npz', or a
+            directory such as 'interpolation_results' for format='npy')
+        format : str, default='npz'
+            'npz' writes a single compressed NPZ file (images stored as object
+            arrays, loading needs pickle). 'npy' writes a directory of plain,
+            uncompressed .npy files with the per-image results stored as
+            contiguous (n_images, rows, 512) stacks, which `load_results`
+            opens memory-mapped without pickle. 'store' writes into a chunked
+            ResultStore (HDF5 file if h5py is installed, chunk directory
+            otherwise), which can be shared with the calibration results and
+            read image by image or row block by row block.
         """
+        if format not in ('npz', 'npy', 'store'):
+            raise ValueError(f"format must be 'npz', 'npy' or 'store', got {format!r}")
+        
+        with self.instrumentation.stage('save'):
+            if format == 'npy':
+                self._save_results_npy(output_path)
+            elif format == 'store':
+                self._save_results_store(output_path)
+            else:
+                self._save_results_npz(output_path)
+        logger.info("Results saved to %s", output_path)
+    
+    def _save_results_npz(self, output_path: str):
+        """Write the results as a single compressed NPZ file."""
         np.savez_compressed(
             output_path,
             spectral_image_interpolated_list=np.array(
@@ -466,17 +946,137 @@ class PixelInterpolation:
             spectral_image_interpolated_average=self.spectral_image_interpolated_average,
             spectral_image_unc_interpolated_average=self.spectral_image_unc_interpolated_average,
             row_reference=np.int32(self.row_reference),
+            wavelength_unc=self.wavelength_unc if self.wavelength_unc is not None else np.array(np.nan),
+            **self._get_incremental_state(),
+        )
+    
+    def _save_results_npy(self, output_dir: str):
+        """
+        Write results as a directory of uncompressed, memory-mappable .npy files.
+        
+        The per-image lists are written image by image into preallocated
+        (n_images, rows, 512) stacks, so they are never duplicated in memory.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        
+        image_shape = self.spectral_image_interpolated_average.shape
+        n_images = len(self.spectral_image_interpolated_list)
+        
+        for name, images in (
+            ('spectral_image_interpolated_stack', self.spectral_image_interpolated_list),
+            ('spectral_image_unc_interpolated_stack', self.spectral_image_unc_interpolated_list),
+        ):
+            stack = np.lib.format.open_memmap(
+                os.path.join(output_dir, f'{name}.npy'), mode='w+',
+                dtype=self.dtype, shape=(n_images,) + image_shape,
+            )
+            for i_img, image in enumerate(images):
+                stack[i_img] = image
+            stack.flush()
+            del stack
+        
+        np.save(os.path.join(output_dir, 'spectral_image_interpolated_average.npy'),
+                self.spectral_image_interpolated_average)
+        np.save(os.path.join(output_dir, 'spectral_image_unc_interpolated_average.npy'),
+                self.spectral_image_unc_interpolated_average)
+        np.save(os.path.join(output_dir, 'reference_wavelength.npy'), self.reference_wavelength)
+        wavelength_unc_path = os.path.join(output_dir, 'wavelength_unc.npy')
+        if self.wavelength_unc is not None:
+            np.save(wavelength_unc_path, self.wavelength_unc)
+        elif os.path.exists(wavelength_unc_path):
+            os.remove(wavelength_unc_path)
+        
+        state = self._get_incremental_state()
+        if self._interpolated_sum is not None:
+            np.save(os.path.join(output_dir, 'interpolated_sum.npy'), state['interpolated_sum'])
+            np.save(os.path.join(output_dir, 'interpolated_unc_sumsquare.npy'),
+                    state['interpolated_unc_sumsquare'])
+        
+        metadata = {
+            'n_images': n_images,
+            'image_shape': list(image_shape),
+            'dtype': self.dtype.name,
+            'extent_reference_wavelength': [float(x) for x in self.extent_reference_wavelength],
+            'row_reference': int(self.row_reference),
+            'n_accumulated': int(self._n_accumulated),
+            'source_files': list(self.source_files),
+            'calibration_hash': self._calibration_hash,
+        }
+        with open(os.path.join(output_dir, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=2)
+    
+    def _save_results_store(self, store_path: str):
+        """
+        Write results into a chunked ResultStore.
+        
+        Images are appended one at a time, chunked by (image, row-block).
+        Arrays already in the store (e.g. calibration results) are kept.
+        """
+        from utils.result_store import ResultStore
+        
+        image_shape = self.spectral_image_interpolated_average.shape
+        stacks = (
+            ('spectral_image_interpolated', self.spectral_image_interpolated_list),
+            ('spectral_image_unc_interpolated', self.spectral_image_unc_interpolated_list),
+        )
+        
+        backing_store = self._result_store
+        if backing_store is not None and (
+            os.path.abspath(backing_store.path) == os.path.abspath(store_path)
+        ):
+            # Saving back into the store the results were loaded from: the
+            # stored images are kept and only images added since are appended
+            backing_store.reopen('a')
+            store = backing_store
+            for name, images in stacks:
+                for image in images[store.stack_shape(name)[0]:]:
+                    store.append_image(name, image)
+        else:
+            store = ResultStore(store_path, mode='a')
+            for name, images in stacks:
+                store.create_stack(name, image_shape, dtype=self.dtype)
+                for image in images:
+                    store.append_image(name, image)
+        
+        try:
+            self._write_store_arrays(store)
+        finally:
+            if store is backing_store:
+                store.reopen('r')
+            else:
+                store.close()
+    
+    def _write_store_arrays(self, store):
+        """Write the average, wavelengths, accumulators and metadata to a store."""
+        store.write_array('spectral_image_interpolated_average', self.spectral_image_interpolated_average)
+        store.write_array('spectral_image_unc_interpolated_average', self.spectral_image_unc_interpolated_average)
+        store.write_array('reference_wavelength', self.reference_wavelength)
+        if self.wavelength_unc is not None:
+            store.write_array('wavelength_unc', self.wavelength_unc)
+        if self._interpolated_sum is not None:
+            store.write_array('interpolated_sum', self._interpolated_sum)
+            store.write_array('interpolated_unc_sumsquare', self._interpolated_unc_sumsquare)
+        store.set_attrs(
+            extent_reference_wavelength=[float(x) for x in self.extent_reference_wavelength],
+            row_reference=int(self.row_reference),
+            n_accumulated=int(self._n_accumulated),
+            source_files=list(self.source_files),
+            calibration_hash=self._calibration_hash,
         )
-        print(f"Results saved to {output_path}")
     
-    def load_results(self, output_path: str) -> bool:
+    def load_results(self, output_path: str, mmap_mode: str = 'r') -> bool:
         """
-        Load interpolated results from NPZ file.
+        Load interpolated results from an NPZ file, an 'npy' results directory
+        or a result store.
         
         Parameters
         ----------
         output_path : str
             Path to load results from
+        mmap_mode : str, default='r'
+            Memory-map mode for 'npy' results directories (None reads the
+            arrays into memory). The per-image lists are then (n_images, rows,
+            512) memory-mapped stacks: indexing an image only reads that image.
         
         Returns
         -------
@@ -486,6 +1086,16 @@ class PixelInterpolation:
         if not os.path.exists(output_path):
             return False
         
+        # Results written before incremental updates existed carry no state
+        self._set_incremental_state(None, None, 0, [], None)
+        self.wavelength_unc = None
+        
+        from utils.result_store import is_result_store
+        if is_result_store(output_path):
+            return self._load_results_store(output_path)
+        if os.path.isdir(output_path):
+            return self._load_results_npy(output_path, mmap_mode)
+        
         try:
             data = np.load(output_path, allow_pickle=True)
             
@@ -506,13 +1116,143 @@ class PixelInterpolation:
                 data['spectral_image_unc_interpolated_average']
             )
             self.row_reference = int(data['row_reference'])
+            if 'wavelength_unc' in data.files and data['wavelength_unc'].ndim:
+                self.wavelength_unc = data['wavelength_unc']
+            
+            if 'source_files' in data.files:
+                self._set_incremental_state(
+                    data['interpolated_sum'] if data['interpolated_sum'].ndim else None,
+                    data['interpolated_unc_sumsquare'] if data['interpolated_unc_sumsquare'].ndim else None,
+                    int(data['n_accumulated']),
+                    data['source_files'].tolist(),
+                    str(data['calibration_hash']) or None,
+                )
+            
+            logger.info("Results loaded from %s", output_path)
+            return True
+        except Exception as e:
+            logger.warning("Could not load results from %s: %s", output_path, e)
+            return False
+    
+    def _load_results_npy(self, output_dir: str, mmap_mode: str = 'r') -> bool:
+        """Open a results directory written with format='npy'."""
+        try:
+            with open(os.path.join(output_dir, 'metadata.json'), 'r') as f:
+                metadata = json.load(f)
+            
+            def _load(name):
+                return np.load(os.path.join(output_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+            
+            self.spectral_image_interpolated_list = _load('spectral_image_interpolated_stack')
+            self.spectral_image_unc_interpolated_list = _load('spectral_image_unc_interpolated_stack')
+            self.spectral_image_interpolated_average = _load('spectral_image_interpolated_average')
+            self.spectral_image_unc_interpolated_average = _load('spectral_image_unc_interpolated_average')
+            self.reference_wavelength = np.load(os.path.join(output_dir, 'reference_wavelength.npy'))
+            self.extent_reference_wavelength = tuple(metadata['extent_reference_wavelength'])
+            self.row_reference = int(metadata['row_reference'])
+            if os.path.exists(os.path.join(output_dir, 'wavelength_unc.npy')):
+                self.wavelength_unc = _load('wavelength_unc')
+            
+            if 'source_files' in metadata:
+                sum_path = os.path.join(output_dir, 'interpolated_sum.npy')
+                has_sums = os.path.exists(sum_path)
+                self._set_incremental_state(
+                    np.load(sum_path) if has_sums else None,
+                    np.load(os.path.join(output_dir, 'interpolated_unc_sumsquare.npy')) if has_sums else None,
+                    metadata['n_accumulated'],
+                    metadata['source_files'],
+                    metadata['calibration_hash'],
+                )
+            
+            logger.info("Results loaded from %s", output_dir)
+            return True
+        except Exception as e:
+            logger.warning("Could not load results from %s: %s", output_dir, e)
+            return False
+    
+    def _load_results_store(self, store_path: str) -> bool:
+        """
+        Open a result store; the per-image lists become lazily read stacks.
+        
+        The store stays open (read-only) for as long as the stacks are used.
+        """
+        from utils.result_store import ResultStore
+        
+        try:
+            store = ResultStore(store_path, mode='r')
+            attrs = store.get_attrs()
+            
+            self.spectral_image_interpolated_list = store.get_stack('spectral_image_interpolated')
+            self.spectral_image_unc_interpolated_list = store.get_stack('spectral_image_unc_interpolated')
+            self.spectral_image_interpolated_average = store.read_array('spectral_image_interpolated_average')
+            self.spectral_image_unc_interpolated_average = store.read_array('spectral_image_unc_interpolated_average')
+            self.reference_wavelength = store.read_array('reference_wavelength')
+            self.extent_reference_wavelength = tuple(attrs['extent_reference_wavelength'])
+            self.row_reference = int(attrs['row_reference'])
+            if store.has_array('wavelength_unc'):
+                self.wavelength_unc = store.read_array('wavelength_unc')
+            self._result_store = store
             
-            print(f"Results loaded from {output_path}")
+            if 'source_files' in attrs:
+                has_sums = store.has_array('interpolated_sum')
+                self._set_incremental_state(
+                    store.read_array('interpolated_sum') if has_sums else None,
+                    store.read_array('interpolated_unc_sumsquare') if has_sums else None,
+                    attrs['n_accumulated'],
+                    attrs['source_files'],
+                    attrs['calibration_hash'],
+                )
+            
+            logger.info("Results loaded from %s", store_path)
             return True
         except Exception as e:
-            print(f"Could not load results from {output_path}: {e}")
+            logger.warning("Could not load results from %s: %s", store_path, e)
             return False
     
+    def _get_incremental_state(self) -> dict:
+        """
+        Get the state needed by `update_data` as NPZ-compatible arrays.
+        
+        Missing accumulators are stored as 0-d NaN placeholders.
+        """
+        return {
+            'interpolated_sum': (
+                self._interpolated_sum if self._interpolated_sum is not None else np.array(np.nan)
+            ),
+            'interpolated_unc_sumsquare': (
+                self._interpolated_unc_sumsquare if self._interpolated_unc_sumsquare is not None
+                else np.array(np.nan)
+            ),
+            'n_accumulated': np.int64(self._n_accumulated),
+            'source_files': np.array(self.source_files, dtype=str),
+            'calibration_hash': np.array(self._calibration_hash or ''),
+        }
+    
+    def _set_incremental_state(self, interpolated_sum, interpolated_unc_sumsquare,
+                               n_accumulated: int, source_files: list, calibration_hash: str):
+        """Restore the state saved by `_get_incremental_state`."""
+        self._reset_accumulators()
+        if interpolated_sum is not None:
+            self._interpolated_sum = np.array(interpolated_sum, dtype=np.float64)
+            self._interpolated_unc_sumsquare = np.array(interpolated_unc_sumsquare, dtype=np.float64)
+            self._n_accumulated = int(n_accumulated)
+        self.source_files = list(source_files)
+        self._calibration_hash = calibration_hash
+    
+    def get_options(self) -> dict:
+        """
+        Get the constructor options that affect the interpolation results.
+        
+        Returns
+        -------
+        dict
+            JSON-serialisable dictionary of options (used e.g. as cache key)
+        """
+        return {
+            'row_reference': int(self.row_reference),
+            'dtype': self.dtype.name,
+        }
+    
     def get_results(self) -> dict:
         """
         Get all interpolation results as dictionary.
@@ -527,6 +1267,7 @@ class PixelInterpolation:
             - 'extent_reference_wavelength'
             - 'spectral_image_interpolated_average'
             - 'spectral_image_unc_interpolated_average'
+            - 'wavelength_unc'
         """
         return {
             'spectral_image_interpolated_list': self.spectral_image_interpolated_list,
@@ -535,4 +1276,98 @@ class PixelInterpolation:
             'extent_reference_wavelength': self.extent_reference_wavelength,
             'spectral_image_interpolated_average': self.spectral_image_interpolated_average,
             'spectral_image_unc_interpolated_average': self.spectral_image_unc_interpolated_average,
+            'wavelength_unc': self.wavelength_unc,
+        }
+    
+    def get_window(self, lambda_min: float, lambda_max: float, rows=None) -> dict:
+        """
+        Get the results restricted to a wavelength window (and optionally rows).
+        
+        Wavelengths are mapped to columns with `reference_wavelength`. The
+        returned images are views of the stored results: slices of the
+        in-memory arrays, slices of the memory-mapped stacks when results were
+        loaded from an 'npy' directory, or only the touched chunks when they
+        were loaded from a result store. Nothing outside the window is copied.
+        
+        Parameters
+        ----------
+        lambda_min : float
+            Lower wavelength limit (Angstroms), inclusive
+        lambda_max : float
+            Upper wavelength limit (Angstroms), inclusive
+        rows : slice or tuple, default=None
+            Detector rows to keep, as a slice or an inclusive (row_min, row_max)
+            pair. None keeps all rows.
+        
+        Returns
+        -------
+        dict
+            Dictionary with keys:
+            - 'reference_wavelength': wavelengths of the window columns
+            - 'columns': slice of the selected columns
+            - 'rows': slice of the selected rows
+            - 'spectral_image_interpolated_list'
+            - 'spectral_image_unc_interpolated_list'
+            - 'spectral_image_interpolated_average'
+            - 'spectral_image_unc_interpolated_average'
+        """
+        if self.reference_wavelength is None:
+            raise ValueError("No results available; run interpolate_data or load_results first")
+        if lambda_min > lambda_max:
+            raise ValueError(f"lambda_min ({lambda_min}) must not exceed lambda_max ({lambda_max})")
+        
+        # Map wavelengths to a column slice (the scale may run in either direction)
+        wavelength = np.asarray(self.reference_wavelength)
+        if wavelength[-1] >= wavelength[0]:
+            col_start = int(np.searchsorted(wavelength, lambda_min, side='left'))
+            col_stop = int(np.searchsorted(wavelength, lambda_max, side='right'))
+        else:
+            reversed_wavelength = wavelength[::-1]
+            n_cols = len(wavelength)
+            col_start = n_cols - int(np.searchsorted(reversed_wavelength, lambda_max, side='right'))
+            col_stop = n_cols - int(np.searchsorted(reversed_wavelength, lambda_min, side='left'))
+        if col_stop <= col_start:
+            raise ValueError(
+                f"Window [{lambda_min}, {lambda_max}] lies outside the reference wavelength "
+                f"range [{wavelength.min()}, {wavelength.max()}]"
+            )
+        cols = slice(col_start, col_stop)
+        
+        if rows is None:
+            rows = slice(None)
+        elif not isinstance(rows, slice):
+            row_min, row_max = rows
+            rows = slice(row_min, row_max + 1)
+        
+        def _window_of_images(images):
+            # Stacked arrays, memmaps and stored stacks are sliced in one go;
+            # plain lists give a list of per-image views
+            if isinstance(images, list):
+                return [image[rows, cols] for image in images]
+            if len(images) == 0:
+                return images
+            return images[:, rows, cols]
+        
+        def _window_of_average(average):
+            return None if average is None else average[rows, cols]
+        
+        return {
+            'reference_wavelength': wavelength[cols],
+            'columns': cols,
+            'rows': rows,
+            'spectral_image_interpolated_list': _window_of_images(self.spectral_image_interpolated_list),
+            'spectral_image_unc_interpolated_list': _window_of_images(self.spectral_image_unc_interpolated_list),
+            'spectral_image_interpolated_average': _window_of_average(self.spectral_image_interpolated_average),
+            'spectral_image_unc_interpolated_average': _window_of_average(self.spectral_image_unc_interpolated_average),
         }
+
+
+def _interpolate_image_worker(options: dict, spectral_image, spectral_image_unc,
+                              slopes, intercepts, row_start: int, row_end: int,
+                              row_offset: int = 0):
+    """Interpolate one image in a worker process (see `PixelInterpolation._interpolate_images`)."""
+    interpolator = PixelInterpolation(show_progress=False, **options)
+    return interpolator._interpolate_spectral_image(
+        spectral_image, spectral_image_unc, slopes, intercepts, row_start=row_start, row_end=row_end,
+        row_offset=row_offset,
+    )
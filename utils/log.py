@@ -0,0 +1,95 @@
+"""
+Logging setup for the pipeline.
+
+The pipeline modules log through `logging.getLogger(__name__)` with lazily
+formatted messages, so nothing is formatted when a level is disabled:
+  - INFO: loading, saving and summary messages
+  - DEBUG: per-row progress and fit diagnostics
+  - WARNING: unreadable files and failed fits
+
+Per-row metrics (slope, intercept, uncertainties, fit time) go to the
+'pipeline.metrics' logger, which only does work when a metrics file is
+configured. Each record is written as one JSON object per line.
+
+Example
+-------
+>>> from utils.log import configure_logging
+>>>
+>>> configure_logging('INFO', metrics_path='../output/calibration_metrics.jsonl')
+"""
+
+import json
+import logging
+import sys
+
+
+METRICS_LOGGER_NAME = 'pipeline.metrics'
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+metrics_logger = logging.getLogger(METRICS_LOGGER_NAME)
+metrics_logger.propagate = False
+metrics_logger.setLevel(logging.CRITICAL + 1)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format a metrics record as one JSON object."""
+    
+    def format(self, record):
+        entry = {'time': record.created, 'event': record.getMessage()}
+        entry.update(getattr(record, 'metrics', {}))
+        return json.dumps(entry, default=float)
+
+
+def configure_logging(level='INFO', stream=None, metrics_path: str = None,
+                      fmt: str = LOG_FORMAT):
+    """
+    Configure the log output of the pipeline (for scripts and command-line tools).
+    
+    Parameters
+    ----------
+    level : int or str, default='INFO'
+        Verbosity ('DEBUG' also shows per-row progress, 'WARNING' only problems)
+    stream : file, default=None
+        Stream for the log messages (sys.stderr if None)
+    metrics_path : str, default=None
+        JSON-lines file receiving the per-row metrics (disabled if None)
+    fmt : str
+        Format of the log messages
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if getattr(handler, '_pipeline_handler', False):
+            root.removeHandler(handler)
+            handler.close()
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(logging.Formatter(fmt))
+    handler._pipeline_handler = True
+    root.addHandler(handler)
+    root.setLevel(level)
+    
+    for handler in list(metrics_logger.handlers):
+        metrics_logger.removeHandler(handler)
+        handler.close()
+    if metrics_path is None:
+        metrics_logger.setLevel(logging.CRITICAL + 1)
+    else:
+        handler = logging.FileHandler(metrics_path, mode='a')
+        handler.setFormatter(JsonLinesFormatter())
+        metrics_logger.addHandler(handler)
+        metrics_logger.setLevel(logging.INFO)
+
+
+def log_metrics(event: str, **metrics):
+    """
+    Write one metrics record (no-op unless a metrics file is configured).
+    
+    Callers in hot loops should check `metrics_enabled()` before building
+    the keyword arguments.
+    """
+    if metrics_logger.isEnabledFor(logging.INFO):
+        metrics_logger.info(event, extra={'metrics': metrics})
+
+
+def metrics_enabled() -> bool:
+    """Check whether metrics records are written."""
+    return metrics_logger.isEnabledFor(logging.INFO)
@@ -0,0 +1,379 @@
+"""
+Content-addressed cache for calibration and interpolation results.
+
+Results are stored under a key that hashes everything they depend on:
+  - the input files (names, sizes and modification times)
+  - the options of the CalibrationParameters / PixelInterpolation object
+  - the hash of the calibration parameter set (modules/calibration_parameters.json)
+  - the calibration used for the interpolation (slopes and intercepts) and
+    whether it kept every image or only the average (streaming)
+  - the version of the pipeline code
+
+A result is therefore recomputed exactly when one of these changes, and a
+cache hit only has to load the stored output. Old entries are evicted in
+least-recently-used order when the cache exceeds its entry or size limits.
+"""
+
+import numpy as np
+import os
+import json
+import shutil
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+
+UTILS_DIR = Path(__file__).parent
+MODULES_DIR = UTILS_DIR.parent / 'modules'
+# Every module of the pipeline packages: results depend on far more than the
+# calibration and interpolation modules (line windows, bootstrap, defect mask)
+CODE_FILES = sorted(UTILS_DIR.glob('*.py')) + sorted(MODULES_DIR.glob('*.py'))
+ENTRY_COMPLETE = 'complete'
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """
+    Get a hash of the pipeline source code.
+    
+    Returns
+    -------
+    str
+        SHA-256 hex digest of the modules in `CODE_FILES`
+    """
+    digest = hashlib.sha256()
+    for code_file in CODE_FILES:
+        digest.update(code_file.name.encode('utf-8'))
+        digest.update(code_file.read_bytes())
+    return digest.hexdigest()
+
+
+def file_list_signature(data_path: str, sumer_filename_list: list) -> list:
+    """
+    Describe the input files by name, size and modification time.
+    
+    Parameters
+    ----------
+    data_path : str
+        Path to SUMER FITS files
+    sumer_filename_list : list
+        List of FITS filenames
+    
+    Returns
+    -------
+    list
+        [filename, size_bytes, mtime_ns] for every file (None for missing files)
+    """
+    signature = []
+    for filename in sumer_filename_list:
+        try:
+            stat = os.stat(os.path.join(data_path, filename))
+            signature.append([filename, stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            signature.append([filename, None, None])
+    return signature
+
+
+def _array_hash(array) -> str:
+    """Hash the contents of an array."""
+    array = np.ascontiguousarray(np.asarray(array, dtype=np.float64))
+    return hashlib.sha256(array.tobytes()).hexdigest()
+
+
+def compute_cache_key(kind: str, data_path: str, sumer_filename_list: list,
+                      options: dict, **extra) -> str:
+    """
+    Compute the cache key of a result.
+    
+    Parameters
+    ----------
+    kind : str
+        Kind of result ('calibration' or 'interpolation')
+    data_path : str
+        Path to SUMER FITS files
+    sumer_filename_list : list
+        List of FITS filenames
+    options : dict
+        Options of the object producing the result (see `get_options`)
+    **extra
+        Further JSON-serialisable inputs (e.g. parameter or calibration hashes)
+    
+    Returns
+    -------
+    str
+        SHA-256 hex digest identifying the result
+    """
+    description = {
+        'kind': kind,
+        'files': file_list_signature(data_path, sumer_filename_list),
+        'options': options,
+        'code_version': code_version(),
+        'extra': extra,
+    }
+    canonical = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Directory of cached results with least-recently-used eviction.
+    
+    Every entry is a sub-directory named after its key. Entries are written
+    to a temporary directory and renamed into place, so concurrent readers
+    never see partial results.
+    
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cache entries
+    max_entries : int, default=None
+        Maximum number of entries kept (None for no limit)
+    max_bytes : int, default=None
+        Maximum total size of the entries in bytes (None for no limit)
+    
+    Examples
+    --------
+    >>> from utils.result_cache import ResultCache, cached_calibration
+    >>>
+    >>> cache = ResultCache('../output/cache', max_bytes=20 * 1024**3)
+    >>> calibrator = CalibrationParameters(row_start=6, row_end=323)
+    >>> hit = cached_calibration(calibrator, data_path, sumer_filename_list, cache)
+    """
+    
+    def __init__(self, cache_dir: str, max_entries: int = None, max_bytes: int = None):
+        """Initialize the cache directory."""
+        self.cache_dir = str(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+    
+    def get(self, key: str):
+        """
+        Look up an entry and mark it as recently used.
+        
+        Returns
+        -------
+        str or None
+            Entry directory if the key is cached, None otherwise
+        """
+        entry_dir = self._entry_dir(key)
+        marker = os.path.join(entry_dir, ENTRY_COMPLETE)
+        if not os.path.exists(marker):
+            return None
+        os.utime(marker)
+        return entry_dir
+    
+    def put(self, key: str, write_entry) -> str:
+        """
+        Store an entry.
+        
+        Parameters
+        ----------
+        key : str
+            Cache key
+        write_entry : callable
+            Function called with a (temporary) directory in which it must
+            write the entry's files
+        
+        Returns
+        -------
+        str
+            Entry directory
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            write_entry(tmp_dir)
+            Path(tmp_dir, ENTRY_COMPLETE).touch()
+            if os.path.exists(entry_dir):
+                # Another process stored the same key meanwhile
+                shutil.rmtree(tmp_dir)
+            else:
+                os.replace(tmp_dir, entry_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        
+        self.evict(keep=key)
+        return entry_dir
+    
+    def entries(self) -> list:
+        """
+        List complete entries, least recently used first.
+        
+        Returns
+        -------
+        list
+            (key, last_access_time, size_bytes) for every entry
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            marker = os.path.join(self.cache_dir, key, ENTRY_COMPLETE)
+            if not os.path.exists(marker):
+                continue
+            size = 0
+            for root, _, files in os.walk(os.path.join(self.cache_dir, key)):
+                size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+            entries.append((key, os.path.getmtime(marker), size))
+        return sorted(entries, key=lambda entry: entry[1])
+    
+    def evict(self, keep: str = None):
+        """Remove least recently used entries until the cache is within its limits."""
+        if self.max_entries is None and self.max_bytes is None:
+            return
+        
+        entries = self.entries()
+        total_bytes = sum(entry[2] for entry in entries)
+        n_entries = len(entries)
+        for key, _, size in entries:
+            over_entries = self.max_entries is not None and n_entries > self.max_entries
+            over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not (over_entries or over_bytes):
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            n_entries -= 1
+            total_bytes -= size
+    
+    def clear(self):
+        """Remove all entries."""
+        for key in os.listdir(self.cache_dir):
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+
+def calibration_cache_key(calibrator, data_path: str, sumer_filename_list: list) -> str:
+    """Cache key of the calibration computed by `calibrator` on the given files."""
+    from modules.calibration_params_loader import get_parameters_hash
+    
+    return compute_cache_key(
+        'calibration', data_path, sumer_filename_list, calibrator.get_options(),
+        parameters_hash=get_parameters_hash(),
+    )
+
+
+def interpolation_cache_key(interpolator, data_path: str, sumer_filename_list: list,
+                            slopes, intercepts, row_start: int = 6, row_end: int = 323,
+                            streaming: bool = False) -> str:
+    """
+    Cache key of the interpolation computed by `interpolator` with the given calibration.
+    
+    Streaming results hold the average only, so they are cached apart from
+    the results holding every interpolated image.
+    """
+    return compute_cache_key(
+        'interpolation', data_path, sumer_filename_list, interpolator.get_options(),
+        slopes_hash=_array_hash(slopes), intercepts_hash=_array_hash(intercepts),
+        row_start=int(row_start), row_end=int(row_end), streaming=bool(streaming),
+    )
+
+
+def cached_calibration(calibrator, data_path: str, sumer_filename_list: list,
+                       cache: ResultCache, **kwargs) -> bool:
+    """
+    Load the calibration from the cache, or compute and cache it.
+    
+    Parameters
+    ----------
+    calibrator : CalibrationParameters
+        Calibrator to fill with results
+    data_path : str
+        Path to SUMER FITS files
+    sumer_filename_list : list
+        List of FITS filenames
+    cache : ResultCache
+        Cache to use
+    **kwargs
+        Further arguments for `compute_calibration` (e.g. n_workers=4)
+    
+    Returns
+    -------
+    bool
+        True on a cache hit, False if the calibration was computed
+    """
+    key = calibration_cache_key(calibrator, data_path, sumer_filename_list)
+    entry_dir = cache.get(key)
+    if entry_dir is not None:
+        if calibrator.load_results(os.path.join(entry_dir, 'calibration_results.npz')):
+            return True
+    
+    calibrator.compute_calibration(
+        data_path=data_path, sumer_filename_list=sumer_filename_list, **kwargs
+    )
+    cache.put(key, lambda tmp_dir: calibrator.save_results(
+        os.path.join(tmp_dir, 'calibration_results.npz')
+    ))
+    return False
+
+
+def cached_interpolation(interpolator, data_path: str, sumer_filename_list: list,
+                         slopes, intercepts, cache: ResultCache,
+                         row_start: int = 6, row_end: int = 323, streaming: bool = False,
+                         output_dir: str = None, covariances=None, **kwargs) -> bool:
+    """
+    Load the interpolation from the cache, or compute and cache it.
+    
+    Cached interpolations are stored in the memory-mappable 'npy' format,
+    so a hit only maps the stored arrays. With `output_dir` the cache is not
+    looked up, since the interpolated images have to be written there; the
+    computed result is still cached. The covariances are not part of the
+    key: on a hit they are propagated into `wavelength_unc` as
+    `interpolate_data` does.
+    
+    Parameters
+    ----------
+    interpolator : PixelInterpolation
+        Interpolator to fill with results
+    data_path : str
+        Path to SUMER FITS files
+    sumer_filename_list : list
+        List of FITS filenames
+    slopes, intercepts : array
+        Calibration used for the interpolation
+    cache : ResultCache
+        Cache to use
+    row_start, row_end : int
+        Row range of the calibration
+    streaming : bool, default=False
+        Keep only the average of the interpolated images (see `interpolate_data`)
+    output_dir : str, default=None
+        Directory every interpolated image is written to in streaming mode
+    covariances : array, default=None
+        Covariances of the slopes and intercepts, for the wavelength
+        uncertainties (see `PixelInterpolation.propagate_calibration_covariance`)
+    **kwargs
+        Further arguments for `interpolate_data` (e.g. n_workers=4)
+    
+    Returns
+    -------
+    bool
+        True on a cache hit, False if the interpolation was computed
+    """
+    key = interpolation_cache_key(
+        interpolator, data_path, sumer_filename_list, slopes, intercepts, row_start, row_end,
+        streaming=streaming,
+    )
+    entry_dir = cache.get(key) if output_dir is None else None
+    if entry_dir is not None:
+        if interpolator.load_results(os.path.join(entry_dir, 'interpolation_results')):
+            interpolator.wavelength_unc = None
+            if covariances is not None:
+                interpolator.propagate_calibration_covariance(
+                    slopes, intercepts, covariances, row_start, row_end
+                )
+            return True
+    
+    interpolator.interpolate_data(
+        data_path=data_path, sumer_filename_list=sumer_filename_list,
+        slopes=slopes, intercepts=intercepts, row_start=row_start, row_end=row_end,
+        streaming=streaming, output_dir=output_dir, covariances=covariances, **kwargs
+    )
+    cache.put(key, lambda tmp_dir: interpolator.save_results(
+        os.path.join(tmp_dir, 'interpolation_results'), format='npy'
+    ))
+    return False
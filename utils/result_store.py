@@ -0,0 +1,444 @@
+"""
+Chunked result store for calibration and interpolation outputs.
+
+This module provides the ResultStore class, an append-friendly container for
+stacks of spectral images (n_images, rows, 512) plus small arrays and
+metadata. Stacks are chunked by (image, row-block), so appending an exposure
+only writes that exposure's chunks and readers can pull individual images,
+row ranges or column (wavelength) windows without reading the rest.
+
+Two backends are available:
+  - 'h5py': a single HDF5 file with chunked, resizable datasets (used when
+    h5py is installed)
+  - 'npy': a pure-NumPy fallback, a directory holding one .npy file per
+    (image, row-block) chunk and a JSON index
+"""
+
+import numpy as np
+import os
+import json
+
+
+STORE_INDEX = 'store.json'
+
+
+def _h5py_available() -> bool:
+    """Check whether h5py can be imported."""
+    try:
+        import h5py  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def is_result_store(path: str) -> bool:
+    """
+    Check whether `path` is a result store written by ResultStore.
+    
+    Parameters
+    ----------
+    path : str
+        Path to a store directory ('npy' backend) or HDF5 file ('h5py' backend)
+    
+    Returns
+    -------
+    bool
+        True if `path` looks like a result store
+    """
+    if os.path.isdir(path):
+        return os.path.exists(os.path.join(path, STORE_INDEX))
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            return f.read(8) == b'\x89HDF\r\n\x1a\n'
+    return False
+
+
+def _as_indices(key, length: int) -> np.ndarray:
+    """Convert an int, slice, sequence or None into an array of indices."""
+    if key is None:
+        return np.arange(length)
+    return np.atleast_1d(np.arange(length)[key])
+
+
+class StoredStack:
+    """
+    Read-only, lazily loaded view of an image stack in a ResultStore.
+    
+    Behaves like a (n_images, rows, cols) array for indexing: `stack[i]` reads
+    image i, `stack[:, r0:r1, c0:c1]` reads only the chunks touched by that
+    row range. Integer keys drop their axis as with NumPy arrays.
+    """
+    
+    def __init__(self, store, name: str):
+        self._store = store
+        self.name = name
+    
+    @property
+    def shape(self) -> tuple:
+        return self._store.stack_shape(self.name)
+    
+    @property
+    def dtype(self):
+        return self._store.stack_dtype(self.name)
+    
+    def __len__(self) -> int:
+        return self.shape[0]
+    
+    def __iter__(self):
+        for i_img in range(len(self)):
+            yield self[i_img]
+    
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 3:
+            raise IndexError("too many indices for a 3-dimensional stack")
+        key = key + (slice(None),) * (3 - len(key))
+        
+        data = self._store.read(self.name, images=key[0], rows=key[1], cols=key[2])
+        
+        # Drop axes indexed by an integer, as NumPy would
+        squeeze = tuple(axis for axis, k in enumerate(key) if np.ndim(k) == 0 and not isinstance(k, slice))
+        return data.squeeze(axis=squeeze) if squeeze else data
+    
+    def __array__(self, dtype=None, copy=None):
+        data = self[:]
+        return data if dtype is None else data.astype(dtype)
+
+
+class ResultStore:
+    """
+    Chunked, appendable store of image stacks, arrays and metadata.
+    
+    Parameters
+    ----------
+    path : str
+        Path of the store: an HDF5 file for the 'h5py' backend or a directory
+        for the 'npy' backend
+    mode : str, default='a'
+        'r' read only, 'a' read/write (create if missing), 'w' create/overwrite
+    row_block : int, default=32
+        Number of detector rows per chunk for newly created stacks
+    backend : str, default=None
+        'h5py' or 'npy'. For new stores, None picks 'h5py' if it is installed
+        and 'npy' otherwise; existing stores keep their backend.
+    
+    Examples
+    --------
+    >>> from utils.result_store import ResultStore
+    >>>
+    >>> with ResultStore('campaign_store', mode='a') as store:
+    ...     store.create_stack('images', image_shape=(360, 512), dtype=np.float32)
+    ...     store.append_image('images', image)
+    ...     store.set_attrs(row_reference=120)
+    >>>
+    >>> # Read rows 100-149, columns 240-270 of every image
+    >>> with ResultStore('campaign_store', mode='r') as store:
+    ...     window = store.read('images', rows=slice(100, 150), cols=slice(240, 271))
+    """
+    
+    def __init__(self, path: str, mode: str = 'a', row_block: int = 32, backend: str = None):
+        """Open or create a result store."""
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError(f"mode must be 'r', 'a' or 'w', got {mode!r}")
+        
+        self.path = str(path)
+        self.mode = mode
+        self.row_block = int(row_block)
+        
+        exists = os.path.exists(self.path)
+        if exists and mode != 'w':
+            backend = 'npy' if os.path.isdir(self.path) else 'h5py'
+        elif mode == 'r':
+            raise FileNotFoundError(f"Result store not found: {self.path}")
+        elif backend is None:
+            backend = 'h5py' if _h5py_available() else 'npy'
+        
+        if backend not in ('h5py', 'npy'):
+            raise ValueError(f"backend must be 'h5py' or 'npy', got {backend!r}")
+        self.backend = backend
+        
+        if backend == 'h5py':
+            import h5py
+            h5_mode = {'r': 'r', 'a': 'a', 'w': 'w'}[mode]
+            self._h5 = h5py.File(self.path, h5_mode)
+        else:
+            self._h5 = None
+            if mode == 'w' and exists:
+                self._clear_npy_store()
+            if mode != 'r':
+                os.makedirs(os.path.join(self.path, 'arrays'), exist_ok=True)
+            index_path = os.path.join(self.path, STORE_INDEX)
+            if os.path.exists(index_path):
+                with open(index_path, 'r') as f:
+                    self._index = json.load(f)
+            else:
+                self._index = {'backend': 'npy', 'stacks': {}, 'arrays': [], 'attrs': {}}
+                self._write_index()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Flush and close the store."""
+        if self._h5 is not None:
+            self._h5.close()
+            self._h5 = None
+    
+    def reopen(self, mode: str):
+        """
+        Reopen the store with another mode ('r' or 'a'), keeping this object.
+        
+        Views obtained with `get_stack` stay valid.
+        """
+        if mode not in ('r', 'a'):
+            raise ValueError(f"mode must be 'r' or 'a', got {mode!r}")
+        if self._h5 is not None:
+            import h5py
+            self._h5.close()
+            self._h5 = h5py.File(self.path, mode)
+        elif mode == 'a':
+            os.makedirs(os.path.join(self.path, 'arrays'), exist_ok=True)
+        self.mode = mode
+    
+    def _check_writable(self):
+        if self.mode == 'r':
+            raise PermissionError(f"Result store {self.path} is opened read-only")
+    
+    def _clear_npy_store(self):
+        """Remove the files of an existing 'npy' store before overwriting it."""
+        import shutil
+        if not is_result_store(self.path):
+            raise FileExistsError(f"{self.path} exists and is not a result store")
+        shutil.rmtree(self.path)
+    
+    def _write_index(self):
+        """Atomically rewrite the JSON index of an 'npy' store."""
+        index_path = os.path.join(self.path, STORE_INDEX)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, index_path)
+    
+    def _chunk_path(self, name: str, i_img: int, i_block: int) -> str:
+        return os.path.join(self.path, name, f'{i_img:06d}_{i_block:04d}.npy')
+    
+    def has_stack(self, name: str) -> bool:
+        """Check whether a stack called `name` exists."""
+        if self._h5 is not None:
+            return name in self._h5
+        return name in self._index['stacks']
+    
+    def create_stack(self, name: str, image_shape: tuple, dtype=np.float64):
+        """
+        Create an empty, appendable stack of images.
+        
+        Parameters
+        ----------
+        name : str
+            Stack name (e.g., 'spectral_image_interpolated')
+        image_shape : tuple
+            (rows, cols) of every image
+        dtype : data-type, default=np.float64
+            Image data type
+        """
+        self._check_writable()
+        rows, cols = image_shape
+        row_block = min(self.row_block, rows)
+        
+        if self._h5 is not None:
+            if name in self._h5:
+                del self._h5[name]
+            self._h5.create_dataset(
+                name, shape=(0, rows, cols), maxshape=(None, rows, cols),
+                chunks=(1, row_block, cols), dtype=np.dtype(dtype),
+            )
+            return
+        
+        import shutil
+        shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        os.makedirs(os.path.join(self.path, name))
+        self._index['stacks'][name] = {
+            'n_images': 0,
+            'image_shape': [int(rows), int(cols)],
+            'row_block': int(row_block),
+            'dtype': np.dtype(dtype).name,
+        }
+        self._write_index()
+    
+    def stack_shape(self, name: str) -> tuple:
+        """Shape (n_images, rows, cols) of a stack."""
+        if self._h5 is not None:
+            return tuple(self._h5[name].shape)
+        info = self._index['stacks'][name]
+        return (info['n_images'],) + tuple(info['image_shape'])
+    
+    def stack_dtype(self, name: str):
+        """Data type of a stack."""
+        if self._h5 is not None:
+            return self._h5[name].dtype
+        return np.dtype(self._index['stacks'][name]['dtype'])
+    
+    def _stack_row_block(self, name: str) -> int:
+        if self._h5 is not None:
+            return self._h5[name].chunks[1]
+        return self._index['stacks'][name]['row_block']
+    
+    def append_image(self, name: str, image: np.ndarray) -> int:
+        """
+        Append one image to a stack, writing only that image's chunks.
+        
+        Returns
+        -------
+        int
+            Index of the appended image
+        """
+        self._check_writable()
+        n_images = self.stack_shape(name)[0]
+        self.resize_stack(name, n_images + 1)
+        self.write_block(name, n_images, 0, image)
+        return n_images
+    
+    def resize_stack(self, name: str, n_images: int):
+        """Grow (or shrink) a stack to `n_images` images."""
+        self._check_writable()
+        if self._h5 is not None:
+            self._h5[name].resize(n_images, axis=0)
+            return
+        
+        info = self._index['stacks'][name]
+        n_blocks = -(-info['image_shape'][0] // info['row_block'])
+        for i_img in range(n_images, info['n_images']):
+            for i_block in range(n_blocks):
+                chunk_path = self._chunk_path(name, i_img, i_block)
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+        info['n_images'] = int(n_images)
+        self._write_index()
+    
+    def write_block(self, name: str, i_img: int, row_start: int, block: np.ndarray):
+        """
+        Write rows [row_start, row_start + len(block)) of image `i_img`.
+        
+        For the 'npy' backend, `row_start` and the block length must be
+        aligned to the stack's row blocks (except for the last block).
+        """
+        self._check_writable()
+        block = np.asarray(block)
+        if self._h5 is not None:
+            self._h5[name][i_img, row_start:row_start + block.shape[0], :] = block
+            return
+        
+        info = self._index['stacks'][name]
+        if not 0 <= i_img < info['n_images']:
+            raise IndexError(f"Image {i_img} out of range for stack {name!r}")
+        row_block = info['row_block']
+        if row_start % row_block != 0:
+            raise ValueError(f"row_start {row_start} is not aligned to row_block {row_block}")
+        
+        dtype = np.dtype(info['dtype'])
+        for offset in range(0, block.shape[0], row_block):
+            i_block = (row_start + offset) // row_block
+            np.save(self._chunk_path(name, i_img, i_block),
+                    block[offset:offset + row_block].astype(dtype, copy=False))
+    
+    def read(self, name: str, images=None, rows=None, cols=None) -> np.ndarray:
+        """
+        Read part of a stack.
+        
+        Parameters
+        ----------
+        name : str
+            Stack name
+        images, rows : int, slice, sequence or None
+            Images and detector rows to read (None reads all)
+        cols : int, slice, sequence or None
+            Columns (wavelength pixels) to keep
+        
+        Returns
+        -------
+        array
+            Array of shape (n_selected_images, n_selected_rows, n_selected_cols)
+        """
+        n_images, n_rows, n_cols = self.stack_shape(name)
+        image_idx = _as_indices(images, n_images)
+        row_idx = _as_indices(rows, n_rows)
+        col_key = slice(None) if cols is None else cols
+        if np.ndim(col_key) == 0 and not isinstance(col_key, slice):
+            col_key = [col_key]
+        n_sel_cols = len(np.atleast_1d(np.arange(n_cols)[col_key]))
+        
+        out = np.empty((len(image_idx), len(row_idx), n_sel_cols), dtype=self.stack_dtype(name))
+        row_block = self._stack_row_block(name)
+        
+        # Group the requested rows by chunk so every chunk is touched once
+        blocks = {}
+        for i_out, row in enumerate(row_idx):
+            blocks.setdefault(int(row) // row_block, []).append((i_out, int(row) % row_block))
+        
+        for i_sel, i_img in enumerate(image_idx):
+            for i_block, members in blocks.items():
+                out_rows = [m[0] for m in members]
+                local_rows = [m[1] for m in members]
+                if self._h5 is not None:
+                    r0 = i_block * row_block
+                    chunk = self._h5[name][int(i_img), r0:r0 + row_block, :]
+                else:
+                    chunk_path = self._chunk_path(name, int(i_img), i_block)
+                    if not os.path.exists(chunk_path):
+                        out[i_sel, out_rows] = np.nan
+                        continue
+                    chunk = np.load(chunk_path, mmap_mode='r')
+                out[i_sel, out_rows] = chunk[local_rows][:, col_key]
+        return out
+    
+    def get_stack(self, name: str) -> StoredStack:
+        """Get a lazily loaded, array-like view of a stack."""
+        return StoredStack(self, name)
+    
+    def write_array(self, name: str, array):
+        """Write (or overwrite) a small array such as an average image or slopes."""
+        self._check_writable()
+        array = np.asarray(array)
+        if self._h5 is not None:
+            key = f'arrays/{name}'
+            if key in self._h5:
+                del self._h5[key]
+            self._h5.create_dataset(key, data=array)
+            return
+        
+        np.save(os.path.join(self.path, 'arrays', f'{name}.npy'), array)
+        if name not in self._index['arrays']:
+            self._index['arrays'].append(name)
+            self._write_index()
+    
+    def read_array(self, name: str, mmap_mode: str = None) -> np.ndarray:
+        """Read a small array written with `write_array`."""
+        if self._h5 is not None:
+            return self._h5[f'arrays/{name}'][()]
+        return np.load(os.path.join(self.path, 'arrays', f'{name}.npy'), mmap_mode=mmap_mode)
+    
+    def has_array(self, name: str) -> bool:
+        """Check whether an array called `name` exists."""
+        if self._h5 is not None:
+            return f'arrays/{name}' in self._h5
+        return name in self._index['arrays']
+    
+    def set_attrs(self, **attrs):
+        """Store JSON-serialisable metadata (e.g. row_reference)."""
+        self._check_writable()
+        if self._h5 is not None:
+            for key, value in attrs.items():
+                self._h5.attrs[key] = json.dumps(value)
+            return
+        self._index['attrs'].update(attrs)
+        self._write_index()
+    
+    def get_attrs(self) -> dict:
+        """Get all stored metadata."""
+        if self._h5 is not None:
+            return {key: json.loads(value) for key, value in self._h5.attrs.items()}
+        return dict(self._index['attrs'])
@@ -0,0 +1,742 @@
+"""
+Resident calibration service with warm in-memory caches.
+
+A long-running process keeps the parsed calibration parameters, the
+detector A defect mask, the averaged rasters, and the calibration and
+interpolation results in memory. Clients send requests over a local Unix
+socket (or HTTP on localhost). Once a file set has been computed, a
+request such as "row k's slope" is a dictionary lookup answered within
+milliseconds.
+
+Results are keyed like the ResultCache entries (input file names, sizes
+and modification times, options, parameter hash and code version), so a
+modified file or option is recomputed automatically. With a cache
+directory, results also survive restarts of the service.
+
+Protocol
+--------
+Unix socket: one JSON object per line, {"method": ..., "params": {...}},
+answered by one JSON line {"ok": true, "result": ...} or
+{"ok": false, "error": "..."}. A connection may send many requests.
+HTTP: the same request object POSTed to '/', answered with the same JSON.
+
+Methods
+-------
+ping, stats, reload, clear, shutdown
+calibrate    data_path, files, options, include_results
+row          data_path, row, files, options
+interpolate  data_path, files, calibration, options, streaming, output, format
+
+`files` defaults to every FITS file of data_path except Level 1 files,
+`options` are CalibrationParameters (calibrate, row) or PixelInterpolation
+(interpolate) options and `calibration` the CalibrationParameters options
+of the calibration used for the interpolation.
+
+Example
+-------
+$ python -m ech serve --socket /tmp/ech.sock &
+
+>>> from utils.service import ServiceClient
+>>>
+>>> client = ServiceClient('/tmp/ech.sock')
+>>> client.calibrate('../data/sumer/')
+>>> client.row('../data/sumer/', 120)
+{'row': 120, 'slope': 0.004214..., 'slope_unc': ..., 'intercept': ..., 'intercept_unc': ...}
+"""
+
+import numpy as np
+import os
+import glob
+import json
+import time
+import socket
+import logging
+import threading
+import socketserver
+import http.client
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 16
+
+
+class ServiceError(RuntimeError):
+    """Error reported by the calibration service."""
+
+
+def _find_files(data_path: str, files) -> list:
+    """Use the given files, or every FITS file of data_path except Level 1 files."""
+    if files:
+        return list(files)
+    return sorted(
+        os.path.basename(f) for f in glob.glob(os.path.join(data_path, '*.fits'))
+        if '_l1.fits' not in f.lower()
+    )
+
+
+def _json_default(value):
+    """Convert NumPy values for json.dumps."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, default=_json_default).encode('utf-8')
+
+
+def parse_address(address: str) -> tuple:
+    """
+    Parse a service address.
+    
+    Parameters
+    ----------
+    address : str
+        Unix socket path (optionally prefixed with 'unix:'), or 'host:port'
+        (optionally prefixed with 'http://') for HTTP
+    
+    Returns
+    -------
+    tuple
+        ('unix', path) or ('http', (host, port))
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    if address.startswith('http://'):
+        address = address[len('http://'):].rstrip('/')
+    elif os.sep in address or ':' not in address:
+        return 'unix', address
+    host, _, port = address.rpartition(':')
+    return 'http', (host or '127.0.0.1', int(port))
+
+
+class _LRU:
+    """Thread-safe mapping keeping the most recently used entries."""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+class CalibrationService:
+    """
+    Calibration and interpolation requests answered from warm caches.
+    
+    Parameters
+    ----------
+    cache_dir : str, default=None
+        ResultCache directory backing the in-memory results (memory only if None)
+    n_workers : int, default=1
+        Worker processes used for computations
+    max_entries : int, default=16
+        Number of averaged rasters, calibrations and interpolations kept in
+        memory (each, least recently used dropped first)
+    
+    Examples
+    --------
+    >>> service = CalibrationService(cache_dir='../output/cache')
+    >>> service.handle({'method': 'row', 'params': {'data_path': data_path, 'row': 120}})
+    {'ok': True, 'result': {'row': 120, 'slope': ..., ...}}
+    """
+    
+    def __init__(self, cache_dir: str = None, n_workers: int = 1,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Initialize empty caches."""
+        from utils.result_cache import ResultCache
+        
+        self.cache = ResultCache(cache_dir) if cache_dir is not None else None
+        self.n_workers = n_workers
+        self._rasters = _LRU(max_entries)
+        self._calibrations = _LRU(max_entries)
+        self._interpolations = _LRU(max_entries)
+        # Computations run one at a time; lookups of computed results do not wait
+        self._compute_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'computed': 0,
+            'raster_hits': 0,
+        }
+        self._started = time.time()
+    
+    def warm_up(self):
+        """Parse the calibration parameters and build the defect mask."""
+        from modules.calibration_params_loader import _get_cached_parameters
+        from utils.calibration import get_defect_mask_DetA
+        
+        _get_cached_parameters()
+        get_defect_mask_DetA()
+    
+    # ---- Request dispatch --------------------------------------------------
+    
+    def handle(self, request: dict) -> dict:
+        """
+        Answer one request.
+        
+        Parameters
+        ----------
+        request : dict
+            {'method': name, 'params': {...}}
+        
+        Returns
+        -------
+        dict
+            {'ok': True, 'result': ...} or {'ok': False, 'error': message}
+        """
+        self._stats['requests'] += 1
+        try:
+            method = request.get('method')
+            handler = self._methods().get(method)
+            if handler is None:
+                raise ValueError(f"Unknown method {method!r}")
+            params = request.get('params') or {}
+            return {'ok': True, 'result': handler(**params)}
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning("Request %s failed: %s", request.get('method'), e)
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+    
+    def _methods(self) -> dict:
+        return {
+            'ping': self.ping,
+            'stats': self.stats,
+            'reload': self.reload,
+            'clear': self.clear,
+            'calibrate': self.calibrate,
+            'row': self.row,
+            'interpolate': self.interpolate,
+        }
+    
+    def ping(self) -> str:
+        return 'pong'
+    
+    def stats(self) -> dict:
+        """Request counters and numbers of cached entries."""
+        return {
+            **self._stats,
+            'uptime_s': time.time() - self._started,
+            'rasters': len(self._rasters),
+            'calibrations': len(self._calibrations),
+            'interpolations': len(self._interpolations),
+        }
+    
+    def reload(self) -> str:
+        """Re-read the calibration parameter set (results keyed on the old one are not reused)."""
+        from modules.calibration_params_loader import get_parameters_hash, reload_parameters
+        
+        reload_parameters()
+        return get_parameters_hash()
+    
+    def clear(self) -> bool:
+        """Drop the in-memory caches."""
+        self._rasters.clear()
+        self._calibrations.clear()
+        self._interpolations.clear()
+        return True
+    
+    # ---- Calibration -------------------------------------------------------
+    
+    def _get_calibrator(self, data_path: str, files, options) -> tuple:
+        """Get the calibrator of a file set from memory, the disk cache or a new computation."""
+        from utils.calibration import CalibrationParameters
+        from utils.result_cache import calibration_cache_key
+        
+        files = _find_files(data_path, files)
+        if not files:
+            raise ValueError(f"No FITS files found in {data_path}")
+        calibrator = CalibrationParameters(**(options or {}))
+        key = calibration_cache_key(calibrator, data_path, files)
+        
+        cached = self._calibrations.get(key)
+        if cached is not None:
+            self._stats['memory_hits'] += 1
+            return key, cached, 'memory'
+        
+        with self._compute_lock:
+            # Computed by another request while this one waited
+            cached = self._calibrations.get(key)
+            if cached is not None:
+                self._stats['memory_hits'] += 1
+                return key, cached, 'memory'
+            
+            source = self._load_or_compute_calibration(calibrator, key, data_path, files)
+            self._calibrations.put(key, calibrator)
+            return key, calibrator, source
+    
+    def _load_or_compute_calibration(self, calibrator, key: str, data_path: str, files: list) -> str:
+        from utils.result_cache import file_list_signature
+        
+        if self.cache is not None:
+            entry_dir = self.cache.get(key)
+            if entry_dir is not None and calibrator.load_results(
+                    os.path.join(entry_dir, 'calibration_results.npz')):
+                self._stats['disk_hits'] += 1
+                return 'disk'
+        
+        # Averaged rasters only depend on the files and the averaging options
+        options = calibrator.get_options()
+        raster_key = json.dumps([
+            [data_path, files],
+            [options[name] for name in (
+                'exposure_time', 'factor_fullspectrum', 'dtype',
+                'averaging', 'clip_sigma', 'clip_iterations',
+            )],
+        ])
+        signature = file_list_signature(data_path, files)
+        raster = self._rasters.get(raster_key)
+        if raster is not None and raster[0] == signature:
+            self._stats['raster_hits'] += 1
+            calibrator.calibrate_raster(raster[1], raster[2], n_workers=self.n_workers)
+        else:
+            calibrator.compute_calibration(data_path, files, n_workers=self.n_workers)
+            self._rasters.put(
+                raster_key, (signature, calibrator._raster_average, calibrator._raster_average_unc)
+            )
+        self._stats['computed'] += 1
+        
+        if self.cache is not None:
+            self.cache.put(key, lambda tmp_dir: calibrator.save_results(
+                os.path.join(tmp_dir, 'calibration_results.npz')
+            ))
+        return 'computed'
+    
+    def calibrate(self, data_path: str, files=None, options=None,
+                  include_results: bool = False) -> dict:
+        """
+        Calibrate a file set (or look up its calibration).
+        
+        Parameters
+        ----------
+        data_path : str
+            Path to SUMER FITS files
+        files : list, default=None
+            FITS filenames (every non Level 1 file of data_path if None)
+        options : dict, default=None
+            CalibrationParameters options
+        include_results : bool, default=False
+            Also return the slopes, intercepts and their uncertainties
+        
+        Returns
+        -------
+        dict
+            Key, source ('memory', 'disk' or 'computed'), rows and seconds
+        """
+        t_start = time.perf_counter()
+        key, calibrator, source = self._get_calibrator(data_path, files, options)
+        result = {
+            'key': key,
+            'source': source,
+            'row_start': int(calibrator.row_start),
+            'row_end': int(calibrator.row_end),
+            'rows': [int(row) for row in calibrator.row_list],
+            'seconds': time.perf_counter() - t_start,
+        }
+        if include_results:
+            result.update(calibrator.get_all_results())
+        return result
+    
+    def row(self, data_path: str, row: int, files=None, options=None) -> dict:
+        """
+        Get the calibration of one detector row.
+        
+        Returns
+        -------
+        dict
+            row, slope, slope_unc, intercept, intercept_unc,
+            slope_intercept_cov, qc_reason
+        """
+        _, calibrator, _ = self._get_calibrator(data_path, files, options)
+        try:
+            idx = calibrator.row_list.index(int(row))
+        except ValueError:
+            raise ValueError(f"Row {row} has no calibration") from None
+        return {
+            'row': int(row),
+            'slope': float(calibrator.pixelscale_list[idx]),
+            'slope_unc': float(calibrator.pixelscale_unc_list[idx]),
+            'intercept': float(calibrator.pixelscale_intercept_list[idx]),
+            'intercept_unc': float(calibrator.pixelscale_intercept_unc_list[idx]),
+            'slope_intercept_cov': (
+                float(calibrator.pixelscale_intercept_cov_list[idx])
+                if idx < len(calibrator.pixelscale_intercept_cov_list) else None
+            ),
+            'qc_reason': (
+                calibrator.qc_reason_list[idx] if idx < len(calibrator.qc_reason_list) else None
+            ),
+        }
+    
+    # ---- Interpolation -----------------------------------------------------
+    
+    def interpolate(self, data_path: str, files=None, calibration=None, options=None,
+                    streaming: bool = True, output: str = None, format: str = 'npy') -> dict:
+        """
+        Interpolate a file set with its calibration (or look up the result).
+        
+        The images are not sent back; with `output` the results are written
+        there (the 'npy' format can be memory-mapped by the client).
+        
+        Parameters
+        ----------
+        data_path : str
+            Path to SUMER FITS files
+        files : list, default=None
+            FITS filenames (every non Level 1 file of data_path if None)
+        calibration : dict, default=None
+            CalibrationParameters options of the calibration to use
+        options : dict, default=None
+            PixelInterpolation options (row_reference, dtype)
+        streaming : bool, default=True
+            Keep only the average of the interpolated images
+        output : str, default=None
+            Path the results are saved to (not saved if None)
+        format : str, default='npy'
+            Output format ('npz', 'npy' or 'store')
+        
+        Returns
+        -------
+        dict
+            Key, source, number of frames, average shape, wavelength extent
+            and output path
+        """
+        from utils.interpolations import PixelInterpolation
+        from utils.result_cache import interpolation_cache_key
+        
+        t_start = time.perf_counter()
+        files = _find_files(data_path, files)
+        _, calibrator, _ = self._get_calibrator(data_path, files, calibration)
+        slopes, _ = calibrator.get_slopes()
+        intercepts, _ = calibrator.get_intercepts()
+        
+        interpolator = PixelInterpolation(show_progress=False, **(options or {}))
+        # Streaming and full results are kept apart (only the latter hold every image)
+        key = interpolation_cache_key(
+            interpolator, data_path, files, slopes, intercepts,
+            calibrator.row_start, calibrator.row_end, streaming=streaming,
+        )
+        memory_key = (key, bool(streaming))
+        
+        cached = self._interpolations.get(memory_key)
+        if cached is not None:
+            self._stats['memory_hits'] += 1
+            interpolator, source = cached, 'memory'
+        else:
+            with self._compute_lock:
+                cached = self._interpolations.get(memory_key)
+                if cached is not None:
+                    self._stats['memory_hits'] += 1
+                    interpolator, source = cached, 'memory'
+                else:
+                    source = self._load_or_compute_interpolation(
+                        interpolator, key, data_path, files, slopes, intercepts,
+                        calibrator.row_start, calibrator.row_end, streaming,
+                    )
+                    self._interpolations.put(memory_key, interpolator)
+        
+        if output is not None:
+            interpolator.save_results(output, format=format)
+        
+        average = interpolator.spectral_image_interpolated_average
+        return {
+            'key': key,
+            'source': source,
+            'n_frames': int(interpolator._n_accumulated),
+            'shape': list(np.shape(average)),
+            'extent_reference_wavelength': interpolator.extent_reference_wavelength,
+            'output': output,
+            'seconds': time.perf_counter() - t_start,
+        }
+    
+    def _load_or_compute_interpolation(self, interpolator, key: str, data_path: str, files: list,
+                                       slopes, intercepts, row_start: int, row_end: int,
+                                       streaming: bool) -> str:
+        # Streaming and full entries have different keys; an entry without
+        # images still never answers a request for every image
+        if self.cache is not None:
+            entry_dir = self.cache.get(key)
+            if entry_dir is not None and interpolator.load_results(
+                    os.path.join(entry_dir, 'interpolation_results')):
+                if streaming or len(interpolator.spectral_image_interpolated_list):
+                    self._stats['disk_hits'] += 1
+                    return 'disk'
+        
+        interpolator.interpolate_data(
+            data_path, files, slopes, intercepts, row_start=row_start, row_end=row_end,
+            streaming=streaming, n_workers=self.n_workers,
+        )
+        self._stats['computed'] += 1
+        
+        if self.cache is not None:
+            self.cache.put(key, lambda tmp_dir: interpolator.save_results(
+                os.path.join(tmp_dir, 'interpolation_results'), format='npy'
+            ))
+        return 'computed'
+
+
+# ---- Transports ------------------------------------------------------------
+
+
+class _UnixRequestHandler(socketserver.StreamRequestHandler):
+    """Answer newline-delimited JSON requests until the client disconnects."""
+    
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {'ok': False, 'error': f"Invalid request: {e}"}
+            else:
+                response = self.server.dispatch(request)
+            self.wfile.write(_encode(response) + b'\n')
+            self.wfile.flush()
+
+
+class _HTTPRequestHandler(BaseHTTPRequestHandler):
+    """Answer JSON requests POSTed to '/'."""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            response = {'ok': False, 'error': f"Invalid request: {e}"}
+        else:
+            response = self.server.dispatch(request)
+        body = _encode(response)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class _DispatchMixin:
+    """Route requests to the service; 'shutdown' stops the server."""
+    
+    daemon_threads = True
+    
+    def dispatch(self, request: dict) -> dict:
+        if isinstance(request, dict) and request.get('method') == 'shutdown':
+            # shutdown() waits for serve_forever, so it cannot run in this thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True, 'result': True}
+        return self.service.handle(request)
+
+
+class _UnixServer(_DispatchMixin, socketserver.ThreadingUnixStreamServer):
+    pass
+
+
+class _HTTPServer(_DispatchMixin, ThreadingHTTPServer):
+    pass
+
+
+def create_server(address: str, service: CalibrationService):
+    """
+    Create a server answering requests for `service`.
+    
+    Parameters
+    ----------
+    address : str
+        Unix socket path or 'host:port' (see `parse_address`)
+    service : CalibrationService
+        Service answering the requests
+    
+    Returns
+    -------
+    socketserver.BaseServer
+        Server (run it with `serve_forever`)
+    """
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        if os.path.exists(target):
+            # Remove a socket left by a service that did not shut down cleanly
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(target)
+            except OSError:
+                os.unlink(target)
+            else:
+                raise OSError(f"A service is already listening on {target}")
+            finally:
+                probe.close()
+        server = _UnixServer(target, _UnixRequestHandler)
+    else:
+        server = _HTTPServer(target, _HTTPRequestHandler)
+    server.service = service
+    return server
+
+
+def serve(address: str, cache_dir: str = None, n_workers: int = 1,
+          max_entries: int = DEFAULT_MAX_ENTRIES):
+    """
+    Run the calibration service until a 'shutdown' request or Ctrl-C.
+    
+    Parameters
+    ----------
+    address : str
+        Unix socket path or 'host:port' (see `parse_address`)
+    cache_dir, n_workers, max_entries
+        See `CalibrationService`
+    """
+    service = CalibrationService(cache_dir=cache_dir, n_workers=n_workers, max_entries=max_entries)
+    service.warm_up()
+    server = create_server(address, service)
+    kind, target = parse_address(address)
+    logger.info("Calibration service listening on %s", address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if kind == 'unix' and os.path.exists(target):
+            os.unlink(target)
+    logger.info("Calibration service stopped")
+
+
+class ServiceClient:
+    """
+    Client of a running calibration service.
+    
+    The connection is kept open between requests.
+    
+    Parameters
+    ----------
+    address : str
+        Unix socket path or 'host:port' (see `parse_address`)
+    timeout : float, default=None
+        Socket timeout in seconds (None waits for long computations)
+    """
+    
+    def __init__(self, address: str, timeout: float = None):
+        """Initialize the client (connects on the first request)."""
+        self.kind, self.target = parse_address(address)
+        self.timeout = timeout
+        self._connection = None
+        self._file = None
+    
+    def _connect(self):
+        if self.kind == 'unix':
+            self._connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._connection.settimeout(self.timeout)
+            self._connection.connect(self.target)
+            self._file = self._connection.makefile('rwb')
+        else:
+            host, port = self.target
+            self._connection = http.client.HTTPConnection(host, port, timeout=self.timeout)
+    
+    def close(self):
+        """Close the connection."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def call(self, method: str, **params):
+        """
+        Send one request.
+        
+        Returns
+        -------
+        object
+            Result of the request
+        
+        Raises
+        ------
+        ServiceError
+            If the service could not answer the request
+        """
+        if self._connection is None:
+            self._connect()
+        request = _encode({'method': method, 'params': params})
+        try:
+            if self.kind == 'unix':
+                self._file.write(request + b'\n')
+                self._file.flush()
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("Connection closed by the service")
+                response = json.loads(line)
+            else:
+                self._connection.request(
+                    'POST', '/', body=request, headers={'Content-Type': 'application/json'}
+                )
+                response = json.loads(self._connection.getresponse().read())
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if not response.get('ok'):
+            raise ServiceError(response.get('error'))
+        return response['result']
+    
+    def ping(self) -> str:
+        return self.call('ping')
+    
+    def stats(self) -> dict:
+        return self.call('stats')
+    
+    def calibrate(self, data_path: str, files=None, options=None, include_results: bool = False) -> dict:
+        """See `CalibrationService.calibrate`."""
+        return self.call('calibrate', data_path=data_path, files=files, options=options,
+                         include_results=include_results)
+    
+    def row(self, data_path: str, row: int, files=None, options=None) -> dict:
+        """See `CalibrationService.row`."""
+        return self.call('row', data_path=data_path, row=int(row), files=files, options=options)
+    
+    def interpolate(self, data_path: str, files=None, calibration=None, options=None,
+                    streaming: bool = True, output: str = None, format: str = 'npy') -> dict:
+        """See `CalibrationService.interpolate`."""
+        return self.call('interpolate', data_path=data_path, files=files, calibration=calibration,
+                         options=options, streaming=streaming, output=output, format=format)
+    
+    def shutdown(self):
+        """Stop the service."""
+        result = self.call('shutdown')
+        self.close()
+        return result
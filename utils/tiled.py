@@ -0,0 +1,224 @@
+"""
+Row-block tiled calibration and interpolation for rasters larger than memory.
+
+The detector is processed in blocks of rows across all exposures: rows
+[r0, r1) of every exposure are read from the memory-mapped FITS files,
+averaged, fitted and interpolated, and the interpolated blocks are written
+straight to a ResultStore. Memory use is bounded by the block size times
+the number of exposures, plus the (detector-sized) averages, not by the
+length of the raster.
+
+The blocks holding the calibration reference row ('xcorr' centroid mode)
+and the interpolation reference row are fitted first, because every other
+block needs their results. Bins of rows are fitted with the
+first block they reach into; their rows in neighbouring blocks are read
+with it, and so are the neighbours that re-seed the rows failing the
+quality control. The results equal those of `compute_calibration` followed by
+`interpolate_data`.
+
+Example
+-------
+>>> from utils.tiled import run_tiled
+>>>
+>>> summary = run_tiled(
+...     '../data/soho/sumer/', sumer_filename_list, '../output/raster.store',
+...     calibration_options={'row_start': 6, 'row_end': 323},
+...     interpolation_options={'row_reference': 120, 'dtype': 'float32'},
+...     block_rows=32,
+... )
+>>>
+>>> interpolator = PixelInterpolation()
+>>> interpolator.load_results('../output/raster.store')   # images read lazily
+"""
+
+import numpy as np
+import time
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+INTERPOLATED_STACK = 'spectral_image_interpolated'
+INTERPOLATED_UNC_STACK = 'spectral_image_unc_interpolated'
+
+
+def _row_blocks(n_rows: int, block_rows: int) -> list:
+    """Blocks of rows [r0, r1) covering the detector."""
+    return [(r0, min(r0 + block_rows, n_rows)) for r0 in range(0, n_rows, block_rows)]
+
+
+def run_tiled(data_path: str, sumer_filename_list: list, output_path: str,
+              calibration_options: dict = None, interpolation_options: dict = None,
+              block_rows: int = 32, keep_images: bool = True, instrumentation=None) -> dict:
+    """
+    Calibrate and interpolate a raster block of rows by block of rows.
+    
+    Parameters
+    ----------
+    data_path : str
+        Path to SUMER FITS files
+    sumer_filename_list : list
+        List of FITS filenames
+    output_path : str
+        ResultStore receiving the calibration, the interpolated images and
+        their average (overwritten)
+    calibration_options : dict, default=None
+        CalibrationParameters options. bin_assignment='interpolate' is not
+        supported (it needs the neighbouring bins of every bin).
+    interpolation_options : dict, default=None
+        PixelInterpolation options (row_reference, dtype)
+    block_rows : int, default=32
+        Number of detector rows per block (also the row chunking of the store)
+    keep_images : bool, default=True
+        Write every interpolated image to the store, not just the average
+    instrumentation : Instrumentation, default=None
+        Records the stages of the calibrator and interpolator
+    
+    Returns
+    -------
+    dict
+        Summary: output path, numbers of frames, rows and blocks, seconds
+    """
+    from modules.calibration_params_loader import get_all_rows
+    from utils.calibration import CalibrationParameters, memmapped_frames
+    from utils.interpolations import PixelInterpolation
+    from utils.result_store import ResultStore
+    
+    t_start = time.perf_counter()
+    calibrator = CalibrationParameters(
+        **{**(calibration_options or {}), 'instrumentation': instrumentation}
+    )
+    interpolator = PixelInterpolation(
+        show_progress=False, instrumentation=instrumentation, **(interpolation_options or {})
+    )
+    if calibrator.row_binning > 1 and calibrator.bin_assignment == 'interpolate':
+        raise ValueError("Tiled processing does not support bin_assignment='interpolate'")
+    if block_rows < 1:
+        raise ValueError(f"block_rows must be >= 1, got {block_rows}")
+    
+    row_start, row_end = calibrator.row_start, calibrator.row_end
+    if not row_start <= interpolator.row_reference <= row_end:
+        raise ValueError(
+            f"Reference row {interpolator.row_reference} not in calibration range ({row_start}-{row_end})"
+        )
+    
+    # Bins of rows, fitted with the first block they reach into
+    rows = [row for row in get_all_rows() if row_start <= row <= row_end]
+    units = [rows[i:i + calibrator.row_binning] for i in range(0, len(rows), calibrator.row_binning)]
+    
+    # Calibration of every row, filled in as the blocks are fitted
+    slopes = np.full(row_end - row_start + 1, np.nan)
+    intercepts = np.full(row_end - row_start + 1, np.nan)
+    
+    with memmapped_frames(data_path, sumer_filename_list) as (filenames, frames):
+        n_frames = len(frames)
+        n_rows, n_cols = frames[0].shape
+        calibrator._start_block_average(frames)
+        averaged = np.zeros(n_rows, dtype=bool)
+        
+        def average_rows(r0, r1):
+            # Rows are averaged once, even when a bin reaches into the next block
+            r1 = min(r1, n_rows)
+            todo = np.flatnonzero(~averaged[r0:r1]) + r0
+            for run in np.split(todo, np.flatnonzero(np.diff(todo) > 1) + 1):
+                if len(run):
+                    calibrator._average_row_block(frames, int(run[0]), int(run[-1]) + 1)
+            averaged[r0:r1] = True
+        
+        first_rows = [interpolator.row_reference]
+        if calibrator.centroid_mode == 'xcorr':
+            first_rows.insert(0, calibrator.reference_row)
+            average_rows(calibrator.reference_row, calibrator.reference_row + 1)
+        calibrator._start_calibration(incremental=False)
+        
+        interpolator._start_interpolation(slopes, intercepts, row_start, row_end)
+        interpolator.source_files = list(filenames)
+        interpolator._interpolated_sum = np.zeros((n_rows, n_cols), dtype=np.float64)
+        interpolator._interpolated_unc_sumsquare = np.zeros((n_rows, n_cols), dtype=np.float64)
+        interpolator._n_accumulated = n_frames
+        
+        store = ResultStore(output_path, mode='w', row_block=block_rows)
+        try:
+            for name in (INTERPOLATED_STACK, INTERPOLATED_UNC_STACK):
+                store.create_stack(name, (n_rows, n_cols), dtype=interpolator.dtype)
+                if keep_images:
+                    store.resize_stack(name, n_frames)
+            
+            blocks = _row_blocks(n_rows, block_rows)
+            fitted = np.zeros(len(units), dtype=bool)
+            
+            def fit_rows(r0, r1):
+                # Average and fit the bins reaching into rows [r0, r1)
+                average_rows(r0, r1)
+                block_units = [
+                    k for k, unit in enumerate(units)
+                    if not fitted[k] and unit[0] < r1 and unit[-1] >= r0
+                ]
+                if not block_units:
+                    return
+                first_row, last_row = units[block_units[0]][0], units[block_units[-1]][-1]
+                reach = max(abs(offset) for offset in calibrator.QC_RESEED_OFFSETS) * calibrator.row_binning
+                average_rows(max(0, first_row - reach), last_row + 1 + reach)
+                n_done = len(calibrator.row_list)
+                calibrator._fit_rows(first_row, last_row)
+                fitted[block_units] = True
+                for i in range(n_done, len(calibrator.row_list)):
+                    slopes[calibrator.row_list[i] - row_start] = calibrator.pixelscale_list[i]
+                    intercepts[calibrator.row_list[i] - row_start] = calibrator.pixelscale_intercept_list[i]
+            
+            # Every block is interpolated onto the wavelengths of the reference row
+            for row in first_rows:
+                fit_rows(*blocks[min(int(row), n_rows - 1) // block_rows])
+            
+            for r0, r1 in blocks:
+                fit_rows(r0, r1)
+                
+                # ---- Interpolate the block of every exposure -----------------
+                block_sum = interpolator._interpolated_sum[r0:r1]
+                block_unc_sumsquare = interpolator._interpolated_unc_sumsquare[r0:r1]
+                for i_img, frame in enumerate(frames):
+                    # FITS files hold the rows in the opposite order
+                    data, data_unc = interpolator._prepare_frame(
+                        np.asarray(frame[n_rows - r1:n_rows - r0])[::-1]
+                    )
+                    block_interp, block_unc_interp, reference_wavelength, extent_ref = (
+                        interpolator._interpolate_spectral_image(
+                            data, data_unc, slopes, intercepts, row_start, row_end, row_offset=r0,
+                        )
+                    )
+                    if interpolator.reference_wavelength is None:
+                        interpolator.reference_wavelength = reference_wavelength
+                        interpolator.extent_reference_wavelength = extent_ref
+                    with interpolator.instrumentation.stage('average'):
+                        block_sum += block_interp
+                        block_unc_sumsquare += np.square(block_unc_interp, dtype=np.float64)
+                    if keep_images:
+                        with interpolator.instrumentation.stage('save'):
+                            store.write_block(INTERPOLATED_STACK, i_img, r0, block_interp)
+                            store.write_block(INTERPOLATED_UNC_STACK, i_img, r0, block_unc_interp)
+                logger.debug("Processed rows %d-%d", r0, r1 - 1)
+            
+            calibrator._finish_calibration()
+            calibrator._sort_results()
+            interpolator._calibration_hash = interpolator._compute_calibration_hash(
+                calibrator.get_slopes()[0], calibrator.get_intercepts()[0], row_start, row_end
+            )
+            interpolator._finalize_average()
+            interpolator._write_store_arrays(store)
+        finally:
+            store.close()
+    
+    calibrator.save_results(output_path, format='store')
+    seconds = time.perf_counter() - t_start
+    logger.info(
+        "Tiled processing of %d FITS files in %d blocks of %d rows took %.1f s",
+        n_frames, len(blocks), block_rows, seconds,
+    )
+    return {
+        'output': output_path,
+        'n_frames': n_frames,
+        'n_rows': len(calibrator.row_list),
+        'n_blocks': len(blocks),
+        'block_rows': block_rows,
+        'seconds': seconds,
+    }